@@ -0,0 +1,46 @@
+import argparse
+import sys
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from bench_scan import build_template
+from interpret_z.parse_z import ParserZ
+from interpret_z.scan_z import FastScannerZ
+
+
+class EagerScannerZ(FastScannerZ):
+    # Materializes every token before parsing starts, as ParserZ used to.
+    def tokens(self):
+        return iter(list(super().tokens()))
+
+
+def peak_parse_memory(scanner_class, text):
+    tracemalloc.start()
+    try:
+        ParserZ(scanner_class(text)).parse()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Peak memory while parsing')
+    parser.add_argument('--size', type=int, default=4 * 1024 * 1024)
+    args = parser.parse_args()
+
+    text = build_template(args.size)
+    print('template: {:.1f} MB'.format(len(text) / 1e6))
+    for label, scanner_class in (
+        ('eager', EagerScannerZ),
+        ('lazy', FastScannerZ)
+    ):
+        print('{:<6} peak {:8.1f} MB'.format(
+            label,
+            peak_parse_memory(scanner_class, text) / 1e6
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from interpret_z.scan_z import FastScannerZ
+from interpret_z.scan_z import ScannerZ
+
+
+CSS_BLOCK = (
+    '<style type="text/css">\n'
+    '  body { margin: 0; padding: 0; font-family: Helvetica, sans-serif; }\n'
+    '  .product-grid td { padding: 12px 8px; border-bottom: 1px solid #eee; }\n'
+    '  @media only screen and (max-width: 480px) { .col { width: 100%; } }\n'
+    '</style>\n'
+)
+
+ROW = (
+    '<tr><td class="col">{foreach products as p}'
+    '<a href="{p.url}">{p.name} - {number(p.price, 2)}</a>'
+    '{/foreach}</td><td>{user.first_name == \'\' ? \'Friend\' : '
+    'user.first_name}</td></tr>\n'
+)
+
+
+PROFILES = {
+    # name => (number of CSS blocks, static paragraphs between rows)
+    'dense': (4, 1),
+    'css': (400, 1),
+    'static': (4, 200),
+}
+
+
+def build_template(size, css_blocks=4, paragraphs=1, seed=0):
+    rand = random.Random(seed)
+    parts = [CSS_BLOCK] * css_blocks
+    length = sum(len(part) for part in parts)
+    while length < size:
+        for _ in range(paragraphs):
+            filler = '<p>%s</p>\n' % ('lorem ipsum ' * rand.randint(1, 40))
+            parts.append(filler)
+            length += len(filler)
+        parts.append(ROW)
+        length += len(ROW)
+    return ''.join(parts)
+
+
+def throughput(scanner_class, text, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        scanner_class(text).scan()
+        best = min(best, time.perf_counter() - start)
+    return len(text.encode('utf-8')) / best / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Scanner throughput in MB/s')
+    parser.add_argument('--size', type=int, default=200 * 1024)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    for profile, (css_blocks, paragraphs) in PROFILES.items():
+        text = build_template(args.size, css_blocks, paragraphs)
+        for scanner_class in (ScannerZ, FastScannerZ):
+            print('{:<8} {:<14} {:8.2f} MB/s'.format(
+                profile,
+                scanner_class.__name__,
+                throughput(scanner_class, text, args.repeat)
+            ))
+
+
+if __name__ == '__main__':
+    main()
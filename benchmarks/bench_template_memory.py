@@ -0,0 +1,75 @@
+import argparse
+import sys
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from bench_scan import build_template
+from interpret_z import ast_z
+from interpret_z.template_z import TemplateZ
+from interpret_z.token_z import TokenZ
+
+
+_dict_backed = {}
+
+
+def dict_backed(obj):
+    # Rebuilds a tree with dict-backed copies of every node and token, and
+    # fresh token instances, as they were before __slots__ and interning.
+    if isinstance(obj, list):
+        return [dict_backed(item) for item in obj]
+    cls = type(obj)
+    if cls is not TokenZ and cls.__module__ != ast_z.__name__:
+        return obj
+    if cls not in _dict_backed:
+        _dict_backed[cls] = type(cls.__name__, (object,), {})
+    copy = _dict_backed[cls]()
+    for slot in cls.__slots__:
+        setattr(copy, slot, dict_backed(getattr(obj, slot)))
+    return copy
+
+
+def retained_bytes(build):
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        kept = build()
+        after = tracemalloc.get_traced_memory()[0]
+        del kept
+        return after - before
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Bytes retained per cached template'
+    )
+    parser.add_argument('--size', type=int, default=64 * 1024)
+    parser.add_argument('--templates', type=int, default=20)
+    args = parser.parse_args()
+
+    sources = [
+        build_template(args.size, seed=seed)
+        for seed in range(args.templates)
+    ]
+    slotted = retained_bytes(
+        lambda: [TemplateZ(source).ast for source in sources]
+    )
+    dict_based = retained_bytes(
+        lambda: [dict_backed(TemplateZ(source).ast) for source in sources]
+    )
+    print('source     {:10.0f} bytes/template'.format(
+        sum(len(source) for source in sources) / args.templates
+    ))
+    print('dict-based {:10.0f} bytes/template'.format(
+        dict_based / args.templates
+    ))
+    print('slotted    {:10.0f} bytes/template'.format(
+        slotted / args.templates
+    ))
+
+
+if __name__ == '__main__':
+    main()
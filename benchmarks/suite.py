@@ -0,0 +1,220 @@
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from bench_scan import CSS_BLOCK
+from interpret_z.interpret_z import InterpreterZ
+from interpret_z.parse_z import ParserZ
+from interpret_z.scan_z import FastScannerZ
+from interpret_z.scan_z import ScannerZ
+
+
+FORMAT_VERSION = 1
+
+BASELINE = Path(__file__).resolve().parent / 'baseline.json'
+
+CASES = {
+    # name => generator parameters
+    'small': dict(static_size=2 * 1024, islands=20, depth=1, array_length=5),
+    'static': dict(static_size=256 * 1024, islands=20, depth=1, array_length=5),
+    'islands': dict(static_size=8 * 1024, islands=2000, depth=1, array_length=5),
+    'nested': dict(static_size=4 * 1024, islands=50, depth=3, array_length=12),
+    'wide': dict(static_size=4 * 1024, islands=50, depth=1, array_length=2000),
+    'css': dict(static_size=8 * 1024, islands=50, depth=1, array_length=5,
+                css_blocks=200),
+}
+
+ISLANDS = (
+    '{user.first_name}',
+    '{number(price, 2)}',
+    '{u(user.email)}',
+    '{user.vip ? \'VIP\' : \'Member\'}',
+    '{if price > 10}expensive{else}cheap{/if}',
+    '{substr(user.last_name, 0, 3)}',
+)
+
+
+class PrescannedZ:
+    # Feeds ParserZ tokens scanned up front, so parsing is timed on its own.
+    def __init__(self, tokens):
+        self._tokens = tokens
+
+    def tokens(self):
+        return iter(self._tokens)
+
+
+def generate(static_size, islands, depth, array_length, css_blocks=0, seed=0):
+    # Returns a template and a context for it: `css_blocks` style blocks,
+    # then `islands` expressions spread over `static_size` characters of
+    # text, then `depth` nested loops over arrays of `array_length` items.
+    rand = random.Random(seed)
+    parts = [CSS_BLOCK] * css_blocks
+    filler_size = static_size // (islands + 1)
+    for index in range(islands):
+        words = ' '.join(rand.choice(('lorem', 'ipsum', 'dolor', 'sit', 'amet'))
+                         for _ in range(filler_size // 6 + 1))
+        parts.append('<p>%s</p>' % words[:filler_size])
+        parts.append(ISLANDS[index % len(ISLANDS)])
+
+    loop = '<b>{item%d.name}</b>' % (depth - 1)
+    for level in reversed(range(depth)):
+        array = 'items' if level == 0 else 'item%d.children' % (level - 1)
+        loop = '{foreach %s as item%d}<li>%s</li>{/foreach}' % (
+            array, level, loop
+        )
+    parts.append('<ul>%s</ul>' % loop)
+
+    def items(level):
+        return [
+            {
+                'name': 'item %d.%d' % (level, index),
+                'children': items(level + 1) if level + 1 < depth else []
+            }
+            for index in range(array_length)
+        ]
+
+    context = {
+        'user': {
+            'first_name': 'Ada',
+            'last_name': 'Lovelace',
+            'email': 'ada@example.com',
+            'vip': True
+        },
+        'price': 12.5,
+        'items': items(0) if depth else []
+    }
+    return ''.join(parts), context
+
+
+def measure(func, repeat):
+    # Seconds per call. Each sample loops for at least 0.2s, as timeit does,
+    # so quick stages aren't lost in timer noise.
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    times = [t / number for t in timer.repeat(repeat, number)]
+    return {'best': min(times), 'median': statistics.median(times)}
+
+
+def run_case(params, repeat):
+    source, context = generate(**params)
+    size = len(source.encode('utf-8'))
+    tokens = FastScannerZ(source).scan()
+    ast = ParserZ(PrescannedZ(tokens)).parse()
+    output = InterpreterZ(ast, dict(context)).interpret()
+    results = {
+        'scan': measure(lambda: ScannerZ(source).scan(), repeat),
+        'fast_scan': measure(lambda: FastScannerZ(source).scan(), repeat),
+        'parse': measure(lambda: ParserZ(PrescannedZ(tokens)).parse(), repeat),
+        'interpret': measure(
+            lambda: InterpreterZ(ast, dict(context)).interpret(),
+            repeat
+        ),
+    }
+    for stage in ('scan', 'fast_scan', 'parse'):
+        results[stage]['mb_per_s'] = size / results[stage]['best'] / 1e6
+    results['interpret']['mb_per_s'] = (
+        len(output.encode('utf-8')) / results['interpret']['best'] / 1e6
+    )
+    return {'template_bytes': size, 'tokens': len(tokens), 'stages': results}
+
+
+def run(cases, repeat):
+    return {
+        'version': FORMAT_VERSION,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'repeat': repeat,
+        'cases': {name: run_case(CASES[name], repeat) for name in cases},
+    }
+
+
+def compare(results, baseline, tolerance):
+    # (case, stage, baseline seconds, current seconds) for every stage whose
+    # best time got slower than the baseline by more than `tolerance`.
+    regressions = []
+    for case, current in results['cases'].items():
+        previous = baseline.get('cases', {}).get(case)
+        if previous is None:
+            continue
+        for stage, timing in current['stages'].items():
+            before = previous['stages'].get(stage)
+            if before is None:
+                continue
+            if timing['best'] > before['best'] * (1 + tolerance):
+                regressions.append(
+                    (case, stage, before['best'], timing['best'])
+                )
+    return regressions
+
+
+def report(results, baseline=None):
+    print('{:<8} {:<10} {:>10} {:>10} {:>9}'.format(
+        'case', 'stage', 'best ms', 'MB/s', 'change'
+    ))
+    for case, current in results['cases'].items():
+        previous = (baseline or {}).get('cases', {}).get(case)
+        for stage, timing in current['stages'].items():
+            change = ''
+            if previous and stage in previous['stages']:
+                before = previous['stages'][stage]['best']
+                change = '{:+.1%}'.format(timing['best'] / before - 1)
+            print('{:<8} {:<10} {:>10.2f} {:>10.2f} {:>9}'.format(
+                case,
+                stage,
+                timing['best'] * 1000,
+                timing['mb_per_s'],
+                change
+            ))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Times scanning, parsing and interpreting separately'
+    )
+    parser.add_argument('--case', action='append', choices=sorted(CASES),
+                        help='run only these cases (default: all)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='write results to this JSON file')
+    parser.add_argument('--baseline', default=str(BASELINE),
+                        help='results to compare against')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='store these results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='slowdown allowed before a stage is flagged')
+    args = parser.parse_args()
+
+    results = run(args.case or list(CASES), args.repeat)
+    baseline = None
+    baseline_path = Path(args.baseline)
+    if baseline_path.exists() and not args.save_baseline:
+        baseline = json.loads(baseline_path.read_text())
+        if baseline.get('version') != FORMAT_VERSION:
+            baseline = None
+
+    report(results, baseline)
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+    if args.save_baseline:
+        baseline_path.write_text(json.dumps(results, indent=2))
+        print('baseline saved to %s' % baseline_path)
+        return 0
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        for case, stage, before, after in regressions:
+            print('REGRESSION {} {}: {:.2f} ms -> {:.2f} ms'.format(
+                case, stage, before * 1000, after * 1000
+            ))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -7,7 +7,12 @@ sys.path.append(str(root))
 
 __all__ = []
 
+__version__ = '0.0.3'
+
 from interpret_z.token_z import TokenZ
+from interpret_z.const_z import KeywordTokens
+from interpret_z.const_z import OperatorTokens
+from interpret_z.const_z import PureZephyrFuncs
 from interpret_z.const_z import ReservedKeywords
 from interpret_z.const_z import TypesZ
 from interpret_z.const_z import ZephyrFuncs
@@ -15,10 +20,34 @@ from interpret_z.const_z import ZephyrFuncs
 from interpret_z.interpret_z import InterpreterZ
 from interpret_z.parse_z import ParserZ
 from interpret_z.scan_z import ScannerZ
+from interpret_z.scan_z import FastScannerZ
+from interpret_z.scan_z import BytesScannerZ
+
+from interpret_z.template_z import TemplateZ
+from interpret_z.cache_z import TemplateCacheZ
+from interpret_z.diskcache_z import DiskCacheZ
+from interpret_z.fragment_z import FragmentCacheZ
+from interpret_z.async_z import LoaderZ
+from interpret_z.batch_z import render_many
+from interpret_z.batch_z import iter_render_many
+
+template_cache = TemplateCacheZ()
 
 def render(template, context):
-    return InterpreterZ(
-        ParserZ(ScannerZ(template)).parse(),
-        context
-    ).interpret()
+    return template_cache.get_template(template).render(context)
+
+def render_bytes(template, context):
+    return template_cache.get_template(template).render_bytes(context)
+
+def iter_render(template, context):
+    return template_cache.get_template(template).iter_render(context)
+
+def render_to(writer, template, context, buffer_size=8192):
+    return template_cache.get_template(template).render_to(
+        writer,
+        context,
+        buffer_size=buffer_size
+    )
 
+async def render_async(template, context):
+    return await template_cache.get_template(template).render_async(context)
@@ -0,0 +1,5 @@
+import sys
+
+from interpret_z.cli_z import main
+
+sys.exit(main())
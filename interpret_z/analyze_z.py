@@ -0,0 +1,278 @@
+from collections import Counter
+from collections.abc import Mapping
+
+from interpret_z import ast_z
+
+
+# A path is a tuple of keys from the top of the context: ('user', 'name') for
+# user.name. ANY stands for every element (or every key) of a collection,
+# since subscripts and loops may touch any of them.
+ANY = '*'
+
+# The possible sources of a variable's value at some point of a template.
+EXTERNAL = 'external' # Read from the context
+LOCAL = 'local' # Assigned earlier in the template
+
+
+class DependencyAnalyzerZ:
+    # Collects the context paths a template may read. Assignments shadow
+    # context variables from the point they are made; reads through a
+    # foreach variable are traced back to the array it iterates. Where a
+    # branch or a loop may or may not run, both possibilities are kept, so
+    # the result errs on the side of reading too much.
+    def __init__(self, ast):
+        self.ast = ast
+        self.paths = set()
+        self.item_reads = set() # Arrays whose items were read in a loop
+
+    def analyze(self):
+        self.paths = set()
+        self.item_reads = set()
+        self.statement(self.ast, {})
+        return minimize_paths(self.paths)
+
+    def sources(self, env, name):
+        return env.get(name, frozenset([EXTERNAL]))
+
+    def merge(self, *envs):
+        merged = {}
+        for name in set().union(*envs):
+            merged[name] = frozenset().union(
+                *(self.sources(env, name) for env in envs)
+            )
+        return merged
+
+    def read(self, env, name, suffix=()):
+        for source in self.sources(env, name):
+            if source == EXTERNAL:
+                self.paths.add((name,) + suffix)
+            elif source != LOCAL:
+                self.item_reads.add(source)
+                self.paths.add(source + (ANY,) + suffix)
+
+    def access_path(self, node, env):
+        # (name, suffix) for var.prop[idx]... chains, reading any subscript
+        # expressions along the way; None for anything else.
+        suffix = []
+        while True:
+            if type(node) is ast_z.VarNode:
+                return node.name, tuple(reversed(suffix))
+            if type(node) is ast_z.DotNode:
+                props = []
+                prop = node.prop
+                while type(prop) is ast_z.DotNode:
+                    props.append(prop.var.name)
+                    prop = prop.prop
+                props.append(prop)
+                suffix.extend(reversed(props))
+                node = node.var
+            elif type(node) is ast_z.SubscriptNode:
+                self.expression(node.idx, env)
+                suffix.append(ANY)
+                node = node.var
+            else:
+                return None
+
+    def expression(self, node, env):
+        if node is None:
+            return
+        path = self.access_path(node, env)
+        if path is not None:
+            self.read(env, *path)
+            return
+        for child in children(node):
+            self.expression(child, env)
+
+    def statement(self, node, env):
+        # Returns the environment after `node` has run.
+        if type(node) is ast_z.CompoundNode:
+            for child in node.children:
+                env = self.statement(child, env)
+            return env
+        if type(node) is ast_z.AssignmentNode:
+            self.expression(node.value, env)
+            env = dict(env)
+            env[node.name] = frozenset([LOCAL])
+            return env
+        if type(node) is ast_z.IfNode:
+            self.expression(node.condition, env)
+            if_true = self.statement(node.if_true, env)
+            if_false = self.statement(node.if_false, env) if (
+                node.if_false
+            ) else env
+            return self.merge(if_true, if_false)
+        if type(node) is ast_z.ForLoopNode:
+            return self.for_loop(node, env)
+        self.expression(node, env)
+        return env
+
+    def for_loop(self, node, env):
+        path = self.access_path(node.arr, env)
+        if path is None:
+            self.expression(node.arr, env)
+            item_sources = frozenset([EXTERNAL])
+        else:
+            name, suffix = path
+            item_sources = frozenset(
+                LOCAL if source == LOCAL else (
+                    (name,) + suffix if source == EXTERNAL else source + (
+                        (ANY,) + suffix
+                    )
+                )
+                for source in self.sources(env, name)
+            )
+            for source in self.sources(env, name):
+                if source != EXTERNAL and source != LOCAL:
+                    self.item_reads.add(source)
+        # Every pass may see assignments made by the previous one, so rerun
+        # the body until its entry environment stops changing.
+        entry = env
+        while True:
+            body_env = dict(entry)
+            body_env[node.var.name] = item_sources
+            exit_env = self.statement(node.block, body_env)
+            next_entry = self.merge(entry, exit_env)
+            if next_entry == entry:
+                break
+            entry = next_entry
+        # Reads through the loop variable already require the array; if
+        # there were none, its items are needed to count iterations.
+        for source in item_sources:
+            if source != EXTERNAL and source != LOCAL and (
+                source not in self.item_reads
+            ):
+                self.paths.add(source + (ANY,))
+        # The loop may not run at all. Its variable is scoped to the loop.
+        exit_env = self.merge(env, exit_env)
+        name = node.var.name
+        if name in env:
+            exit_env[name] = env[name]
+        else:
+            exit_env.pop(name, None)
+        return exit_env
+
+
+class EagerAnalyzerZ(DependencyAnalyzerZ):
+    # The context paths a template reads whenever it runs. The branches of
+    # if and ternary, the right side of && and || and the body of foreach
+    # are left out, as they may not run.
+    def expression(self, node, env):
+        if type(node) is ast_z.TernaryNode:
+            node = node.condition
+        elif type(node) is ast_z.BoolStatementNode:
+            node = node.left
+        super().expression(node, env)
+
+    def statement(self, node, env):
+        if type(node) is ast_z.IfNode:
+            self.expression(node.condition, env)
+            return env
+        return super().statement(node, env)
+
+    def for_loop(self, node, env):
+        self.expression(node.arr, env)
+        return env
+
+
+def children(node):
+    for slot in getattr(node, '__slots__', ()):
+        child = getattr(node, slot)
+        if isinstance(child, list):
+            yield from child
+        elif hasattr(child, '__slots__') and not hasattr(child, 'z_type'):
+            yield child
+
+
+def var_reads(node):
+    # Names read anywhere under `node`; a foreach variable is bound, not read.
+    reads = Counter()
+    nodes = [node]
+    while nodes:
+        node = nodes.pop()
+        if type(node) is ast_z.VarNode:
+            reads[node.name] += 1
+        elif type(node) is ast_z.ForLoopNode:
+            nodes.extend([node.arr, node.block])
+            continue
+        nodes.extend(children(node))
+    return reads
+
+
+def walk(node):
+    # Every node under `node`, itself included, in source order.
+    nodes = [node]
+    while nodes:
+        node = nodes.pop()
+        yield node
+        nodes.extend(reversed(list(children(node))))
+
+
+def minimize_paths(paths):
+    # Drop paths already covered by a shorter one: reading all of `user`
+    # includes reading user.name.
+    minimal = set()
+    for path in sorted(paths, key=len):
+        if not any(path[:length] in minimal for length in range(1, len(path))):
+            minimal.add(path)
+    return minimal
+
+
+def context_paths(ast):
+    return DependencyAnalyzerZ(ast).analyze()
+
+
+def eager_paths(ast):
+    return EagerAnalyzerZ(ast).analyze()
+
+
+def path_tree(paths):
+    # Nested dicts of keys; None marks a value needed whole.
+    tree = {}
+    for path in paths:
+        node = tree
+        for key in path[:-1]:
+            child = node.setdefault(key, {})
+            if child is None:
+                break
+            node = child
+        else:
+            node[path[-1]] = None
+    return tree
+
+
+def merge_trees(first, second):
+    if first is None or second is None:
+        return None
+    merged = dict(first)
+    for key, subtree in second.items():
+        merged[key] = merge_trees(merged[key], subtree) if (
+            key in merged
+        ) else subtree
+    return merged
+
+
+def _project(value, tree):
+    if tree is None:
+        return value
+    if isinstance(value, Mapping):
+        projected = {}
+        for key, item in value.items():
+            if ANY in tree:
+                subtree = tree[ANY]
+                if key in tree:
+                    subtree = merge_trees(subtree, tree[key])
+            elif key in tree:
+                subtree = tree[key]
+            else:
+                continue
+            projected[key] = _project(item, subtree)
+        return projected
+    if isinstance(value, (list, tuple)) and ANY in tree:
+        return type(value)(_project(item, tree[ANY]) for item in value)
+    return value
+
+
+def project_context(context, paths):
+    # A copy of `context` holding only what `paths` can reach; values that
+    # are neither dicts nor lists are kept whole.
+    return _project(context, path_tree(paths))
@@ -1,88 +1,148 @@
 class ArrayNode:
-    def __init__(self, arr):
+    __slots__ = ('arr', 'pos')
+
+    def __init__(self, arr, pos=None):
         self.arr = arr
+        self.pos = pos
 
 class AssignmentNode:
-    def __init__(self, name, value):
+    __slots__ = ('name', 'value', 'pos')
+
+    def __init__(self, name, value, pos=None):
         self.name = name
         self.value = value
+        self.pos = pos
 
 class BangNode:
-    def __init__(self, child):
+    __slots__ = ('child', 'pos')
+
+    def __init__(self, child, pos=None):
         self.child = child
+        self.pos = pos
 
 class BinOpNode:
-    def __init__(self, left, op, right):
+    __slots__ = ('left', 'op', 'right', 'pos')
+
+    def __init__(self, left, op, right, pos=None):
         self.left = left
         self.op = op
         self.right = right
+        self.pos = pos
 
 class BoolOpNode:
-    def __init__(self, left, op, right):
+    __slots__ = ('left', 'op', 'right', 'pos')
+
+    def __init__(self, left, op, right, pos=None):
         self.left = left
         self.op = op
         self.right = right
+        self.pos = pos
 
 class BoolStatementNode:
-    def __init__(self, left, op, right):
+    __slots__ = ('left', 'op', 'right', 'pos')
+
+    def __init__(self, left, op, right, pos=None):
         self.left = left
         self.op = op
         self.right = right
+        self.pos = pos
 
 class CompoundNode:
-    def __init__(self, children):
+    __slots__ = ('children', 'pos')
+
+    def __init__(self, children, pos=None):
         self.children = children
+        self.pos = pos
+
+class ConstNode:
+    __slots__ = ('value', 'pos')
+
+    def __init__(self, value, pos=None):
+        self.value = value
+        self.pos = pos
 
 class DotNode:
-    def __init__(self, var, prop):
+    __slots__ = ('var', 'prop', 'pos')
+
+    def __init__(self, var, prop, pos=None):
         self.var = var
         self.prop = prop
+        self.pos = pos
 
 class ForLoopNode:
-    def __init__(self, arr, var, block):
+    __slots__ = ('arr', 'var', 'block', 'pos')
+
+    def __init__(self, arr, var, block, pos=None):
         self.arr = arr
         self.var = var
         self.block = block
+        self.pos = pos
 
 class FuncNode:
-    def __init__(self, func, args):
+    __slots__ = ('func', 'args', 'pos')
+
+    def __init__(self, func, args, pos=None):
         self.func = func
         self.args = args
+        self.pos = pos
 
 class HtmlTextNode:
-    def __init__(self, value):
+    __slots__ = ('value', 'pos')
+
+    def __init__(self, value, pos=None):
         self.value = value
+        self.pos = pos
 
 class IfNode:
-    def __init__(self, condition, if_true, if_false):
+    __slots__ = ('condition', 'if_true', 'if_false', 'pos')
+
+    def __init__(self, condition, if_true, if_false, pos=None):
         self.condition = condition
         self.if_true = if_true 
-        self.if_false = if_false 
+        self.if_false = if_false
+        self.pos = pos
 
 class IntegerNode:
-    def __init__(self, token):
+    __slots__ = ('value', 'pos')
+
+    def __init__(self, token, pos=None):
         self.value = token.value
+        self.pos = pos
 
 class RealNode:
-    def __init__(self, token):
+    __slots__ = ('value', 'pos')
+
+    def __init__(self, token, pos=None):
         self.value = token.value
+        self.pos = pos
 
 class StringNode:
-    def __init__(self, token):
+    __slots__ = ('value', 'pos')
+
+    def __init__(self, token, pos=None):
         self.value = token.value
+        self.pos = pos
 
 class SubscriptNode:
-    def __init__(self, var, idx):
+    __slots__ = ('var', 'idx', 'pos')
+
+    def __init__(self, var, idx, pos=None):
         self.var = var
         self.idx = idx
+        self.pos = pos
 
 class TernaryNode:
-    def __init__(self, condition, if_true, if_false):
+    __slots__ = ('condition', 'if_true', 'if_false', 'pos')
+
+    def __init__(self, condition, if_true, if_false, pos=None):
         self.condition = condition
         self.if_true = if_true
         self.if_false = if_false
+        self.pos = pos
 
 class VarNode:
-    def __init__(self, name):
-        self.name = name
+    __slots__ = ('name', 'pos')
 
+    def __init__(self, name, pos=None):
+        self.name = name
+        self.pos = pos
@@ -0,0 +1,301 @@
+import asyncio
+
+from interpret_z import ast_z
+from interpret_z.analyze_z import children
+from interpret_z.analyze_z import var_reads
+from interpret_z.analyze_z import walk
+from interpret_z.interpret_z import InterpreterZ
+from interpret_z.interpret_z import format_value
+from interpret_z.lazy_z import resolve
+
+
+class PendingZ:
+    # A context value that a LoaderZ fetches the first time a render reads
+    # it. Renders that never read it never fetch it.
+    __slots__ = ('loader', 'key', 'future', 'value', 'resolved')
+
+    def __init__(self, loader, key):
+        self.loader = loader
+        self.key = key
+        self.future = None
+        self.value = None
+        self.resolved = False
+
+    def __await__(self):
+        return self.loader.resolve(self).__await__()
+
+
+class UnresolvedZ(Exception):
+    # Raised by AsyncInterpreterZ's lookups when they reach a PendingZ that
+    # hasn't been fetched yet.
+    def __init__(self, pending):
+        super().__init__('Value for %r not loaded yet' % (pending.key,))
+        self.pending = pending
+
+
+class LoaderZ:
+    # Fetches the values behind its PendingZs with `batch_fn`, a coroutine
+    # function taking a list of keys and returning a list of values in the
+    # same order (or a dict keyed by key). Keys requested during the same
+    # pass of the event loop go out in one call, of at most `max_batch`
+    # keys. Values are kept for the life of the loader, so use one loader
+    # per request or batch of renders.
+    def __init__(self, batch_fn, max_batch=None):
+        self.batch_fn = batch_fn
+        self.max_batch = max_batch
+        self.batches = 0
+        self.keys = 0
+        self._pending = {}
+        self._queue = []
+
+    def load(self, key):
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = self._pending[key] = PendingZ(self, key)
+        return pending
+
+    async def resolve(self, pending):
+        if pending.resolved:
+            return pending.value
+        if pending.future is None:
+            loop = asyncio.get_running_loop()
+            pending.future = loop.create_future()
+            if not self._queue:
+                loop.call_soon(self._dispatch)
+            self._queue.append(pending)
+        return await pending.future
+
+    def _dispatch(self):
+        queue, self._queue = self._queue, []
+        size = self.max_batch or len(queue)
+        for start in range(0, len(queue), size):
+            asyncio.ensure_future(self._fetch(queue[start:start + size]))
+
+    async def _fetch(self, batch):
+        self.batches += 1
+        self.keys += len(batch)
+        keys = [pending.key for pending in batch]
+        try:
+            values = await self.batch_fn(keys)
+            if isinstance(values, dict):
+                values = [values.get(key) for key in keys]
+            elif len(values) != len(keys):
+                raise ValueError('Loader returned %d values for %d keys' % (
+                    len(values), len(keys)
+                ))
+        except Exception as error:
+            for pending in batch:
+                pending.future.set_exception(error)
+            return
+        for pending, value in zip(batch, values):
+            pending.value = value
+            pending.resolved = True
+            pending.future.set_result(value)
+
+    def stats(self):
+        return {'batches': self.batches, 'keys': self.keys}
+
+
+LOOKUP_NODES = (ast_z.VarNode, ast_z.DotNode, ast_z.SubscriptNode)
+
+
+def lookups(node):
+    # The outermost variable lookups under `node` that run whenever it's
+    # evaluated, in source order: branches of ternaries and the right side of && and || are
+    # skipped, as they may never be read.
+    nodes = [node]
+    while nodes:
+        node = nodes.pop()
+        if type(node) in LOOKUP_NODES:
+            yield node
+        elif type(node) is ast_z.TernaryNode:
+            nodes.append(node.condition)
+        elif type(node) is ast_z.BoolStatementNode:
+            nodes.append(node.left)
+        else:
+            nodes.extend(reversed(list(children(node))))
+
+
+def written(node):
+    # Names `node` assigns or binds as a loop variable.
+    names = set()
+    for child in walk(node):
+        if type(child) is ast_z.AssignmentNode:
+            names.add(child.name)
+        elif type(child) is ast_z.ForLoopNode:
+            names.add(child.var.name)
+    return names
+
+
+def _resolved(value, lazy_values):
+    if callable(value):
+        value = resolve(value, lazy_values)
+    if type(value) is PendingZ:
+        if not value.resolved:
+            raise UnresolvedZ(value)
+        return value.value
+    return value
+
+
+class AsyncInterpreterZ(InterpreterZ):
+    # Renders like InterpreterZ while context values may be PendingZs.
+    # Expressions are evaluated as usual until a lookup reaches one that
+    # hasn't been fetched; the expression is then retried once it has.
+    # Sibling statements that don't depend on each other's writes, and the
+    # iterations of a loop that assigns nothing, run concurrently, so their
+    # lookups end up in the same batch.
+    def __init__(self, ast, context=None, concurrent=None):
+        super().__init__(ast, context)
+        # id(node) => the runs of its children (or whether its iterations)
+        # may run concurrently; shared by the interpreters of each iteration.
+        self.concurrent = concurrent if concurrent is not None else {}
+
+    def visit_VarNode(self, node):
+        value = _resolved(self.context.get(node.name), self.lazy_values)
+        if value is None:
+            raise Exception('Var %s referenced before assignment' % node.name)
+        return value
+
+    def visit_DotNode(self, node):
+        var = self.visit(node.var)
+        while type(node.prop) is ast_z.DotNode:
+            node = node.prop
+            var = _resolved(var[node.var.name], self.lazy_values)
+        return _resolved(var[node.prop], self.lazy_values)
+
+    def visit_SubscriptNode(self, node):
+        return _resolved(
+            self.visit(node.var)[self.visit(node.idx)],
+            self.lazy_values
+        )
+
+    async def prefetch(self, node):
+        # Fetches the pending values `node` is sure to read all at once, so
+        # they go out in one batch instead of one per retry in evaluate().
+        # Lookups reaching a value behind another pending one take another
+        # round.
+        remaining = list(lookups(node))
+        while remaining:
+            pending = []
+            blocked = []
+            for lookup in remaining:
+                try:
+                    self.visit(lookup)
+                except UnresolvedZ as unresolved:
+                    pending.append(unresolved.pending)
+                    blocked.append(lookup)
+                except Exception:
+                    pass # Raised again, in order, by evaluate()
+            if not pending:
+                return
+            await asyncio.gather(*pending)
+            remaining = blocked
+
+    async def evaluate(self, node):
+        if type(node) not in LOOKUP_NODES:
+            await self.prefetch(node)
+        while True:
+            try:
+                return self.visit(node)
+            except UnresolvedZ as unresolved:
+                await unresolved.pending
+
+    def runs(self, node):
+        # The children of compound `node`, split into runs that may run
+        # concurrently. A child starts a new run when it writes a name, by
+        # assignment or as a loop variable, that the run reads or writes, or
+        # reads a name the run writes; runs go one after another.
+        runs = self.concurrent.get(id(node))
+        if runs is None:
+            runs = []
+            run, run_reads, run_writes = [], set(), set()
+            for child in node.children:
+                writes = written(child)
+                reads = set(var_reads(child))
+                if run and (
+                    writes & (run_reads | run_writes) or reads & run_writes
+                ):
+                    runs.append(run)
+                    run, run_reads, run_writes = [], set(), set()
+                run.append(child)
+                run_reads |= reads
+                run_writes |= writes
+            if run:
+                runs.append(run)
+            self.concurrent[id(node)] = runs
+        return runs
+
+    def is_concurrent(self, node):
+        # Whether the iterations of loop `node` may run concurrently: its
+        # body assigns nothing a later iteration, or the rest of the
+        # template, could read.
+        concurrent = self.concurrent.get(id(node))
+        if concurrent is None:
+            concurrent = self.concurrent[id(node)] = not any(
+                type(child) is ast_z.AssignmentNode
+                for child in walk(node.block)
+            )
+        return concurrent
+
+    async def visit_async(self, node):
+        if type(node) is ast_z.CompoundNode:
+            return await self.visit_async_CompoundNode(node)
+        if type(node) is ast_z.ForLoopNode:
+            return await self.visit_async_ForLoopNode(node)
+        if type(node) is ast_z.IfNode:
+            return await self.visit_async_IfNode(node)
+        if type(node) is ast_z.AssignmentNode:
+            self.context[node.name] = await self.evaluate(node.value)
+            return None
+        return await self.evaluate(node)
+
+    async def visit_async_CompoundNode(self, node):
+        results = []
+        for run in self.runs(node):
+            if len(run) > 1:
+                results.extend(await asyncio.gather(
+                    *(self.visit_async(child) for child in run)
+                ))
+            else:
+                results.append(await self.visit_async(run[0]))
+        return ''.join(
+            res for res in map(format_value, results) if res is not None
+        )
+
+    async def visit_async_ForLoopNode(self, node):
+        items = list(await self.evaluate(node.arr))
+        name = node.var.name
+        if len(items) > 1 and self.is_concurrent(node):
+            # Each iteration binds the loop variable in a scope of its own,
+            # layered over this one.
+            interpreters = []
+            for item in items:
+                interpreter = AsyncInterpreterZ(
+                    self.ast, self.context, self.concurrent
+                )
+                interpreter.context[name] = item
+                interpreter.lazy_values = self.lazy_values
+                interpreters.append(interpreter)
+            results = await asyncio.gather(*(
+                interpreter.visit_async(node.block)
+                for interpreter in interpreters
+            ))
+            return ''.join(results)
+        result = []
+        previous = self.context.shadow(name)
+        for item in items:
+            self.context[name] = item
+            result.append(await self.visit_async(node.block))
+        self.context.restore(name, previous)
+        return ''.join(result)
+
+    async def visit_async_IfNode(self, node):
+        if await self.evaluate(node.condition):
+            return await self.visit_async(node.if_true)
+        elif node.if_false:
+            return await self.visit_async(node.if_false)
+        else:
+            return None
+
+    async def interpret_async(self):
+        return await self.visit_async(self.ast)
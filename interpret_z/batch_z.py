@@ -0,0 +1,140 @@
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import wait
+from itertools import islice
+
+from interpret_z.memo_z import memoize
+from interpret_z.template_z import TemplateZ
+
+
+# The template a pool worker renders, installed once per process by
+# _init_worker rather than pickled alongside every chunk.
+_worker_template = None
+
+
+def _init_worker(template):
+    global _worker_template
+    _worker_template = template
+
+
+def _render_chunk(index, contexts, memo_size=None, template=None):
+    # With `memo_size`, pure function calls are memoized across the chunk.
+    # `template` defaults to the one installed in this pool worker; renders
+    # in the calling process pass their own, so concurrent generators don't
+    # share it.
+    if template is None:
+        template = _worker_template
+    start = time.perf_counter()
+    if memo_size:
+        with memoize(memo_size) as memo:
+            outputs = [template.render(context) for context in contexts]
+        memo_hits = memo.hits
+    else:
+        outputs = [template.render(context) for context in contexts]
+        memo_hits = 0
+    return ChunkStatsZ(
+        index=index,
+        renders=len(outputs),
+        chars=sum(len(output) for output in outputs),
+        seconds=time.perf_counter() - start,
+        pid=os.getpid(),
+        memo_hits=memo_hits
+    ), outputs
+
+
+def _chunks(contexts, chunksize):
+    contexts = iter(contexts)
+    while True:
+        chunk = list(islice(contexts, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+
+class ChunkStatsZ:
+    def __init__(self, index, renders, chars, seconds, pid, memo_hits=0):
+        self.index = index
+        self.renders = renders
+        self.chars = chars
+        self.seconds = seconds
+        self.pid = pid
+        self.memo_hits = memo_hits
+
+    @property
+    def renders_per_second(self):
+        return self.renders / self.seconds if self.seconds else float('inf')
+
+    def __str__(self):
+        return '{class_name}(#{index}, {renders} renders, {rate:.0f}/s)'.format(
+            class_name=self.__class__.__name__,
+            index=self.index,
+            renders=self.renders,
+            rate=self.renders_per_second
+        )
+
+
+def iter_render_many(template, contexts, workers=None, chunksize=64,
+                     ordered=True, on_chunk=None, engine='closure',
+                     memo_size=None):
+    # Yields one output per context. At most two chunks per worker are in
+    # flight at any time, so `contexts` may be an arbitrarily long iterator.
+    # `memo_size` memoizes pure function calls within each chunk; see memo_z.
+    if not isinstance(template, TemplateZ):
+        template = TemplateZ(template, engine=engine)
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1:
+        for index, chunk in enumerate(_chunks(contexts, chunksize)):
+            stats, outputs = _render_chunk(index, chunk, memo_size, template)
+            if on_chunk is not None:
+                on_chunk(stats)
+            yield from outputs
+        return
+
+    max_pending = workers * 2
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(template,)
+    ) as executor:
+        pending = deque()
+        for index, chunk in enumerate(_chunks(contexts, chunksize)):
+            pending.append(executor.submit(
+                _render_chunk, index, chunk, memo_size
+            ))
+            if len(pending) >= max_pending:
+                yield from _drain(pending, ordered, on_chunk)
+        while pending:
+            yield from _drain(pending, ordered, on_chunk)
+
+
+def _drain(pending, ordered, on_chunk):
+    if ordered:
+        done = [pending.popleft()]
+    else:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            pending.remove(future)
+    for future in done:
+        stats, outputs = future.result()
+        if on_chunk is not None:
+            on_chunk(stats)
+        yield from outputs
+
+
+def render_many(template, contexts, workers=None, chunksize=64,
+                ordered=True, on_chunk=None, engine='closure',
+                memo_size=None):
+    return list(iter_render_many(
+        template,
+        contexts,
+        workers=workers,
+        chunksize=chunksize,
+        ordered=ordered,
+        on_chunk=on_chunk,
+        engine=engine,
+        memo_size=memo_size
+    ))
@@ -0,0 +1,112 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from interpret_z.template_z import TemplateZ
+
+
+def template_key(source):
+    # Sources given as UTF-8 bytes hash the same as the equivalent str.
+    if isinstance(source, str):
+        source = source.encode('utf-8')
+    return hashlib.sha1(source).hexdigest()
+
+
+class LRUCacheZ:
+    # Bounded by the summed weight of its entries (as computed by `sizeof`)
+    # rather than by their count. Values heavier than `max_size` are never
+    # stored.
+    def __init__(self, max_size, sizeof=None):
+        self.max_size = max_size
+        self.sizeof = sizeof or (lambda value: 1)
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        weight = self.sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self.size -= self._entries.pop(key)[1]
+            if weight > self.max_size:
+                return
+            self._entries[key] = (value, weight)
+            self.size += weight
+            while self.size > self.max_size:
+                _, (_, evicted_weight) = self._entries.popitem(last=False)
+                self.size -= evicted_weight
+                self.evictions += 1
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self.size = 0
+            elif key in self._entries:
+                self.size -= self._entries.pop(key)[1]
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'size': self.size,
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
+
+
+class TemplateCacheZ(LRUCacheZ):
+    # Entries are weighted by source length, so `max_size` is roughly the
+    # number of template characters kept resident.
+    # With a `disk_cache` (a DiskCacheZ), templates missing from memory are
+    # looked up on disk before being parsed, and newly parsed ones are
+    # written back.
+    def __init__(self, max_size=2 ** 26, disk_cache=None):
+        super().__init__(max_size, sizeof=lambda template: template.size)
+        self.disk_cache = disk_cache
+
+    def get_template(self, source, engine='interpreter', optimize=False):
+        key = (template_key(source), engine, optimize)
+        template = self.get(key)
+        if template is None:
+            template = self.load_template(source, engine, optimize)
+            self.put(key, template)
+        return template
+
+    def load_template(self, source, engine, optimize):
+        if self.disk_cache is None:
+            return TemplateZ(source, engine=engine, optimize=optimize)
+        ast = self.disk_cache.get(source, optimize)
+        if ast is not None:
+            return TemplateZ(source, engine=engine, optimize=optimize, ast=ast)
+        template = TemplateZ(source, engine=engine, optimize=optimize)
+        self.disk_cache.put(source, template.ast, optimize)
+        return template
+
+    def invalidate_template(self, source):
+        digest = template_key(source)
+        for key in [key for key in self._entries if key[0] == digest]:
+            self.invalidate(key)
+        if self.disk_cache is not None:
+            self.disk_cache.invalidate(source)
+
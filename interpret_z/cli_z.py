@@ -0,0 +1,205 @@
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+from interpret_z.batch_z import iter_render_many
+from interpret_z.precompile_z import precompile
+
+
+def read_contexts(lines):
+    # One JSON object per line; blank lines are skipped. Read lazily, so
+    # only the contexts in flight are held in memory.
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            context = json.loads(line)
+        except ValueError as error:
+            raise ValueError(
+                'Line %d of contexts is not valid JSON: %s' % (number, error)
+            )
+        if not isinstance(context, dict):
+            raise ValueError('Line %d of contexts is not an object' % number)
+        yield context
+
+
+class ThroughputZ:
+    def __init__(self):
+        self.renders = 0
+        self.bytes = 0
+        self.start = time.perf_counter()
+
+    def add(self, size):
+        self.renders += 1
+        self.bytes += size
+
+    def __str__(self):
+        seconds = time.perf_counter() - self.start
+        return (
+            '{renders} renders in {seconds:.2f}s: {rate:.0f} renders/s, '
+            '{mb_rate:.2f} MB/s'
+        ).format(
+            renders=self.renders,
+            seconds=seconds,
+            rate=self.renders / seconds if seconds else 0,
+            mb_rate=self.bytes / seconds / 2 ** 20 if seconds else 0
+        )
+
+
+def write_directory(outputs, directory, name_format, throughput):
+    directory.mkdir(parents=True, exist_ok=True)
+    for index, output in enumerate(outputs):
+        data = output.encode('utf-8')
+        (directory / name_format.format(index=index)).write_bytes(data)
+        throughput.add(len(data))
+
+
+def write_jsonl(outputs, out, throughput):
+    for index, output in enumerate(outputs):
+        out.write(json.dumps({'index': index, 'output': output}))
+        out.write('\n')
+        throughput.add(len(output.encode('utf-8')))
+
+
+def render_command(args):
+    source = Path(args.template).read_text(encoding='utf-8')
+    if args.contexts == '-':
+        lines = sys.stdin
+    else:
+        lines = open(args.contexts, encoding='utf-8')
+    throughput = ThroughputZ()
+    try:
+        outputs = iter_render_many(
+            source,
+            read_contexts(lines),
+            workers=args.workers,
+            chunksize=args.chunksize,
+            engine=args.engine,
+            memo_size=args.memo_size
+        )
+        if args.output_dir:
+            write_directory(
+                outputs, Path(args.output_dir), args.name, throughput
+            )
+        elif args.output == '-':
+            write_jsonl(outputs, sys.stdout, throughput)
+        else:
+            with open(args.output, 'w', encoding='utf-8') as out:
+                write_jsonl(outputs, out, throughput)
+    finally:
+        if lines is not sys.stdin:
+            lines.close()
+    if not args.quiet:
+        print(throughput, file=sys.stderr)
+    return 0
+
+
+def precompile_command(args):
+    def report(result):
+        if not result.ok:
+            print(result, file=sys.stderr)
+        elif args.verbose:
+            print(result)
+
+    start = time.perf_counter()
+    results, cache = precompile(
+        args.directory,
+        workers=args.workers,
+        optimize=args.optimize,
+        pattern=args.pattern,
+        on_result=report
+    )
+    seconds = time.perf_counter() - start
+    cache.save(args.output)
+    errors = [result for result in results if not result.ok]
+    print('{compiled} of {total} templates compiled in {seconds:.2f}s '
+          '({cpu:.2f}s of compile time), {errors} errors; wrote {path}'.format(
+        compiled=len(results) - len(errors),
+        total=len(results),
+        seconds=seconds,
+        cpu=sum(result.seconds for result in results),
+        errors=len(errors),
+        path=args.output
+    ))
+    slowest = sorted(
+        (result for result in results if result.ok),
+        key=lambda result: result.seconds,
+        reverse=True
+    )[:args.top]
+    if slowest:
+        print('Slowest:')
+        for result in slowest:
+            print('  %s' % result)
+    return 1 if errors else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='interpret_z')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    render = commands.add_parser(
+        'render',
+        help='render a template once per context in a JSONL stream'
+    )
+    render.add_argument('template', help='template file')
+    render.add_argument(
+        'contexts', nargs='?', default='-',
+        help='JSONL file of contexts, one object per line (default: stdin)'
+    )
+    output = render.add_mutually_exclusive_group()
+    output.add_argument(
+        '-o', '--output', default='-',
+        help='write {"index", "output"} JSONL here (default: stdout)'
+    )
+    output.add_argument(
+        '-d', '--output-dir',
+        help='write each output to its own file in this directory'
+    )
+    render.add_argument(
+        '--name', default='{index:06d}.html',
+        help='file name format for --output-dir (default: %(default)s)'
+    )
+    render.add_argument('-j', '--workers', type=int, default=None,
+                        help='worker processes (default: one per CPU)')
+    render.add_argument('--chunksize', type=int, default=64)
+    render.add_argument('--engine', default='closure')
+    render.add_argument('--memo-size', type=int, default=None,
+                        help='memoize pure function calls within each chunk')
+    render.add_argument('-q', '--quiet', action='store_true',
+                        help="don't print throughput")
+    render.set_defaults(run=render_command)
+
+    compile_all = commands.add_parser(
+        'precompile',
+        help='compile every template in a directory into a warm cache file'
+    )
+    compile_all.add_argument('directory', help='directory of templates')
+    compile_all.add_argument(
+        '-o', '--output', default='templates.izb',
+        help='warm cache file to write (default: %(default)s)'
+    )
+    compile_all.add_argument(
+        '--pattern', default='*',
+        help='only compile files whose names match this glob'
+    )
+    compile_all.add_argument('-j', '--workers', type=int, default=None,
+                             help='worker processes (default: one per CPU)')
+    compile_all.add_argument('--optimize', action='store_true',
+                             help='store optimized trees')
+    compile_all.add_argument('--top', type=int, default=5,
+                             help='list this many of the slowest templates')
+    compile_all.add_argument('-v', '--verbose', action='store_true',
+                             help='print every template with its compile time')
+    compile_all.set_defaults(run=precompile_command)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        return args.run(args)
+    except Exception as error:
+        print('interpret_z: %s' % error, file=sys.stderr)
+        return 1
@@ -0,0 +1,419 @@
+import operator
+
+from interpret_z import ast_z
+from interpret_z import ZephyrFuncs
+from interpret_z.compile_z import BIN_OPS
+from interpret_z.compile_z import BOOL_OPS
+from interpret_z.compile_z import op_name
+from interpret_z.interpret_z import InterpreterZ
+from interpret_z.interpret_z import format_value
+from interpret_z.lazy_z import resolve
+from interpret_z.template_z import TemplateZ
+
+try:
+    import numpy
+except ImportError: # NumPy is optional; columns may be plain lists.
+    numpy = None
+
+
+# Dtypes whose elements print and compute like the Python ints and floats a
+# row-by-row render sees. Other arrays are read as lists of Python values.
+FAST_DTYPES = ('int64', 'float64')
+
+# Integers this large may round when an operation converts them to float64.
+_FLOAT_EXACT = 2 ** 53
+
+# Integer results this large may have overflowed int64.
+_INT_SAFE = 2 ** 62
+
+
+def _is_array(values):
+    return numpy is not None and isinstance(values, numpy.ndarray)
+
+
+def _is_numeric_array(values):
+    return _is_array(values) and values.dtype.name in FAST_DTYPES
+
+
+def _python_values(values):
+    return values.tolist() if _is_array(values) else values
+
+
+def _numeric_arrays(left, right):
+    # Both operands as NumPy arrays, provided at least one already is one and
+    # the other is too or holds plain numbers; otherwise None.
+    left_is_array = _is_numeric_array(left)
+    right_is_array = _is_numeric_array(right)
+    if not (left_is_array or right_is_array):
+        return None
+    if not left_is_array:
+        if not all(type(v) in (int, float) for v in left):
+            return None
+        left = numpy.asarray(left)
+    if not right_is_array:
+        if not all(type(v) in (int, float) for v in right):
+            return None
+        right = numpy.asarray(right)
+    if not (_is_numeric_array(left) and _is_numeric_array(right)):
+        return None
+    return left, right
+
+
+def _largest(values):
+    return numpy.abs(values, dtype=numpy.float64).max(initial=0)
+
+
+def _vectorized(op, left, right):
+    # op over two numeric arrays, or None where that could differ from
+    # applying it to Python numbers row by row: division by zero (which
+    # raises), int64 overflow, and integers too large to be exact as floats.
+    ints = [values for values in (left, right) if values.dtype.kind == 'i']
+    if op is operator.truediv or len(ints) == 1:
+        # The integers are converted to float64.
+        if any(_largest(values) >= _FLOAT_EXACT for values in ints):
+            return None
+    if op is operator.truediv and not right.all():
+        return None
+    if len(ints) == 2 and op in (operator.add, operator.sub, operator.mul):
+        estimate = op(left.astype(numpy.float64), right.astype(numpy.float64))
+        if _largest(estimate) >= _INT_SAFE:
+            return None
+    # Python floats overflow to inf and nan silently too.
+    with numpy.errstate(over='ignore', invalid='ignore'):
+        return op(left, right)
+
+
+def _number(numbers, places=None):
+    # number() with one format string built per column instead of per call.
+    if len(numbers) == 0:
+        return []
+    if places is None or len(set(places)) == 1:
+        fmt = '{:.%sf}' % (places[0] if places else 0)
+        return [fmt.format(n) for n in numbers]
+    return [ZephyrFuncs['number'](n, p) for n, p in zip(numbers, places)]
+
+
+# Functions with a whole-column implementation: name => f(*arg_columns).
+COLUMN_FUNCS = {
+    'number': _number,
+}
+
+
+class RowContextZ:
+    # A mapping over one row of a ColumnarInterpreterZ's columns, for the
+    # nodes it hands to InterpreterZ one row at a time.
+    def __init__(self, interpreter, row):
+        self.interpreter = interpreter
+        self.row = row
+
+    def get(self, name, default=None):
+        column = self.interpreter.columns.get(name)
+        if column is None:
+            return default
+        value = column[self.row]
+        if numpy is not None and isinstance(value, numpy.generic):
+            value = value.item()
+        return default if value is None else value
+
+
+class ColumnarInterpreterZ:
+    # Renders one tree for many contexts at once. Contexts are given as
+    # columns (name => list or NumPy array, one entry per context) and every
+    # node is evaluated once per column of rows rather than once per row:
+    # `if` and ternary conditions partition the rows, foreach iterates by
+    # position across every row's array, and NumPy arrays get vectorized
+    # arithmetic and comparisons. The result is the list of strings
+    # InterpreterZ would produce row by row.
+    def __init__(self, ast, columns, length=None):
+        # `length`, the number of rows, is only needed without any columns.
+        self.ast = ast
+        self.columns = dict(columns)
+        lengths = {len(column) for column in self.columns.values()}
+        if length is not None:
+            lengths.add(length)
+        if len(lengths) > 1:
+            raise ValueError('Columns differ in length: %s' % sorted(lengths))
+        self.length = lengths.pop() if lengths else 0
+        self._owned = set()
+        self._methods = {}
+        # Lazy context values, memoized per row as each row's render would;
+        # see lazy_z.
+        self._lazy_values = {}
+
+    def column_for_write(self, name):
+        # Copy-on-write, so the caller's columns are never modified.
+        if name not in self._owned:
+            column = self.columns.get(name)
+            if column is None:
+                column = [None] * self.length
+            else:
+                column = list(column)
+            self.columns[name] = column
+            self._owned.add(name)
+        return self.columns[name]
+
+    def visit(self, node, rows):
+        cls = node.__class__
+        method = self._methods.get(cls)
+        if method is None:
+            method = getattr(
+                self,
+                'visit_{}'.format(cls.__name__),
+                self.visit_rowwise
+            )
+            self._methods[cls] = method
+        return method(node, rows)
+
+    def lazy_values(self, row):
+        memo = self._lazy_values.get(row)
+        if memo is None:
+            memo = self._lazy_values[row] = {}
+        return memo
+
+    def resolved(self, values, rows):
+        # `values` with lazy ones resolved, each with its own row's memo.
+        if not any(callable(value) for value in values):
+            return values
+        return [
+            resolve(value, self.lazy_values(row)) if callable(value) else value
+            for value, row in zip(values, rows)
+        ]
+
+    def visit_rowwise(self, node, rows):
+        values = []
+        for row in rows:
+            interpreter = InterpreterZ(node, RowContextZ(self, row))
+            interpreter.lazy_values = self.lazy_values(row)
+            values.append(interpreter.visit(node))
+        return values
+
+    def _split(self, values, rows):
+        truthy, falsy = [], []
+        truthy_pos, falsy_pos = [], []
+        for pos, (value, row) in enumerate(zip(values, rows)):
+            if value:
+                truthy.append(row)
+                truthy_pos.append(pos)
+            else:
+                falsy.append(row)
+                falsy_pos.append(pos)
+        return (truthy, truthy_pos), (falsy, falsy_pos)
+
+    def _merge(self, length, *parts):
+        result = [None] * length
+        for positions, values in parts:
+            for pos, value in zip(positions, _python_values(values)):
+                result[pos] = value
+        return result
+
+    def visit_ArrayNode(self, node, rows):
+        items = [
+            _python_values(self.visit(child, rows)) for child in node.arr
+        ]
+        return [list(row_items) for row_items in zip(*items)] if items else [
+            [] for _ in rows
+        ]
+
+    def visit_AssignmentNode(self, node, rows):
+        values = _python_values(self.visit(node.value, rows))
+        column = self.column_for_write(node.name)
+        for row, value in zip(rows, values):
+            column[row] = value
+        return [None] * len(rows)
+
+    def visit_BangNode(self, node, rows):
+        return [not value for value in self.visit(node.child, rows)]
+
+    def visit_BinOpNode(self, node, rows):
+        name = op_name(node.op)
+        if name not in BIN_OPS:
+            return self.visit_rowwise(node, rows)
+        op, str_op, eval_right = BIN_OPS[name]
+        left = self.visit(node.left, rows)
+        if _is_numeric_array(left):
+            right = self.visit(node.right, rows)
+            arrays = _numeric_arrays(left, right)
+            if arrays is not None:
+                result = _vectorized(op, *arrays)
+                if result is not None:
+                    return result
+            return [
+                op(l, r) for l, r in
+                zip(_python_values(left), _python_values(right))
+            ]
+
+        # A string left operand decides the result, mostly without looking
+        # at the right operand; only evaluate it where it's needed.
+        (str_rows, str_pos), (other_rows, other_pos) = self._split(
+            [type(value) is str for value in left],
+            rows
+        )
+        parts = []
+        if other_rows:
+            right = _python_values(self.visit(node.right, other_rows))
+            parts.append((other_pos, [
+                op(left[pos], r) for pos, r in zip(other_pos, right)
+            ]))
+        if str_rows:
+            right = self.visit(node.right, str_rows) if eval_right else (
+                [None] * len(str_rows)
+            )
+            parts.append((str_pos, [
+                str_op(left[pos], r) for pos, r in zip(str_pos, right)
+            ]))
+        return self._merge(len(rows), *parts)
+
+    def visit_BoolOpNode(self, node, rows):
+        name = op_name(node.op)
+        if name not in BOOL_OPS:
+            return self.visit_rowwise(node, rows)
+        op = BOOL_OPS[name]
+        left = self.visit(node.left, rows)
+        right = self.visit(node.right, rows)
+        arrays = _numeric_arrays(left, right)
+        if arrays is not None:
+            result = _vectorized(op, *arrays)
+            if result is not None:
+                return result
+        return [
+            op(l, r) for l, r in
+            zip(_python_values(left), _python_values(right))
+        ]
+
+    def visit_BoolStatementNode(self, node, rows):
+        name = op_name(node.op)
+        if name not in ('AND', 'OR'):
+            return self.visit_rowwise(node, rows)
+        left = self.visit(node.left, rows)
+        truthy, falsy = self._split(left, rows)
+        # `a && b` is b where a is truthy, `a || b` is b where a is falsy.
+        (right_rows, right_pos), (_, left_pos) = (
+            (truthy, falsy) if name == 'AND' else (falsy, truthy)
+        )
+        return self._merge(
+            len(rows),
+            (left_pos, [left[pos] for pos in left_pos]),
+            (right_pos, self.visit(node.right, right_rows) if right_rows else [])
+        )
+
+    def visit_CompoundNode(self, node, rows):
+        pieces = [[] for _ in rows]
+        for child in node.children:
+            if type(child) is ast_z.HtmlTextNode:
+                text = format_value(child.value)
+                for row_pieces in pieces:
+                    row_pieces.append(text)
+                continue
+            for row_pieces, value in zip(pieces, self.visit(child, rows)):
+                value = format_value(value)
+                if value is not None:
+                    row_pieces.append(value)
+        return [''.join(row_pieces) for row_pieces in pieces]
+
+    def _constant(self, node, rows):
+        return [node.value] * len(rows)
+
+    visit_ConstNode = _constant
+    visit_HtmlTextNode = _constant
+    visit_IntegerNode = _constant
+    visit_RealNode = _constant
+    visit_StringNode = _constant
+
+    def visit_DotNode(self, node, rows):
+        values = self.visit(node.var, rows)
+        keys = []
+        while type(node.prop) is ast_z.DotNode:
+            node = node.prop
+            keys.append(node.var.name)
+        keys.append(node.prop)
+        for key in keys:
+            values = self.resolved([value[key] for value in values], rows)
+        return values
+
+    def visit_ForLoopNode(self, node, rows):
+        arrays = [list(arr) for arr in self.visit(node.arr, rows)]
+        pieces = [[] for _ in rows]
+        name = node.var.name
+        # The loop variable is scoped to the loop: put back what it hid.
+        hidden = self.columns.get(name)
+        if hidden is not None:
+            hidden = [hidden[row] for row in rows]
+        longest = max((len(arr) for arr in arrays), default=0)
+        for index in range(longest):
+            active = [
+                pos for pos, arr in enumerate(arrays) if len(arr) > index
+            ]
+            active_rows = [rows[pos] for pos in active]
+            column = self.column_for_write(name)
+            for pos, row in zip(active, active_rows):
+                column[row] = arrays[pos][index]
+            for pos, value in zip(active, self.visit(node.block, active_rows)):
+                pieces[pos].append(value)
+        if longest:
+            column = self.column_for_write(name)
+            for pos, row in enumerate(rows):
+                column[row] = None if hidden is None else hidden[pos]
+        return [''.join(row_pieces) for row_pieces in pieces]
+
+    def visit_FuncNode(self, node, rows):
+        args = [self.visit(arg, rows) for arg in node.args]
+        column_func = COLUMN_FUNCS.get(node.func)
+        if column_func is not None:
+            return column_func(*args)
+        func = ZephyrFuncs[node.func]
+        if not args:
+            return [func() for _ in rows]
+        args = [_python_values(arg) for arg in args]
+        return [func(*row_args) for row_args in zip(*args)]
+
+    def _visit_branches(self, node, rows, if_false):
+        (true_rows, true_pos), (false_rows, false_pos) = self._split(
+            self.visit(node.condition, rows),
+            rows
+        )
+        parts = []
+        if true_rows:
+            parts.append((true_pos, self.visit(node.if_true, true_rows)))
+        if false_rows and if_false is not None:
+            parts.append((false_pos, self.visit(if_false, false_rows)))
+        return self._merge(len(rows), *parts)
+
+    def visit_IfNode(self, node, rows):
+        return self._visit_branches(node, rows, node.if_false or None)
+
+    def visit_TernaryNode(self, node, rows):
+        return self._visit_branches(node, rows, node.if_false)
+
+    def visit_SubscriptNode(self, node, rows):
+        values = self.visit(node.var, rows)
+        indexes = self.visit(node.idx, rows)
+        return self.resolved(
+            [value[idx] for value, idx in zip(values, indexes)],
+            rows
+        )
+
+    def visit_VarNode(self, node, rows):
+        column = self.columns.get(node.name)
+        if column is None:
+            raise Exception('Var %s referenced before assignment' % node.name)
+        if _is_array(column):
+            values = column[rows]
+            if _is_numeric_array(values):
+                return values
+            values = values.tolist()
+        else:
+            values = [column[row] for row in rows]
+        values = self.resolved(values, rows)
+        if any(value is None for value in values):
+            raise Exception('Var %s referenced before assignment' % node.name)
+        return values
+
+    def interpret(self):
+        return self.visit(self.ast, list(range(self.length)))
+
+
+def render_columns(template, columns, length=None):
+    # `template` is a TemplateZ or template source; see ColumnarInterpreterZ.
+    if isinstance(template, str):
+        template = TemplateZ(template)
+    return ColumnarInterpreterZ(template.ast, columns, length).interpret()
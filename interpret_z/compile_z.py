@@ -0,0 +1,420 @@
+import operator
+
+from interpret_z import ast_z
+from interpret_z.analyze_z import walk
+from interpret_z import ZephyrFuncs
+from interpret_z.interpret_z import NodeVisitor
+from interpret_z.interpret_z import format_value
+from interpret_z.lazy_z import lazy_values
+from interpret_z.lazy_z import resolve
+from interpret_z.memo_z import current_memo
+from interpret_z.scope_z import UNBOUND
+from interpret_z.scope_z import ScopeZ
+
+
+def _str_zero(left, right):
+    return 0
+
+
+def _str_concat(left, right):
+    return left + str(right)
+
+
+# op name => (operation on non-string left operand, operation on string left
+# operand, whether the right operand is evaluated for a string left operand).
+# MOD intentionally mirrors InterpreterZ.visit_BinOpNode.
+BIN_OPS = {
+    'MUL': (operator.mul, _str_zero, False),
+    'DIV': (operator.truediv, _str_zero, False),
+    'PLUS': (operator.add, _str_concat, True),
+    'MINUS': (operator.sub, _str_zero, False),
+    'MOD': (operator.sub, _str_zero, False),
+}
+
+BOOL_OPS = {
+    'EQEQ': operator.eq,
+    'NEQ': operator.ne,
+    'GTE': operator.ge,
+    'GT': operator.gt,
+    'LTE': operator.le,
+    'LT': operator.lt,
+}
+
+
+def op_name(op):
+    # Operators are stored on the tree as tokens whose type is either a
+    # TypesZ member or its name.
+    z_type = getattr(op, 'z_type', op)
+    return getattr(z_type, 'name', z_type)
+
+
+class CompilerZ(NodeVisitor):
+    # Turns an ast_z tree into nested closures, each taking the render
+    # context and returning exactly what InterpreterZ returns for the same
+    # node. Dispatch and operator lookup happen once, here, instead of on
+    # every render.
+    def __init__(self, ast):
+        self.ast = ast
+        # Templates that write variables render against a ScopeZ; reads of
+        # names they never write can skip its local layer.
+        self.written = written_names(ast)
+        self.loop_vars = [] # Variables of the loops being compiled
+
+    def compile(self):
+        return top_level(self.visit(self.ast), bool(self.written))
+
+    def generic_visit(self, node):
+        # Defer the failure to render time, where InterpreterZ raises it.
+        message = 'No visit method implemented for node class {}'.format(
+            node.__class__.__name__
+        )
+
+        def fail(context):
+            raise Exception(message)
+        return fail
+
+    def visit_ArrayNode(self, node):
+        items = [self.visit(child) for child in node.arr]
+
+        def array(context):
+            return [item(context) for item in items]
+        return array
+
+    def visit_AssignmentNode(self, node):
+        name = node.name
+        value = self.visit(node.value)
+
+        def assign(context):
+            context[name] = value(context)
+        return assign
+
+    def visit_BangNode(self, node):
+        child = self.visit(node.child)
+
+        def bang(context):
+            return not child(context)
+        return bang
+
+    def visit_BinOpNode(self, node):
+        name = op_name(node.op)
+        if name not in BIN_OPS:
+            return self.generic_visit(node)
+        op, str_op, eval_right = BIN_OPS[name]
+        left = self.visit(node.left)
+        right = self.visit(node.right)
+
+        if eval_right:
+            def bin_op(context):
+                left_val = left(context)
+                if type(left_val) is str:
+                    return str_op(left_val, right(context))
+                return op(left_val, right(context))
+        else:
+            def bin_op(context):
+                left_val = left(context)
+                if type(left_val) is str:
+                    return 0
+                return op(left_val, right(context))
+        return bin_op
+
+    def visit_BoolOpNode(self, node):
+        name = op_name(node.op)
+        if name not in BOOL_OPS:
+            return self.generic_visit(node)
+        op = BOOL_OPS[name]
+        left = self.visit(node.left)
+        right = self.visit(node.right)
+
+        def bool_op(context):
+            return op(left(context), right(context))
+        return bool_op
+
+    def visit_BoolStatementNode(self, node):
+        name = op_name(node.op)
+        left = self.visit(node.left)
+        right = self.visit(node.right)
+        if name == 'AND':
+            def bool_statement(context):
+                return left(context) and right(context)
+        elif name == 'OR':
+            def bool_statement(context):
+                return left(context) or right(context)
+        else:
+            return self.generic_visit(node)
+        return bool_statement
+
+    def visit_CompoundNode(self, node):
+        parts = []
+        for child in node.children:
+            if type(child) is ast_z.HtmlTextNode:
+                parts.append(format_value(child.value))
+            else:
+                parts.append(self.visit(child))
+        if all(type(part) is str for part in parts):
+            text = ''.join(parts)
+            return lambda context: text
+
+        def compound(context):
+            result = []
+            for part in parts:
+                if type(part) is str:
+                    result.append(part)
+                    continue
+                res = part(context)
+                if type(res) is str and res != 'True' and res != 'False':
+                    result.append(res)
+                else:
+                    res = format_value(res)
+                    if res is not None:
+                        result.append(res)
+            return ''.join(result)
+        return compound
+
+    def visit_DotNode(self, node):
+        var = self.visit(node.var)
+        keys = []
+        while type(node.prop) is ast_z.DotNode:
+            node = node.prop
+            keys.append(node.var.name)
+        keys.append(node.prop)
+        if len(keys) == 1:
+            key = keys[0]
+
+            def dot(context):
+                value = var(context)[key]
+                if callable(value):
+                    value = resolve(value, lazy_values.get())
+                return value
+        else:
+            def dot(context):
+                value = var(context)
+                for key in keys:
+                    value = value[key]
+                    if callable(value):
+                        value = resolve(value, lazy_values.get())
+                return value
+        return dot
+
+    def visit_ForLoopNode(self, node):
+        arr = self.visit(node.arr)
+        name = node.var.name
+        self.loop_vars.append(name)
+        block = self.visit(node.block)
+        self.loop_vars.pop()
+
+        def for_loop(context):
+            result = []
+            local = context.local
+            previous = context.shadow(name)
+            for item in arr(context):
+                local[name] = item
+                result.append(block(context))
+            context.restore(name, previous)
+            return ''.join(result)
+        return for_loop
+
+    def visit_FuncNode(self, node):
+        func = ZephyrFuncs[node.func]
+        name = node.func
+        args = [self.visit(arg) for arg in node.args]
+
+        def call(context):
+            memo = current_memo.get()
+            if memo is None:
+                return func(*[arg(context) for arg in args])
+            return memo.call(name, [arg(context) for arg in args])
+        return call
+
+    def visit_IfNode(self, node):
+        condition = self.visit(node.condition)
+        if_true = self.visit(node.if_true)
+        if_false = self.visit(node.if_false) if node.if_false else None
+
+        def if_statement(context):
+            if condition(context):
+                return if_true(context)
+            elif if_false is not None:
+                return if_false(context)
+            else:
+                return None
+        return if_statement
+
+    def _constant(self, node):
+        value = node.value
+        return lambda context: value
+
+    visit_ConstNode = _constant
+    visit_IntegerNode = _constant
+    visit_RealNode = _constant
+    visit_StringNode = _constant
+    visit_HtmlTextNode = _constant
+
+    def visit_SubscriptNode(self, node):
+        var = self.visit(node.var)
+        idx = self.visit(node.idx)
+
+        def subscript(context):
+            value = var(context)[idx(context)]
+            if callable(value):
+                value = resolve(value, lazy_values.get())
+            return value
+        return subscript
+
+    def visit_TernaryNode(self, node):
+        condition = self.visit(node.condition)
+        if_true = self.visit(node.if_true)
+        if_false = self.visit(node.if_false)
+
+        def ternary(context):
+            if condition(context):
+                return if_true(context)
+            else:
+                return if_false(context)
+        return ternary
+
+    def visit_VarNode(self, node):
+        name = node.name
+        if name in self.loop_vars:
+            # Bound in the scope's local layer for as long as its loop runs.
+            def var(context):
+                value = context.local[name]
+                if callable(value):
+                    value = resolve(value, lazy_values.get())
+                if value is None:
+                    raise Exception(
+                        'Var %s referenced before assignment' % name
+                    )
+                return value
+            return var
+        if name in self.written:
+            def var(context):
+                value = context.local.get(name, UNBOUND)
+                if value is UNBOUND:
+                    value = context.base.get(name)
+                if callable(value):
+                    value = resolve(value, lazy_values.get())
+                if value is None:
+                    raise Exception(
+                        'Var %s referenced before assignment' % name
+                    )
+                return value
+            return var
+        if self.written:
+            # Never written, so never in the scope's local layer.
+            def var(context):
+                value = context.base.get(name)
+                if callable(value):
+                    value = resolve(value, lazy_values.get())
+                if value is None:
+                    raise Exception(
+                        'Var %s referenced before assignment' % name
+                    )
+                return value
+            return var
+
+        def var(context):
+            value = context.get(name)
+            if callable(value):
+                value = resolve(value, lazy_values.get())
+            if value is None:
+                raise Exception('Var %s referenced before assignment' % name)
+            return value
+        return var
+
+
+def written_names(ast):
+    # The variables rendering `ast` may assign, loop variables included.
+    names = set()
+    for node in walk(ast):
+        if type(node) is ast_z.AssignmentNode:
+            names.add(node.name)
+        elif type(node) is ast_z.ForLoopNode:
+            names.add(node.var.name)
+    return frozenset(names)
+
+
+def top_level(render, scoped):
+    # Gives each call of `render` its own memo of lazy context values and,
+    # if `scoped`, its own ScopeZ for the variables the template writes.
+    def render_context(context):
+        token = lazy_values.set({})
+        try:
+            return render(ScopeZ(context) if scoped else context)
+        finally:
+            lazy_values.reset(token)
+    return render_context
+
+
+class SkeletonZ:
+    # A template flattened into its output skeleton: the top-level static
+    # text is formatted and merged ahead of time into a list of constants,
+    # with a placeholder for every dynamic child. Rendering copies the list,
+    # fills in the placeholders from their compiled closures and joins once.
+    # Only the top level is flattened; the output of nested blocks is itself
+    # formatted by InterpreterZ, so they stay whole.
+    def __init__(self, ast):
+        compiler = CompilerZ(ast)
+        parts = []
+        slots = []
+        for child in ast.children:
+            if type(child) is ast_z.HtmlTextNode:
+                text = format_value(child.value)
+                if parts and type(parts[-1]) is str:
+                    parts[-1] += text
+                else:
+                    parts.append(text)
+            else:
+                slots.append((len(parts), compiler.visit(child)))
+                parts.append(None)
+        self.parts = parts
+        self.slots = slots
+        self.scoped = bool(compiler.written)
+        # The same parts, encoded once for render_bytes.
+        self.encoded_parts = [
+            part.encode('utf-8') if part is not None else None
+            for part in parts
+        ]
+
+    @property
+    def static_size(self):
+        return sum(len(part) for part in self.parts if part is not None)
+
+    def render(self, context):
+        result = self.parts[:]
+        if self.scoped:
+            context = ScopeZ(context)
+        token = lazy_values.set({})
+        try:
+            for index, slot in self.slots:
+                res = slot(context)
+                if type(res) is str and res != 'True' and res != 'False':
+                    result[index] = res
+                else:
+                    result[index] = format_value(res) or ''
+        finally:
+            lazy_values.reset(token)
+        return ''.join(result)
+
+    def render_bytes(self, context, into=None):
+        # render(), as UTF-8. Only the dynamic slots are encoded per render.
+        # With `into` (a bytearray), the output is appended to it and its
+        # length in bytes returned.
+        result = self.encoded_parts[:]
+        if self.scoped:
+            context = ScopeZ(context)
+        token = lazy_values.set({})
+        try:
+            for index, slot in self.slots:
+                res = slot(context)
+                if type(res) is str and res != 'True' and res != 'False':
+                    result[index] = res.encode('utf-8')
+                else:
+                    result[index] = (format_value(res) or '').encode('utf-8')
+        finally:
+            lazy_values.reset(token)
+        if into is None:
+            return b''.join(result)
+        start = len(into)
+        for part in result:
+            into += part
+        return len(into) - start
@@ -1,4 +1,5 @@
 from enum import Enum
+from functools import lru_cache
 from urllib.parse import quote_plus 
 
 from interpret_z import TokenZ
@@ -12,14 +13,27 @@ def replace(s, old, new):
     return s.replace(old, new)
 
 
+@lru_cache(maxsize=32)
+def number_format(places):
+    return '{:.%sf}' % places
+
+
+def number(n, places=0):
+    return number_format(places).format(n)
+
+
 ZephyrFuncs = {
     'length': lambda t: len(t),
-    'number': lambda n, places=0: ('{:.%sf}' % places).format(n),
+    'number': number,
     'replace': replace,
     'substr': lambda string, start, end: string[start:end],
     'u': lambda text: quote_plus(text)
 }
 
+# Functions whose result depends only on their arguments, which the optimizer
+# may evaluate ahead of time.
+PureZephyrFuncs = frozenset(['length', 'number', 'replace', 'substr', 'u'])
+
 
 class TypesZ(Enum):
     AND = 'AND'
@@ -79,7 +93,40 @@ class ReservedKeywords(Enum):
 
     @classmethod
     def as_dict(cls):
-        return {
-            m.value: TokenZ(m.name, None)
-            for m in cls.__members__.values()
-        }
+        return dict(KeywordTokens)
+
+
+# Keyword and operator tokens carry no per-occurrence data, so the scanners
+# share these instances instead of allocating new ones.
+KeywordTokens = {
+    m.value: TokenZ(m.name, None)
+    for m in ReservedKeywords.__members__.values()
+}
+
+OperatorTokens = {
+    '{': TokenZ(TypesZ.LBRACE, '{'),
+    '}': TokenZ(TypesZ.RBRACE, '}'),
+    '(': TokenZ(TypesZ.LPAREN, '('),
+    ')': TokenZ(TypesZ.RPAREN, ')'),
+    '[': TokenZ(TypesZ.LBRACKET, '['),
+    ']': TokenZ(TypesZ.RBRACKET, ']'),
+    '.': TokenZ(TypesZ.DOT, '.'),
+    ',': TokenZ(TypesZ.COMMA, ','),
+    ':': TokenZ(TypesZ.COLON, ':'),
+    '?': TokenZ(TypesZ.QUESTION, '?'),
+    '+': TokenZ(TypesZ.PLUS, '+'),
+    '-': TokenZ(TypesZ.MINUS, '-'),
+    '*': TokenZ(TypesZ.MUL, '*'),
+    '%': TokenZ(TypesZ.MOD, '%'),
+    '/': TokenZ(TypesZ.DIV, '/'),
+    '<': TokenZ(TypesZ.LT, '<'),
+    '<=': TokenZ(TypesZ.LTE, '<='),
+    '>': TokenZ(TypesZ.GT, '>'),
+    '>=': TokenZ(TypesZ.GTE, '>='),
+    '=': TokenZ(TypesZ.EQ, '='),
+    '==': TokenZ(TypesZ.EQEQ, '=='),
+    '!': TokenZ(TypesZ.BANG, '!'),
+    '!=': TokenZ(TypesZ.NEQ, '!='),
+    '&&': TokenZ(TypesZ.AND, '&&'),
+    '||': TokenZ(TypesZ.OR, '||')
+}
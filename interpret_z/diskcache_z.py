@@ -0,0 +1,133 @@
+import os
+import tempfile
+
+from interpret_z import __version__
+from interpret_z import serial_z
+from interpret_z.cache_z import template_key
+
+
+class DiskCacheZ:
+    # Parsed templates stored one file per template under `directory`, so a
+    # fresh worker can skip scanning and parsing anything another process on
+    # the machine has already seen. Files are written atomically, verified by
+    # checksum on load, and the least recently used ones are removed once the
+    # directory grows past `max_size` bytes.
+    suffix = '.izt'
+
+    # Eviction after a write goes down to this fraction of max_size, so a
+    # full directory isn't rescanned on every write.
+    low_water = 0.75
+
+    def __init__(self, directory, max_size=2 ** 28):
+        self.directory = directory
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.corrupt = 0
+        # Size of the directory as of the last scan plus what this instance
+        # has written since, so writes don't each rescan the directory.
+        # Other processes' writes show up at the next scan.
+        self._size = None
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, source, optimize=False):
+        return os.path.join(
+            self.directory,
+            '{key}-{optimize}-{version}-{format}{suffix}'.format(
+                key=template_key(source),
+                optimize='o' if optimize else 'p',
+                version=__version__,
+                format=serial_z.FORMAT_VERSION,
+                suffix=self.suffix
+            )
+        )
+
+    def get(self, source, optimize=False):
+        path = self.path(source, optimize)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        try:
+            ast = serial_z.loads(data)
+        except serial_z.SerializationError:
+            self.corrupt += 1
+            self.misses += 1
+            self._remove(path)
+            return None
+        self.hits += 1
+        try:
+            os.utime(path) # Recency for eviction
+        except OSError:
+            pass
+        return ast
+
+    def put(self, source, ast, optimize=False):
+        data = serial_z.dumps(ast)
+        if len(data) > self.max_size:
+            return
+        fd, tmp_path = tempfile.mkstemp(
+            dir=self.directory,
+            suffix='.tmp'
+        )
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self.path(source, optimize))
+        except BaseException:
+            self._remove(tmp_path)
+            raise
+        if self._size is None:
+            self.evict()
+            return
+        self._size += len(data)
+        if self._size > self.max_size:
+            self.evict(int(self.max_size * self.low_water))
+
+    def evict(self, target=None):
+        # Removes the least recently used files until the directory holds at
+        # most `target` bytes, max_size by default.
+        if target is None:
+            target = self.max_size
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(self.suffix):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= target:
+                break
+            self._remove(path)
+            total -= size
+        self._size = total
+
+    def invalidate(self, source=None):
+        if source is not None:
+            for optimize in (False, True):
+                self._remove(self.path(source, optimize))
+            return
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(self.suffix):
+                self._remove(entry.path)
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'corrupt': self.corrupt
+        }
@@ -0,0 +1,270 @@
+import weakref
+from collections.abc import Mapping
+
+from interpret_z import ast_z
+from interpret_z.analyze_z import ANY
+from interpret_z.analyze_z import context_paths
+from interpret_z.analyze_z import eager_paths
+from interpret_z.analyze_z import merge_trees
+from interpret_z.analyze_z import path_tree
+from interpret_z.analyze_z import walk
+from interpret_z.cache_z import LRUCacheZ
+from interpret_z.cache_z import template_key
+from interpret_z.interpret_z import InterpreterZ
+from interpret_z.lazy_z import memoized
+from interpret_z.lazy_z import resolve
+
+
+_MISSING = object()
+
+# The key of a lazy value the render hasn't computed, where the fragment
+# might not read it; see FreezerZ.
+UNRESOLVED = ('unresolved',)
+
+
+def _eager_child(eager, key):
+    # The part of an eager tree (see FreezerZ) below `key`. Elements reached
+    # through ANY are never eager: a subscript reads only one of them.
+    if not eager or key == ANY:
+        return False
+    return eager.get(key, False)
+
+
+class FreezerZ:
+    # Turns context values into hashable keys for one render. Types are kept
+    # because values that compare equal can render differently (1, 1.0 and
+    # True). A lazy value is resolved through the render's `lazy_values`
+    # memo only where `eager`, a path tree of what the fragment reads
+    # whenever it runs, reaches it. Elsewhere a lazy value the render hasn't
+    # computed yet is keyed as UNRESOLVED, so a branch that doesn't run never
+    # computes it, and `complete` is cleared.
+    def __init__(self, lazy_values=None):
+        self.lazy_values = lazy_values
+        self.complete = True
+
+    def lazy(self, value, eager):
+        # Without a memo there is no telling what the render has read.
+        if eager is not False or self.lazy_values is None:
+            return resolve(value, self.lazy_values)
+        value = memoized(value, self.lazy_values, _MISSING)
+        if value is _MISSING:
+            self.complete = False
+        return value
+
+    def freeze(self, value, eager=False):
+        if callable(value):
+            value = self.lazy(value, eager)
+            if value is _MISSING:
+                return UNRESOLVED
+        if isinstance(value, dict):
+            return ('dict', frozenset(
+                (k, self.freeze(v)) for k, v in value.items()
+            ))
+        if isinstance(value, (list, tuple)):
+            return (type(value).__name__, tuple(self.freeze(v) for v in value))
+        try:
+            hash(value)
+        except TypeError:
+            return (type(value).__name__, repr(value))
+        return (type(value).__name__, value)
+
+    def freeze_paths(self, value, tree, eager=False):
+        # freeze(value), limited to what `tree` (see analyze_z.path_tree)
+        # reaches. Only the keys the tree names are looked up, so the cost
+        # doesn't grow with the rest of the context.
+        if callable(value):
+            value = self.lazy(value, eager)
+            if value is _MISSING:
+                return UNRESOLVED
+        if tree is None:
+            return self.freeze(value)
+        if isinstance(value, Mapping):
+            if ANY not in tree:
+                return ('dict', tuple(
+                    (key, self.freeze_paths(
+                        value.get(key, _MISSING),
+                        subtree,
+                        _eager_child(eager, key)
+                    ))
+                    for key, subtree in tree.items()
+                ))
+            frozen = []
+            for key, item in value.items():
+                subtree = tree[ANY]
+                if key in tree:
+                    subtree = merge_trees(subtree, tree[key])
+                frozen.append((key, self.freeze_paths(
+                    item, subtree, _eager_child(eager, key)
+                )))
+            return ('dict', frozenset(frozen))
+        if isinstance(value, (list, tuple)) and ANY in tree:
+            return (
+                type(value).__name__,
+                tuple(self.freeze_paths(item, tree[ANY]) for item in value)
+            )
+        return self.freeze(value)
+
+
+def freeze(value, lazy_values=None):
+    # A hashable stand-in for a context value; see FreezerZ.
+    return FreezerZ(lazy_values).freeze(value)
+
+
+class FragmentZ:
+    def __init__(self, index, node, paths):
+        self.index = index
+        self.node = node
+        self.paths = paths
+        # The parts a render runs, each keyed on its own paths: the
+        # branches of an if, whose condition is evaluated first, or a
+        # whole loop. Each part has its path tree and eager tree.
+        parts = [node.if_true, node.if_false] if (
+            type(node) is ast_z.IfNode
+        ) else [node]
+        self.trees = [
+            (path_tree(context_paths(part)), path_tree(eager_paths(part)))
+            if part else (None, None)
+            for part in parts
+        ]
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def label(self):
+        return '{}#{}'.format(self.node.__class__.__name__, self.index)
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def key(self, context, freezer=None, part=0):
+        tree, eager = self.trees[part]
+        return (part, (freezer or FreezerZ()).freeze_paths(
+            context, tree, eager
+        ))
+
+
+class FragmentPlanZ:
+    # The foreach and if blocks of a tree whose output depends only on the
+    # context paths they read, and so can be reused for any render where
+    # those paths hold the same values. Blocks that assign variables change
+    # the scope as they run and are left out.
+    def __init__(self, ast, name=''):
+        self.name = name
+        self.fragments = {}
+        for node in walk(ast):
+            if type(node) not in (ast_z.ForLoopNode, ast_z.IfNode):
+                continue
+            if self.cacheable(node):
+                self.fragments[id(node)] = FragmentZ(
+                    len(self.fragments),
+                    node,
+                    frozenset(context_paths(node))
+                )
+
+    def cacheable(self, node):
+        return not any(
+            type(child) is ast_z.AssignmentNode for child in walk(node)
+        )
+
+    def get(self, node):
+        return self.fragments.get(id(node))
+
+    def stats(self):
+        return {
+            fragment.label: {
+                'hits': fragment.hits,
+                'misses': fragment.misses,
+                'hit_rate': fragment.hit_rate,
+                'paths': sorted(fragment.paths)
+            }
+            for fragment in self.fragments.values()
+        }
+
+
+class FragmentCacheZ(LRUCacheZ):
+    # Rendered fragments, bounded by their total length in characters. One
+    # cache can serve any number of templates.
+    def __init__(self, max_size=2 ** 24):
+        super().__init__(max_size, sizeof=lambda output: len(output or '') + 1)
+        self._plans = weakref.WeakKeyDictionary()
+
+    def plan(self, template):
+        # Plans are named after the source so that every TemplateZ built
+        # from it shares entries.
+        plan = self._plans.get(template)
+        if plan is None:
+            name = (template_key(template.source), template.optimized)
+            plan = self._plans[template] = FragmentPlanZ(template.ast, name)
+        return plan
+
+    def render_template(self, template, context=None):
+        return CachingInterpreterZ(
+            template.ast,
+            context,
+            plan=self.plan(template),
+            cache=self
+        ).interpret()
+
+    def fragment_stats(self, template):
+        return self.plan(template).stats()
+
+    def render(self, plan, fragment, context, render, lazy_values=None,
+               part=0):
+        # `lazy_values` is the render's memo of lazy context values, which
+        # the key reads; see FreezerZ. `part` picks the branch of an if.
+        freezer = FreezerZ(lazy_values)
+        key = (plan.name, fragment.index, fragment.key(context, freezer, part))
+        output = self.get(key, _MISSING)
+        if output is not _MISSING:
+            fragment.hits += 1
+            return output
+        fragment.misses += 1
+        output = render()
+        if not freezer.complete:
+            # Lazy values the fragment read are resolved by now. Those still
+            # UNRESOLVED weren't read, so the output holds whatever they are.
+            key = (plan.name, fragment.index, fragment.key(
+                context, FreezerZ(lazy_values), part
+            ))
+        self.put(key, output)
+        return output
+
+
+class CachingInterpreterZ(InterpreterZ):
+    def __init__(self, ast, context=None, plan=None, cache=None):
+        super().__init__(ast, context)
+        self.plan = plan or FragmentPlanZ(ast)
+        self.cache = cache if cache is not None else FragmentCacheZ()
+
+    def _visit_fragment(self, node, visit, part=0):
+        fragment = self.plan.get(node)
+        if fragment is None:
+            return visit(node)
+        return self.cache.render(
+            self.plan,
+            fragment,
+            self.context,
+            lambda: visit(node),
+            self.lazy_values,
+            part
+        )
+
+    def visit_ForLoopNode(self, node):
+        return self._visit_fragment(node, super().visit_ForLoopNode)
+
+    def visit_IfNode(self, node):
+        if self.plan.get(node) is None:
+            return super().visit_IfNode(node)
+        # The condition is evaluated as it would be anyway, so the key only
+        # covers the branch that runs.
+        if self.visit(node.condition):
+            part, branch = 0, node.if_true
+        elif node.if_false:
+            part, branch = 1, node.if_false
+        else:
+            return None
+        return self._visit_fragment(
+            node, lambda node: self.visit(branch), part
+        )
@@ -1,11 +1,46 @@
 from interpret_z import ast_z
-from interpret_z import ZephyrFuncs
+from interpret_z.lazy_z import resolve
+from interpret_z.memo_z import call_func
+from interpret_z.scope_z import UNBOUND
+from interpret_z.scope_z import ScopeZ
 from interpret_z import TypesZ
 
+def format_value(res):
+    # As in InterpreterZ.visit_CompoundNode: booleans (and anything that
+    # prints like one) render lowercase, None renders nothing.
+    if res is None:
+        return None
+    res = str(res)
+    if res == 'True':
+        return 'true'
+    if res == 'False':
+        return 'false'
+    return res
+
+
+def lowercase_booleans(chunks):
+    # A block's output is rendered through format_value as a whole, so a
+    # block that prints exactly 'True' or 'False' is lowercased. Hold back
+    # short outputs until we know whether that applies.
+    held = []
+    held_length = 0
+    for chunk in chunks:
+        if held is None:
+            yield chunk
+            continue
+        held.append(chunk)
+        held_length += len(chunk)
+        if held_length > len('False'):
+            yield ''.join(held)
+            held = None
+    if held:
+        yield format_value(''.join(held))
+
+
 class NodeVisitor:
     def visit(self, node):
         method_name = 'visit_{}'.format(node.__class__.__name__)
-        method = getattr(self, method_name, 'generic_visit')
+        method = getattr(self, method_name, self.generic_visit)
         return method(node)
 
     def generic_visit(self, node):
@@ -18,7 +53,11 @@ class NodeVisitor:
 class InterpreterZ(NodeVisitor):
     def __init__(self, ast, context=None):
         self.ast = ast
-        self.context = context or {} 
+        # Writes go to a ScopeZ, leaving the caller's context untouched.
+        self.context = ScopeZ(context)
+        # Callables in the context are lazy values, computed on first read
+        # and memoized here for the rest of the render; see lazy_z.
+        self.lazy_values = {}
 
     def visit_ArrayNode(self, node):
         arr = []
@@ -92,26 +131,37 @@ class InterpreterZ(NodeVisitor):
                 visited_children.append(str(res))
         return ''.join(visited_children)
 
+    def visit_ConstNode(self, node):
+        return node.value
+
     def visit_DotNode(self, node):
         var = self.visit(node.var)
         while type(node.prop) is ast_z.DotNode:
             node = node.prop
             var = var[node.var.name]
-        return var[node.prop]
+            if callable(var):
+                var = resolve(var, self.lazy_values)
+        value = var[node.prop]
+        if callable(value):
+            value = resolve(value, self.lazy_values)
+        return value
 
     def visit_ForLoopNode(self, node):
         result = []
+        name = node.var.name
+        local = self.context.local
+        previous = self.context.shadow(name)
         for item in self.visit(node.arr):
-            self.context[node.var.name] = item
+            local[name] = item
             result.append(self.visit(node.block))
+        self.context.restore(name, previous)
         return ''.join(result)
 
     def visit_FuncNode(self, node):
         args = []
-        func = ZephyrFuncs[node.func]
         for arg in node.args:
             args.append(self.visit(arg))
-        return func(*args)
+        return call_func(node.func, args)
 
     def visit_IfNode(self, node):
         if self.visit(node.condition):
@@ -131,7 +181,10 @@ class InterpreterZ(NodeVisitor):
         return node.value
 
     def visit_SubscriptNode(self, node):
-        return self.visit(node.var)[self.visit(node.idx)]
+        value = self.visit(node.var)[self.visit(node.idx)]
+        if callable(value):
+            value = resolve(value, self.lazy_values)
+        return value
 
     def visit_TernaryNode(self, node):
         if self.visit(node.condition):
@@ -143,10 +196,58 @@ class InterpreterZ(NodeVisitor):
         return node.value
 
     def visit_VarNode(self, node):
-        value = self.context.get(node.name)
+        # ScopeZ.get, inlined.
+        scope = self.context
+        value = scope.local.get(node.name, UNBOUND)
+        if value is UNBOUND:
+            value = scope.base.get(node.name)
+        if callable(value):
+            value = resolve(value, self.lazy_values)
         if value is None:
             raise Exception('Var %s referenced before assignment' % node.name)
         return value 
 
+    def iter_visit(self, node):
+        if type(node) is ast_z.CompoundNode:
+            return self.iter_visit_CompoundNode(node)
+        if type(node) is ast_z.ForLoopNode:
+            return self.iter_visit_ForLoopNode(node)
+        if type(node) is ast_z.IfNode:
+            return self.iter_visit_IfNode(node)
+        return None
+
+    def iter_visit_CompoundNode(self, node):
+        for child in node.children:
+            chunks = self.iter_visit(child)
+            if chunks is not None:
+                for chunk in lowercase_booleans(chunks):
+                    if chunk:
+                        yield chunk
+                continue
+            res = format_value(self.visit(child))
+            if res:
+                yield res
+
+    def iter_visit_ForLoopNode(self, node):
+        name = node.var.name
+        local = self.context.local
+        previous = self.context.shadow(name)
+        for item in self.visit(node.arr):
+            local[name] = item
+            yield from self.iter_visit(node.block)
+        self.context.restore(name, previous)
+
+    def iter_visit_IfNode(self, node):
+        if self.visit(node.condition):
+            yield from self.iter_visit(node.if_true)
+        elif node.if_false:
+            yield from self.iter_visit(node.if_false)
+
     def interpret(self):
         return self.visit(self.ast)
+
+    def iter_interpret(self):
+        # Yields the output of interpret() piece by piece: static text and
+        # expression results are emitted as soon as they're produced instead
+        # of being joined into one string.
+        return self.iter_visit(self.ast)
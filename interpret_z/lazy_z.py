@@ -0,0 +1,39 @@
+from contextvars import ContextVar
+
+
+# Memo of lazy values for the compiled render in progress, installed by the
+# closures CompilerZ.compile returns. InterpreterZ keeps its own.
+lazy_values = ContextVar('lazy_values', default=None)
+
+
+class LazyZ:
+    # A context value computed the first time a render reads it:
+    #     {'orders': LazyZ(fetch_orders, user_id)}
+    # Any callable in a context is treated the same way; LazyZ only saves
+    # writing a lambda to bind arguments.
+    __slots__ = ('func', 'args', 'kwargs')
+
+    def __init__(self, func, *args, **kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+
+    def __call__(self):
+        return self.func(*self.args, **self.kwargs)
+
+
+def resolve(value, memo):
+    # The value of lazy `value`, computed at most once per `memo`. Entries
+    # hold on to the lazy object so its id can't be reused mid-render.
+    if memo is None:
+        return value()
+    entry = memo.get(id(value))
+    if entry is None:
+        entry = memo[id(value)] = (value, value())
+    return entry[1]
+
+
+def memoized(value, memo, default=None):
+    # The value of lazy `value` if `memo` already holds it, else `default`.
+    entry = memo.get(id(value)) if memo is not None else None
+    return default if entry is None else entry[1]
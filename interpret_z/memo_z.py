@@ -0,0 +1,82 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from interpret_z import PureZephyrFuncs
+from interpret_z import ZephyrFuncs
+
+
+_MISSING = object()
+
+# The memo of the batch being rendered, if any. Both engines look it up on
+# every function call, so renders outside `memoize()` pay one lookup.
+current_memo = ContextVar('current_memo', default=None)
+
+
+class FuncMemoZ:
+    # Results of pure ZephyrFuncs calls, keyed by function name and argument
+    # values, holding at most `max_size` of the most recently used. Calls
+    # with unhashable arguments (say, length() of a list) always run.
+    # A memo belongs to one batch on one thread, so unlike LRUCacheZ it
+    # takes no lock.
+    def __init__(self, max_size=4096):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.uncacheable = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def call(self, name, args):
+        func = ZephyrFuncs[name]
+        if name not in PureZephyrFuncs:
+            return func(*args)
+        # Types are part of the key: number(1) and number(True) differ.
+        key = (name, tuple(args), tuple(type(arg) for arg in args))
+        try:
+            result = self._entries.get(key, _MISSING)
+        except TypeError:
+            self.uncacheable += 1
+            return func(*args)
+        if result is not _MISSING:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+        self.misses += 1
+        result = func(*args)
+        self._entries[key] = result
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return result
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'uncacheable': self.uncacheable
+        }
+
+
+def call_func(name, args):
+    memo = current_memo.get()
+    if memo is None:
+        return ZephyrFuncs[name](*args)
+    return memo.call(name, args)
+
+
+@contextmanager
+def memoize(max_size=4096):
+    # Memoizes pure function calls made by renders inside the block:
+    #     with memoize() as memo:
+    #         outputs = [template.render(c) for c in contexts]
+    #     memo.stats()
+    memo = FuncMemoZ(max_size)
+    token = current_memo.set(memo)
+    try:
+        yield memo
+    finally:
+        current_memo.reset(token)
@@ -0,0 +1,170 @@
+from interpret_z import ast_z
+from interpret_z import PureZephyrFuncs
+from interpret_z import TypesZ
+from interpret_z.analyze_z import walk
+from interpret_z.interpret_z import InterpreterZ
+from interpret_z.interpret_z import NodeVisitor
+from interpret_z.interpret_z import format_value
+
+
+CONSTANT_NODES = (
+    ast_z.ConstNode,
+    ast_z.IntegerNode,
+    ast_z.RealNode,
+    ast_z.StringNode
+)
+
+
+def is_constant(node):
+    return type(node) in CONSTANT_NODES
+
+
+class OptimizerZ(NodeVisitor):
+    # Rewrites an ast_z tree into one that renders identically but does less
+    # work per render: constant expressions are folded into ConstNodes,
+    # statically decided if-branches are pruned and adjacent static text is
+    # merged. The input tree is left untouched.
+    def __init__(self, ast):
+        self.ast = ast
+
+    def optimize(self):
+        return self.visit(self.ast)
+
+    def generic_visit(self, node):
+        return node
+
+    def fold(self, node):
+        # Evaluating with an empty context raises as soon as a variable is
+        # read, so anything that evaluates cleanly depends only on constants.
+        # Runtime errors (say, division by zero) are left for render time.
+        if any(
+            type(child) is ast_z.FuncNode and child.func not in PureZephyrFuncs
+            for child in walk(node)
+        ):
+            return node
+        try:
+            value = InterpreterZ(node, {}).interpret()
+        except Exception:
+            return node
+        if isinstance(value, list):
+            return node # Each render must get its own list
+        return ast_z.ConstNode(value)
+
+    def visit_ArrayNode(self, node):
+        return ast_z.ArrayNode(arr=[self.visit(child) for child in node.arr])
+
+    def visit_AssignmentNode(self, node):
+        return ast_z.AssignmentNode(
+            name=node.name,
+            value=self.visit(node.value)
+        )
+
+    def visit_BangNode(self, node):
+        return self.fold(ast_z.BangNode(self.visit(node.child)))
+
+    def _visit_operator(self, node):
+        return self.fold(type(node)(
+            left=self.visit(node.left),
+            op=node.op,
+            right=self.visit(node.right)
+        ))
+
+    visit_BinOpNode = _visit_operator
+    visit_BoolOpNode = _visit_operator
+
+    def visit_BoolStatementNode(self, node):
+        left = self.visit(node.left)
+        if not is_constant(left):
+            return self.fold(ast_z.BoolStatementNode(
+                left=left,
+                op=node.op,
+                right=self.visit(node.right)
+            ))
+        # `a && b` is b when a is truthy, `a || b` is b when a is falsy.
+        if bool(left.value) == (node.op == TypesZ.AND):
+            return self.visit(node.right)
+        return left
+
+    def visit_CompoundNode(self, node):
+        children = []
+        for child in node.children:
+            child = self.visit(child)
+            if is_constant(child):
+                value = format_value(child.value)
+                if value is None:
+                    continue
+                child = ast_z.HtmlTextNode(value=value)
+            elif type(child) is ast_z.CompoundNode and all(
+                type(c) is ast_z.HtmlTextNode for c in child.children
+            ):
+                # A static block renders as its joined text, formatted once
+                # more by this compound.
+                value = format_value(''.join(c.value for c in child.children))
+                child = ast_z.HtmlTextNode(value=value)
+            if type(child) is not ast_z.HtmlTextNode:
+                children.append(child)
+                continue
+            child = ast_z.HtmlTextNode(value=format_value(child.value))
+            if child.value == '':
+                continue
+            if children and type(children[-1]) is ast_z.HtmlTextNode:
+                merged = children[-1].value + child.value
+                # Merged text reading 'True' or 'False' would be lowercased.
+                if merged not in ('True', 'False'):
+                    children[-1] = ast_z.HtmlTextNode(value=merged)
+                    continue
+            children.append(child)
+        return ast_z.CompoundNode(children=children)
+
+    def visit_DotNode(self, node):
+        return ast_z.DotNode(var=self.visit(node.var), prop=node.prop)
+
+    def visit_ForLoopNode(self, node):
+        return ast_z.ForLoopNode(
+            arr=self.visit(node.arr),
+            var=node.var,
+            block=self.visit(node.block)
+        )
+
+    def visit_FuncNode(self, node):
+        return self.fold(ast_z.FuncNode(
+            func=node.func,
+            args=[self.visit(arg) for arg in node.args]
+        ))
+
+    def visit_IfNode(self, node):
+        condition = self.visit(node.condition)
+        if_false = self.visit(node.if_false) if node.if_false else None
+        if is_constant(condition):
+            if condition.value:
+                return self.visit(node.if_true)
+            if if_false is None:
+                return ast_z.CompoundNode(children=[])
+            return if_false
+        return ast_z.IfNode(
+            condition=condition,
+            if_true=self.visit(node.if_true),
+            if_false=if_false
+        )
+
+    def visit_SubscriptNode(self, node):
+        return ast_z.SubscriptNode(
+            var=self.visit(node.var),
+            idx=self.visit(node.idx)
+        )
+
+    def visit_TernaryNode(self, node):
+        condition = self.visit(node.condition)
+        if is_constant(condition):
+            if condition.value:
+                return self.visit(node.if_true)
+            return self.visit(node.if_false)
+        return ast_z.TernaryNode(
+            condition=condition,
+            if_true=self.visit(node.if_true),
+            if_false=self.visit(node.if_false)
+        )
+
+
+def optimize(ast):
+    return OptimizerZ(ast).optimize()
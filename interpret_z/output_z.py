@@ -0,0 +1,90 @@
+import io
+import mmap
+import shutil
+import tempfile
+
+
+class SpillBufferZ:
+    # A write-only text sink that keeps output in memory until it grows past
+    # `threshold` bytes, then moves it to an anonymous temporary file. The
+    # encoded output is read back with `open()` (a binary file object),
+    # `view()` (a memoryview, or an mmap once spilled) or `getvalue()`.
+    def __init__(self, threshold=2 ** 24, encoding='utf-8', dir=None):
+        self.threshold = threshold
+        self.encoding = encoding
+        self.dir = dir
+        self.size = 0
+        self.file = None
+        self._chunks = []
+        self._view = None
+
+    @property
+    def spilled(self):
+        return self.file is not None
+
+    def write(self, text):
+        data = text.encode(self.encoding)
+        self.size += len(data)
+        if self.file is not None:
+            self.file.write(data)
+            return len(text)
+        self._chunks.append(data)
+        if self.size > self.threshold:
+            self.spill()
+        return len(text)
+
+    def spill(self):
+        if self.file is not None:
+            return
+        self.file = tempfile.TemporaryFile(dir=self.dir)
+        for chunk in self._chunks:
+            self.file.write(chunk)
+        self._chunks = []
+
+    def _contents(self):
+        if len(self._chunks) > 1:
+            self._chunks = [b''.join(self._chunks)]
+        return self._chunks[0] if self._chunks else b''
+
+    def open(self):
+        if self.file is None:
+            return io.BytesIO(self._contents())
+        self.file.flush()
+        handle = open(self.file.fileno(), 'rb', closefd=False)
+        handle.seek(0)
+        return handle
+
+    def view(self):
+        if self.file is None:
+            return memoryview(self._contents())
+        if self._view is None:
+            self.file.flush()
+            if self.size == 0:
+                return memoryview(b'')
+            self._view = mmap.mmap(
+                self.file.fileno(),
+                0,
+                access=mmap.ACCESS_READ
+            )
+        return self._view
+
+    def getvalue(self):
+        return bytes(self.view()).decode(self.encoding)
+
+    def copy_to(self, writer):
+        with self.open() as handle:
+            shutil.copyfileobj(handle, writer)
+
+    def close(self):
+        if self._view is not None:
+            self._view.close()
+            self._view = None
+        if self.file is not None:
+            self.file.close()
+        self._chunks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
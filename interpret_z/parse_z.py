@@ -1,3 +1,5 @@
+from collections import deque
+
 from interpret_z import ast_z
 from interpret_z import ReservedKeywords
 from interpret_z.const_z import TypesZ
@@ -6,9 +8,15 @@ class ParserZ:
     def __init__(self, sz):
         self.sz = sz
         self.pos = 0
-        self.tokens = []
+        self.tokens = iter(())
+        self.lookahead = deque() # Tokens peeked at but not yet consumed
         self.current_token = None
 
+    def next_token(self):
+        if self.lookahead:
+            return self.lookahead.popleft()
+        return next(self.tokens, None)
+
     def eat(self, token):
         if self.current_token != token:
             raise Exception('Expected type {}, got type {}'.format(
@@ -16,23 +24,25 @@ class ParserZ:
             )
         else:
             self.pos += 1
-            if self.pos >= len(self.tokens):
-                self.current_token = None
-            else:
-                self.current_token = self.tokens[self.pos]
+            self.current_token = self.next_token()
 
-    def peek(self):
-        peek_pos = self.pos + 1
-        if peek_pos >= len(self.tokens):
+    def offset(self):
+        # Source offset of the current token, if the scanner recorded one.
+        if self.current_token is None:
             return None
-        else:
-            return self.tokens[peek_pos]
+        return self.current_token.offset
+
+    def peek(self):
+        if not self.lookahead:
+            self.lookahead.append(next(self.tokens, None))
+        return self.lookahead[0]
 
     def parse(self):
-        self.tokens = self.sz.scan()
-        if len(self.tokens) >= 1:
-            self.current_token = self.tokens[0]
-        else:
+        # Tokens are pulled from the scanner as the parser needs them, so
+        # scanning and parsing proceed together.
+        self.tokens = iter(self.sz.tokens())
+        self.current_token = self.next_token()
+        if self.current_token is None:
             raise Exception('No tokens scanned')
 
         tree = self.compound()
@@ -44,6 +54,7 @@ class ParserZ:
         return tree
 
     def compound(self):
+        start = self.offset()
         children = []
         while self.current_token == TypesZ.HTML_OR_TEXT or (
             self.current_token == TypesZ.LBRACE and
@@ -57,16 +68,22 @@ class ParserZ:
                 children.append(self.zephyr())
             else:
                 children.append(self.html_or_text())
-        return ast_z.CompoundNode(children=children)
+        return ast_z.CompoundNode(children=children, pos=start)
 
     def html_or_text(self):
         value = self.current_token.value
+        start = self.offset()
         self.eat(TypesZ.HTML_OR_TEXT)
-        return ast_z.HtmlTextNode(value=value)
+        return ast_z.HtmlTextNode(value=value, pos=start)
     
     def zephyr(self):
+        start = self.offset()
         self.eat(TypesZ.LBRACE)
         node = self.statement()
+        if type(node) in (
+            ast_z.AssignmentNode, ast_z.ForLoopNode, ast_z.IfNode
+        ):
+            node.pos = start
         self.eat(TypesZ.RBRACE)
         return node
 
@@ -92,7 +109,8 @@ class ParserZ:
         return ast_z.ForLoopNode(
             arr=arr,
             var=var,
-            block=block
+            block=block,
+            pos=arr.pos
         )
 
     def assignment_statement(self):
@@ -105,10 +123,12 @@ class ParserZ:
             value = self.ternary_statement()
         return ast_z.AssignmentNode(
             name=token.value,
-            value=value
+            value=value,
+            pos=token.offset
         )
 
     def if_statement(self):
+        start = self.offset()
         self.eat(ReservedKeywords.IF)
         condition = self.ternary_statement()
         self.eat(TypesZ.RBRACE)
@@ -131,10 +151,12 @@ class ParserZ:
         return ast_z.IfNode(
             condition=condition,
             if_true=if_true,
-            if_false=if_false
+            if_false=if_false,
+            pos=start
         )
 
     def ternary_statement(self):
+        start = self.offset()
         node = self.boolean_statement()
         if self.current_token.z_type == TypesZ.QUESTION:
             self.eat(TypesZ.QUESTION)
@@ -144,11 +166,13 @@ class ParserZ:
             node = ast_z.TernaryNode(
                 condition=node,
                 if_true=if_true,
-                if_false=if_false
+                if_false=if_false,
+                pos=start
             )
         return node
 
     def boolean_statement(self):
+        start = self.offset()
         node = self.boolean()
         while self.current_token.z_type in (
             TypesZ.AND, TypesZ.OR
@@ -158,11 +182,13 @@ class ParserZ:
             node = ast_z.BoolStatementNode(
                 left=node,
                 op=op_type,
-                right=self.boolean()
+                right=self.boolean(),
+                pos=start
             )
         return node
 
     def boolean(self):
+        start = self.offset()
         node = self.expr()
         while self.current_token.z_type in (
             TypesZ.EQEQ,
@@ -177,11 +203,13 @@ class ParserZ:
             node = ast_z.BoolOpNode(
                 left=node,
                 op=op_type,
-                right=self.expr()
+                right=self.expr(),
+                pos=start
             )
         return node
 
     def expr(self):
+        start = self.offset()
         node = self.term()
         while self.current_token.z_type in (
             TypesZ.PLUS, TypesZ.MINUS
@@ -191,11 +219,13 @@ class ParserZ:
             node = ast_z.BinOpNode(
                 left=node,
                 op=op_type,
-                right=self.term()
+                right=self.term(),
+                pos=start
             )
         return node
 
     def term(self):
+        start = self.offset()
         node = self.factor()
         while self.current_token.z_type in (
             TypesZ.MUL, TypesZ.DIV, TypesZ.MOD
@@ -205,17 +235,19 @@ class ParserZ:
             node = ast_z.BinOpNode(
                 left=node,
                 op=op_type,
-                right=self.factor()
+                right=self.factor(),
+                pos=start
             )
         return node
 
     def factor(self):
         node = None
+        start = self.offset()
         if self.current_token == TypesZ.INTEGER:
-            node = ast_z.IntegerNode(self.current_token)
+            node = ast_z.IntegerNode(self.current_token, pos=start)
             self.eat(TypesZ.INTEGER)
         elif self.current_token == TypesZ.REAL:
-            node = ast_z.RealNode(self.current_token)
+            node = ast_z.RealNode(self.current_token, pos=start)
             self.eat(TypesZ.REAL)
         elif self.current_token == TypesZ.LPAREN:
             self.eat(TypesZ.LPAREN)
@@ -224,10 +256,11 @@ class ParserZ:
         elif self.current_token == TypesZ.BANG:
             self.eat(TypesZ.BANG)
             node = ast_z.BangNode(
-                self.boolean()
+                self.boolean(),
+                pos=start
             )
         elif self.current_token == TypesZ.STRING:
-            node = ast_z.StringNode(self.current_token)
+            node = ast_z.StringNode(self.current_token, pos=start)
             self.eat(TypesZ.STRING)
         elif self.current_token == TypesZ.VAR:
             node = self.var()
@@ -236,7 +269,8 @@ class ParserZ:
         return node
 
     def var(self):
-        node = ast_z.VarNode(name=self.current_token.value)
+        start = self.offset()
+        node = ast_z.VarNode(name=self.current_token.value, pos=start)
         self.eat(TypesZ.VAR)
         while self.current_token in (
             TypesZ.DOT, TypesZ.LBRACKET
@@ -245,20 +279,23 @@ class ParserZ:
                 self.eat(TypesZ.DOT)
                 node = ast_z.DotNode(
                     var=node,
-                    prop=self.current_token.value
+                    prop=self.current_token.value,
+                    pos=start
                 )
                 self.eat(TypesZ.VAR)
             else:
                 self.eat(TypesZ.LBRACKET)
                 node = ast_z.SubscriptNode(
                     var=node,
-                    idx=self.ternary_statement()
+                    idx=self.ternary_statement(),
+                    pos=start
                 )
                 self.eat(TypesZ.RBRACKET)
         return node
 
     def func(self):
         func = self.current_token.value
+        start = self.offset()
         args = []
         self.eat(TypesZ.FUNC)
         self.eat(TypesZ.LPAREN)
@@ -271,11 +308,13 @@ class ParserZ:
         self.eat(TypesZ.RPAREN)
         return ast_z.FuncNode(
             func=func,
-            args=args
+            args=args,
+            pos=start
         )
     
     def array(self):
         arr = []
+        start = self.offset()
         self.eat(TypesZ.LBRACKET)
         if self.current_token != TypesZ.RBRACKET:
             arr.append(self.ternary_statement())
@@ -283,5 +322,5 @@ class ParserZ:
                 self.eat(TypesZ.COMMA)
                 arr.append(self.ternary_statement())
         self.eat(TypesZ.RBRACKET)
-        return ast_z.ArrayNode(arr=arr)
+        return ast_z.ArrayNode(arr=arr, pos=start)
 
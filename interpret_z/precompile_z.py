@@ -0,0 +1,159 @@
+import fnmatch
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from interpret_z import serial_z
+from interpret_z.cache_z import template_key
+from interpret_z.compile_z import CompilerZ
+from interpret_z.optimize_z import optimize as optimize_ast
+from interpret_z.parse_z import ParserZ
+from interpret_z.scan_z import FastScannerZ
+
+
+class WarmCacheZ:
+    # Parsed templates loaded from one file written by precompile(), so a
+    # worker starts with every known template in a single read. Stands in
+    # for a DiskCacheZ as TemplateCacheZ.disk_cache; trees are decoded the
+    # first time they're asked for, and new ones are kept in memory only.
+    def __init__(self, entries=None):
+        # (template_key(source), optimize) => tree, encoded by serial_z
+        self.entries = entries if entries is not None else {}
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls(serial_z.loads_bundle(f.read()))
+
+    def save(self, path):
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(serial_z.dumps_bundle(self.entries))
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, source, optimize=False):
+        encoded = self.entries.get((template_key(source), optimize))
+        if encoded is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return serial_z.decode(encoded)
+
+    def put(self, source, ast, optimize=False):
+        self.entries[(template_key(source), optimize)] = serial_z.encode(ast)
+
+    def invalidate(self, source=None):
+        if source is None:
+            self.entries.clear()
+            return
+        for optimize in (False, True):
+            self.entries.pop((template_key(source), optimize), None)
+
+    def stats(self):
+        return {
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+
+class CompileResultZ:
+    def __init__(self, name, key, seconds, error=None):
+        self.name = name
+        self.key = key
+        self.seconds = seconds
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __str__(self):
+        if self.error is not None:
+            return '%s: %s' % (self.name, self.error)
+        return '%s: %.1fms' % (self.name, self.seconds * 1000)
+
+
+def _compile_file(path, name, optimize):
+    # Scans, parses and compiles one template, returning its result and its
+    # encoded tree (None on error).
+    start = time.perf_counter()
+    try:
+        with open(path, encoding='utf-8') as f:
+            source = f.read()
+        ast = ParserZ(FastScannerZ(source)).parse()
+        if optimize:
+            ast = optimize_ast(ast)
+        CompilerZ(ast).compile()
+    except Exception as error:
+        return CompileResultZ(
+            name,
+            None,
+            time.perf_counter() - start,
+            '%s: %s' % (error.__class__.__name__, error)
+        ), None
+    seconds = time.perf_counter() - start
+    return CompileResultZ(name, template_key(source), seconds), (
+        serial_z.encode(ast)
+    )
+
+
+def template_files(directory, pattern='*'):
+    # (path, name) for every file under `directory` whose name matches
+    # `pattern`, named by their path relative to it, in sorted order.
+    files = []
+    for root, dirs, names in os.walk(directory):
+        dirs.sort()
+        for name in sorted(names):
+            if fnmatch.fnmatch(name, pattern):
+                path = os.path.join(root, name)
+                files.append((
+                    path,
+                    os.path.relpath(path, directory).replace(os.sep, '/')
+                ))
+    return files
+
+
+def precompile(directory, workers=None, optimize=False, pattern='*',
+               chunksize=16, on_result=None):
+    # Compiles every template under `directory` across `workers` processes.
+    # Returns a CompileResultZ per file, as template_files orders them, and
+    # a WarmCacheZ holding every template that compiled; save() it for
+    # workers to load.
+    files = template_files(directory, pattern)
+    paths = [path for path, _ in files]
+    names = [name for _, name in files]
+    optimizes = [optimize] * len(files)
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1:
+        compiled = map(_compile_file, paths, names, optimizes)
+        return _collect(compiled, optimize, on_result)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        compiled = executor.map(
+            _compile_file, paths, names, optimizes, chunksize=chunksize
+        )
+        return _collect(compiled, optimize, on_result)
+
+
+def _collect(compiled, optimize, on_result):
+    results = []
+    cache = WarmCacheZ()
+    for result, encoded in compiled:
+        if encoded is not None:
+            cache.entries[(result.key, optimize)] = encoded
+        results.append(result)
+        if on_result is not None:
+            on_result(result)
+    return results, cache
@@ -0,0 +1,139 @@
+import time
+
+from interpret_z.interpret_z import InterpreterZ
+from interpret_z.parse_z import ParserZ
+from interpret_z.scan_z import FastScannerZ
+from interpret_z.source_z import SourceMapZ
+
+
+class NodeStatsZ:
+    __slots__ = ('node', 'calls', 'total', 'own')
+
+    def __init__(self, node):
+        self.node = node
+        self.calls = 0
+        self.total = 0.0 # Seconds, including nested nodes
+        self.own = 0.0 # Seconds spent in this node alone
+
+
+class ProfilingInterpreterZ(InterpreterZ):
+    # Records calls and time per node. Timing every visit slows rendering
+    # down several times over, so this is for finding hot spots only.
+    def __init__(self, ast, context=None, stats=None):
+        super().__init__(ast, context)
+        self.stats = stats if stats is not None else {}
+        self._nested = [] # Time spent in children of each open visit
+
+    def visit(self, node):
+        stats = self.stats.get(id(node))
+        if stats is None:
+            stats = self.stats[id(node)] = NodeStatsZ(node)
+        self._nested.append(0.0)
+        start = time.perf_counter()
+        try:
+            return super().visit(node)
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = self._nested.pop()
+            if self._nested:
+                self._nested[-1] += elapsed
+            stats.calls += 1
+            stats.total += elapsed
+            stats.own += elapsed - nested
+
+
+class ProfileZ:
+    def __init__(self, source, stats, renders):
+        self.source = source
+        self.source_map = SourceMapZ(source)
+        self.stats = stats
+        self.renders = renders
+
+    @property
+    def total(self):
+        return sum(entry.own for entry in self.stats.values())
+
+    def hot_spots(self, top=10):
+        # Nodes with a source position, most expensive first.
+        entries = [
+            entry for entry in self.stats.values() if entry.node.pos is not None
+        ]
+        entries.sort(key=lambda entry: entry.own, reverse=True)
+        return entries[:top]
+
+    def snippet(self, node, width=40):
+        line, column = self.source_map.line_col(node.pos)
+        text = self.source_map.line(line)[column - 1:]
+        return text if len(text) <= width else text[:width - 3] + '...'
+
+    def report(self, top=10):
+        total = self.total or 1.0
+        lines = [
+            '{} render(s), {:.3f} ms'.format(self.renders, self.total * 1000),
+            '{:>4} {:>9} {:<18} {:>8} {:>10} {:>10} {:>6}  {}'.format(
+                '#', 'line:col', 'node', 'calls', 'total ms', 'self ms',
+                'self%', 'source'
+            )
+        ]
+        for rank, entry in enumerate(self.hot_spots(top), 1):
+            lines.append(
+                '{:>4} {:>9} {:<18} {:>8} {:>10.3f} {:>10.3f} {:>5.1f}%  {}'.format(
+                    rank,
+                    '%d:%d' % self.source_map.line_col(entry.node.pos),
+                    entry.node.__class__.__name__,
+                    entry.calls,
+                    entry.total * 1000,
+                    entry.own * 1000,
+                    100 * entry.own / total,
+                    self.snippet(entry.node)
+                )
+            )
+        return '\n'.join(lines)
+
+    def annotate(self, top=5):
+        # The template source with the self time of each line in the margin
+        # and the `top` hot spots marked under the line they start on.
+        total = self.total or 1.0
+        per_line = {}
+        for entry in self.stats.values():
+            if entry.node.pos is not None:
+                line, _ = self.source_map.line_col(entry.node.pos)
+                per_line[line] = per_line.get(line, 0.0) + entry.own
+        markers = {}
+        for rank, entry in enumerate(self.hot_spots(top), 1):
+            line, column = self.source_map.line_col(entry.node.pos)
+            markers.setdefault(line, []).append((column, rank, entry))
+
+        lines = []
+        for number in range(1, len(self.source_map.line_starts) + 1):
+            own = per_line.get(number)
+            margin = '{:>9.3f} {:>5.1f}%'.format(
+                own * 1000, 100 * own / total
+            ) if own else ' ' * 16
+            lines.append('{} {:>5} | {}'.format(
+                margin, number, self.source_map.line(number)
+            ))
+            for column, rank, entry in sorted(markers.get(number, ())):
+                lines.append('{} {:>5} | {}^ #{} {} {:.3f} ms in {} call(s)'.format(
+                    ' ' * 16,
+                    '',
+                    ' ' * (column - 1),
+                    rank,
+                    entry.node.__class__.__name__,
+                    entry.own * 1000,
+                    entry.calls
+                ))
+        return '\n'.join(lines)
+
+
+def profile(source, contexts):
+    # Renders `source` once per context with a ProfilingInterpreterZ and
+    # returns the combined ProfileZ. The source is parsed afresh so that
+    # every node carries its position.
+    ast = ParserZ(FastScannerZ(source, positions=True)).parse()
+    stats = {}
+    renders = 0
+    for context in contexts:
+        ProfilingInterpreterZ(ast, context, stats).interpret()
+        renders += 1
+    return ProfileZ(source, stats, renders)
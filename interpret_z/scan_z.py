@@ -1,4 +1,8 @@
-from interpret_z import ReservedKeywords
+import mmap
+import re
+
+from interpret_z import KeywordTokens
+from interpret_z import OperatorTokens
 from interpret_z import TypesZ
 from interpret_z import ZephyrFuncs
 from interpret_z import TokenZ
@@ -6,18 +10,18 @@ from interpret_z import TokenZ
 
 class ScannerZ:
     char_to_token_dict = {
-        '(': TokenZ(TypesZ.LPAREN, '('),
-        ')': TokenZ(TypesZ.RPAREN, ')'),
-        '[': TokenZ(TypesZ.LBRACKET, '['),
-        ']': TokenZ(TypesZ.RBRACKET, ']'),
-        '.': TokenZ(TypesZ.DOT, '.'),
-        ',': TokenZ(TypesZ.COMMA, ','),
-        ':': TokenZ(TypesZ.COLON, ':'),
-        '?': TokenZ(TypesZ.QUESTION, '?'),
-        '+': TokenZ(TypesZ.PLUS, '+'),
-        '-': TokenZ(TypesZ.MINUS, '-'),
-        '*': TokenZ(TypesZ.MUL, '*'),
-        '%': TokenZ(TypesZ.MOD, '%'),
+        '(': OperatorTokens['('],
+        ')': OperatorTokens[')'],
+        '[': OperatorTokens['['],
+        ']': OperatorTokens[']'],
+        '.': OperatorTokens['.'],
+        ',': OperatorTokens[','],
+        ':': OperatorTokens[':'],
+        '?': OperatorTokens['?'],
+        '+': OperatorTokens['+'],
+        '-': OperatorTokens['-'],
+        '*': OperatorTokens['*'],
+        '%': OperatorTokens['%'],
         '/': 'id_div',
         '<': 'id_lt',
         '>': 'id_gt',
@@ -71,57 +75,57 @@ class ScannerZ:
         if result in ZephyrFuncs:
             return TokenZ(TypesZ.FUNC, result)
         else:
-            return ReservedKeywords.as_dict().get(result, TokenZ(TypesZ.VAR, result))
+            return KeywordTokens.get(result, TokenZ(TypesZ.VAR, result))
 
     def id_and(self):
         if self.peek() == '&':
             self.advance(2)
-            return TokenZ(TypesZ.AND, '&&')
+            return OperatorTokens['&&']
         raise NotImplemented('Binary operators haven\'t been implemented yet.')
 
     def id_bang(self):
         if self.peek() == '=':
             self.advance(2)
-            return TokenZ(TypesZ.NEQ, '!=')
+            return OperatorTokens['!=']
         else:
             self.advance()
-            return TokenZ(TypesZ.BANG, '!')
+            return OperatorTokens['!']
 
     def id_div(self):
         if self.lookback() == '{':
             return self.identify()
         else:
             self.advance()
-            return TokenZ(TypesZ.DIV, '/')
+            return OperatorTokens['/']
 
     def id_lt(self):
         if self.peek() == '=':
             self.advance(2)
-            return TokenZ(TypesZ.LTE, '<=')
+            return OperatorTokens['<=']
         else:
             self.advance()
-            return TokenZ(TypesZ.LT, '<')
+            return OperatorTokens['<']
 
     def id_eq(self):
         if self.peek() == '=':
             self.advance(2)
-            return TokenZ(TypesZ.EQEQ, '==')
+            return OperatorTokens['==']
         else:
             self.advance()
-            return TokenZ(TypesZ.EQ, '=')
+            return OperatorTokens['=']
 
     def id_gt(self):
         if self.peek() == '=':
             self.advance(2)
-            return TokenZ(TypesZ.GTE, '>=')
+            return OperatorTokens['>=']
         else:
             self.advance()
-            return TokenZ(TypesZ.GT, '>')
+            return OperatorTokens['>']
 
     def id_or(self):
         if self.peek() == '|':
             self.advance(2)
-            return TokenZ(TypesZ.OR, '||')
+            return OperatorTokens['||']
         raise NotImplemented('Binary operators haven\'t been implemented yet.')
 
     def number(self):
@@ -170,12 +174,12 @@ class ScannerZ:
         if self.current_char == '{':
             self.zephyr_mode = True
             self.advance()
-            return TokenZ(TypesZ.LBRACE, '{')
+            return OperatorTokens['{']
         
         if self.current_char == '}':
             self.zephyr_mode = False
             self.advance()
-            return TokenZ(TypesZ.RBRACE, '}')
+            return OperatorTokens['}']
 
         if not self.zephyr_mode:
             return self.html_or_text()
@@ -203,9 +207,253 @@ class ScannerZ:
             import pdb; pdb.set_trace()
             raise Exception('Invalid character: %s' % self.current_char)
 
-    def scan(self):
-        tokens = []
+    def tokens(self):
         while self.current_char is not None:
-            tokens.append(self.tokenize())
-        return tokens
+            yield self.tokenize()
+
+    def scan(self):
+        return list(self.tokens())
+
+
+
+class FastScannerZ:
+    # Emits the same token stream as ScannerZ, but jumps between braces with
+    # str.find and tokenizes Zephyr islands with a single regular expression
+    # instead of walking the text one character at a time.
+    zephyr_re = re.compile(r'''
+        (?P<space>\s+)
+      | (?P<brace>[{}])
+      | (?P<number>\d+(?:\.\d*)?)
+      | (?P<string>['"](?P<string_value>[^'"]*)['"]?)
+      | (?P<name>[^\W\d_]\w*)
+      | (?P<op>&&|\|\||!=|<=|>=|==|[()\[\].,:?+\-*%/<>=!&|])
+    ''', re.VERBOSE)
+    word_re = re.compile(r'\w*')
+
+    def __init__(self, text, positions=False):
+        # With `positions`, every token is a fresh TokenZ carrying its
+        # source offset, at the cost of the shared keyword and operator
+        # tokens.
+        self.text = text
+        self.pos = 0
+        self.start = 0 # Offset of the token most recently produced
+        self.positions = positions
+        self.zephyr_mode = False
+
+    def identify(self, name):
+        if name in ZephyrFuncs:
+            return TokenZ(TypesZ.FUNC, name)
+        keyword = KeywordTokens.get(name)
+        if keyword is not None:
+            return keyword
+        return TokenZ(TypesZ.VAR, name)
+
+    def html_or_text(self):
+        text = self.text
+        start = self.pos
+        end = text.find('{', start)
+        if end == -1:
+            end = len(text)
+        if end < len(text):
+            result = text[start:end]
+            if 'text/css' in result and '<style' in result and (
+                not result.endswith('</style>')
+            ):
+                # Good indication that this is CSS which should be skipped.
+                end = text.find('</style>', end)
+                end = len(text) if end == -1 else end + len('</style>')
+        self.pos = end
+        return TokenZ(TypesZ.HTML_OR_TEXT, text[start:end])
+
+    def zephyr(self, match):
+        kind = match.lastgroup
+        value = match.group()
+        if kind == 'number':
+            if value[-1] == '.':
+                raise Exception('Real val cannot terminate with \'.\'')
+            if '.' in value:
+                return TokenZ(TypesZ.REAL, float(value))
+            return TokenZ(TypesZ.INTEGER, int(value))
+        if kind == 'string':
+            return TokenZ(TypesZ.STRING, match.group('string_value'))
+        if kind == 'name':
+            return self.identify(value)
+        if value == '/' and self.text[match.start() - 1] == '{':
+            # Endfor or Endif
+            name = self.word_re.match(self.text, self.pos).group()
+            self.pos += len(name)
+            return self.identify(value + name)
+        if value == '&' or value == '|':
+            raise Exception('Binary operators haven\'t been implemented yet.')
+        return OperatorTokens[value]
+
+    def tokens(self):
+        if self.positions:
+            return self.positioned_tokens()
+        return self.raw_tokens()
+
+    def positioned_tokens(self):
+        for token in self.raw_tokens():
+            yield TokenZ(token.z_type, token.value, self.start)
+
+    def raw_tokens(self):
+        text = self.text
+        length = len(text)
+        match_zephyr = self.zephyr_re.match
+        op_to_token = OperatorTokens
+        while self.pos < length:
+            self.start = self.pos
+            if not self.zephyr_mode:
+                char = text[self.pos]
+                if char == '{':
+                    self.zephyr_mode = True
+                    self.pos += 1
+                    yield OperatorTokens['{']
+                elif char == '}':
+                    self.pos += 1
+                    yield OperatorTokens['}']
+                else:
+                    yield self.html_or_text()
+                continue
+
+            match = match_zephyr(text, self.pos)
+            if match is None:
+                raise Exception('Invalid character: %s' % text[self.pos])
+            self.pos = match.end()
+            kind = match.lastgroup
+            if kind == 'space':
+                continue
+            if kind == 'brace':
+                if match.group() == '{':
+                    yield OperatorTokens['{']
+                else:
+                    self.zephyr_mode = False
+                    yield OperatorTokens['}']
+            elif kind == 'op' and match.group() in op_to_token and (
+                match.group() != '/'
+            ):
+                yield op_to_token[match.group()]
+            else:
+                yield self.zephyr(match)
+
+    def scan(self):
+        return list(self.tokens())
+
+
+class BytesScannerZ(FastScannerZ):
+    # FastScannerZ over UTF-8 encoded bytes: a `bytes`, `bytearray`,
+    # `memoryview` or `mmap`. The buffer is never decoded as a whole; each
+    # static segment is decoded as it's reached, so a large template can be
+    # scanned straight from a memory-mapped file. Token offsets are byte
+    # offsets, and names must be ASCII.
+    zephyr_re = re.compile(
+        FastScannerZ.zephyr_re.pattern.encode('ascii'), re.VERBOSE
+    )
+    word_re = re.compile(rb'\w*')
+    lbrace_re = re.compile(rb'{')
+    style_end_re = re.compile(rb'</style>')
+    op_tokens = {
+        op.encode('ascii'): token for op, token in OperatorTokens.items()
+    }
+
+    @classmethod
+    def from_file(cls, path, positions=False):
+        # Scans the file through a read-only mmap, which stays open until
+        # the scanner is closed or collected.
+        with open(path, 'rb') as f:
+            try:
+                text = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError: # Empty files can't be mapped
+                text = b''
+        return cls(text, positions=positions)
+
+    def close(self):
+        if isinstance(self.text, mmap.mmap):
+            self.text.close()
+
+    def decode(self, start, end):
+        return str(self.text[start:end], 'utf-8')
+
+    def html_or_text(self):
+        text = self.text
+        start = self.pos
+        match = self.lbrace_re.search(text, start)
+        end = len(text) if match is None else match.start()
+        result = self.decode(start, end)
+        if match is not None and 'text/css' in result and (
+            '<style' in result
+        ) and not result.endswith('</style>'):
+            # Good indication that this is CSS which should be skipped.
+            match = self.style_end_re.search(text, end)
+            end = len(text) if match is None else match.end()
+            result = self.decode(start, end)
+        self.pos = end
+        return TokenZ(TypesZ.HTML_OR_TEXT, result)
+
+    def zephyr(self, match):
+        kind = match.lastgroup
+        if kind == 'number':
+            value = match.group().decode('ascii')
+            if value[-1] == '.':
+                raise Exception('Real val cannot terminate with \'.\'')
+            if '.' in value:
+                return TokenZ(TypesZ.REAL, float(value))
+            return TokenZ(TypesZ.INTEGER, int(value))
+        if kind == 'string':
+            return TokenZ(
+                TypesZ.STRING,
+                match.group('string_value').decode('utf-8')
+            )
+        value = match.group().decode('ascii')
+        if kind == 'name':
+            return self.identify(value)
+        if value == '/' and self.text[match.start() - 1] == ord('{'):
+            # Endfor or Endif
+            name = self.word_re.match(self.text, self.pos).group()
+            self.pos += len(name)
+            return self.identify(value + name.decode('ascii'))
+        if value == '&' or value == '|':
+            raise Exception('Binary operators haven\'t been implemented yet.')
+        return OperatorTokens[value]
+
+    def raw_tokens(self):
+        text = self.text
+        length = len(text)
+        match_zephyr = self.zephyr_re.match
+        op_to_token = self.op_tokens
+        lbrace = ord('{')
+        rbrace = ord('}')
+        while self.pos < length:
+            self.start = self.pos
+            if not self.zephyr_mode:
+                char = text[self.pos]
+                if char == lbrace:
+                    self.zephyr_mode = True
+                    self.pos += 1
+                    yield OperatorTokens['{']
+                elif char == rbrace:
+                    self.pos += 1
+                    yield OperatorTokens['}']
+                else:
+                    yield self.html_or_text()
+                continue
 
+            match = match_zephyr(text, self.pos)
+            if match is None:
+                raise Exception('Invalid character: %s' % chr(text[self.pos]))
+            self.pos = match.end()
+            kind = match.lastgroup
+            if kind == 'space':
+                continue
+            if kind == 'brace':
+                if match.group() == b'{':
+                    yield OperatorTokens['{']
+                else:
+                    self.zephyr_mode = False
+                    yield OperatorTokens['}']
+            elif kind == 'op' and match.group() in op_to_token and (
+                match.group() != b'/'
+            ):
+                yield op_to_token[match.group()]
+            else:
+                yield self.zephyr(match)
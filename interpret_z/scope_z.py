@@ -0,0 +1,59 @@
+from collections.abc import MutableMapping
+
+
+# Marks a name with no binding in ScopeZ.local.
+UNBOUND = object()
+
+
+class ScopeZ(MutableMapping):
+    # The variables of one render: assignments and loop variables are
+    # written to `local`, and reads fall through to `base`, which is never
+    # modified. One base context can so be shared by any number of
+    # renders, including concurrent ones, without being copied.
+    # `base` only needs a `get` method.
+    __slots__ = ('base', 'local')
+
+    def __init__(self, base=None):
+        self.base = {} if base is None else base
+        self.local = {}
+
+    def get(self, key, default=None):
+        value = self.local.get(key, UNBOUND)
+        if value is UNBOUND:
+            return self.base.get(key, default)
+        return value
+
+    def __getitem__(self, key):
+        value = self.get(key, UNBOUND)
+        if value is UNBOUND:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.local[key] = value
+
+    def __delitem__(self, key):
+        del self.local[key]
+
+    def __contains__(self, key):
+        return self.get(key, UNBOUND) is not UNBOUND
+
+    def __iter__(self):
+        yield from self.local
+        for key in self.base:
+            if key not in self.local:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def shadow(self, name):
+        # Called as a foreach binds `name`; hand the result to restore()
+        # when it ends, so the loop variable doesn't outlive its loop.
+        return self.local.get(name, UNBOUND)
+
+    def restore(self, name, previous):
+        if previous is UNBOUND:
+            self.local.pop(name, None)
+        else:
+            self.local[name] = previous
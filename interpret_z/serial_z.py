@@ -0,0 +1,114 @@
+import hashlib
+import marshal
+
+from interpret_z import ast_z
+from interpret_z import OperatorTokens
+from interpret_z import TypesZ
+from interpret_z.token_z import TokenZ
+
+
+# Bump whenever the encoding below or the shape of an ast_z node changes, so
+# stale serialized trees are rejected instead of misread.
+FORMAT_VERSION = 2
+
+MAGIC = b'IZT\x00'
+BUNDLE_MAGIC = b'IZB\x00'
+
+NODE_TYPES = sorted(
+    (
+        cls for cls in vars(ast_z).values()
+        if isinstance(cls, type) and cls.__module__ == ast_z.__name__
+    ),
+    key=lambda cls: cls.__name__
+)
+NODE_TAGS = {cls: tag for tag, cls in enumerate(NODE_TYPES)}
+TOKEN_TAG = -1
+
+
+class SerializationError(Exception):
+    pass
+
+
+def encode(obj):
+    # Nodes become (tag, *slots) tuples and operator tokens (TOKEN_TAG,
+    # type, value) tuples; lists and scalars are kept as they are.
+    cls = type(obj)
+    if cls in NODE_TAGS:
+        return (NODE_TAGS[cls],) + tuple(
+            encode(getattr(obj, slot)) for slot in cls.__slots__
+        )
+    if cls is TokenZ:
+        return (TOKEN_TAG, str(obj.z_type), obj.value)
+    if cls is list:
+        return [encode(item) for item in obj]
+    return obj
+
+
+def decode(obj):
+    if type(obj) is list:
+        return [decode(item) for item in obj]
+    if type(obj) is not tuple:
+        return obj
+    if obj[0] == TOKEN_TAG:
+        token = OperatorTokens.get(obj[2])
+        if token is not None and str(token.z_type) == obj[1]:
+            return token
+        return TokenZ(TypesZ[obj[1]], obj[2])
+    cls = NODE_TYPES[obj[0]]
+    node = cls.__new__(cls)
+    for slot, value in zip(cls.__slots__, obj[1:]):
+        setattr(node, slot, decode(value))
+    return node
+
+
+def dumps(ast):
+    payload = marshal.dumps((FORMAT_VERSION, encode(ast)))
+    return MAGIC + hashlib.sha1(payload).digest() + payload
+
+
+def loads(data):
+    header_length = len(MAGIC) + hashlib.sha1().digest_size
+    if data[:len(MAGIC)] != MAGIC:
+        raise SerializationError('Not a serialized interpret_z tree')
+    digest, payload = data[len(MAGIC):header_length], data[header_length:]
+    if hashlib.sha1(payload).digest() != digest:
+        raise SerializationError('Checksum mismatch')
+    try:
+        version, encoded = marshal.loads(payload)
+        if version != FORMAT_VERSION:
+            raise SerializationError(
+                'Format version %s, expected %s' % (version, FORMAT_VERSION)
+            )
+        return decode(encoded)
+    except SerializationError:
+        raise
+    except Exception as e:
+        raise SerializationError('Malformed tree: %s' % e)
+
+
+def dumps_bundle(entries):
+    # Many trees in one blob: `entries` maps marshallable keys to trees
+    # already passed through encode(), so they can be built in other
+    # processes and shipped as plain tuples.
+    payload = marshal.dumps((FORMAT_VERSION, entries))
+    return BUNDLE_MAGIC + hashlib.sha1(payload).digest() + payload
+
+
+def loads_bundle(data):
+    # The entries given to dumps_bundle, still encoded; decode() each tree
+    # when it's needed.
+    header_length = len(BUNDLE_MAGIC) + hashlib.sha1().digest_size
+    if data[:len(BUNDLE_MAGIC)] != BUNDLE_MAGIC:
+        raise SerializationError('Not a bundle of interpret_z trees')
+    digest, payload = data[len(BUNDLE_MAGIC):header_length], data[header_length:]
+    if hashlib.sha1(payload).digest() != digest:
+        raise SerializationError('Checksum mismatch')
+    try:
+        version, entries = marshal.loads(payload)
+    except Exception as e:
+        raise SerializationError('Malformed bundle: %s' % e)
+    if version != FORMAT_VERSION:
+        raise SerializationError(
+            'Format version %s, expected %s' % (version, FORMAT_VERSION)
+        )
+    return entries
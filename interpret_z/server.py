@@ -0,0 +1,5 @@
+# Entry point for `python -m interpret_z.server`; see server_z.
+from interpret_z.server_z import main
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,346 @@
+import argparse
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+from interpret_z.cache_z import TemplateCacheZ
+from interpret_z.diskcache_z import DiskCacheZ
+from interpret_z.precompile_z import WarmCacheZ
+from interpret_z.template_z import ENGINES
+
+
+# Endpoints with latency stats of their own; requests to any other path
+# share one entry, so stray paths can't grow the stats without bound.
+STATS_ENDPOINTS = ('POST /render', 'POST /render/batch')
+
+
+# Per worker process: the warm template cache and where named templates
+# live, installed by _init_worker.
+_worker_cache = None
+_worker_templates = None
+
+
+def _init_worker(templates_dir, disk_cache_dir, engine, preload,
+                 warm_cache=None):
+    global _worker_cache, _worker_templates
+    if warm_cache:
+        disk_cache = WarmCacheZ.load(warm_cache)
+    elif disk_cache_dir:
+        disk_cache = DiskCacheZ(disk_cache_dir)
+    else:
+        disk_cache = None
+    _worker_cache = TemplateCacheZ(disk_cache=disk_cache)
+    _worker_templates = TemplateDirectoryZ(templates_dir) if (
+        templates_dir
+    ) else None
+    if preload and _worker_templates is not None:
+        for name in _worker_templates.names():
+            _worker_cache.get_template(_worker_templates.source(name), engine)
+
+
+def _ping():
+    return os.getpid()
+
+
+def _render(name, source, contexts, engine):
+    if source is None:
+        if _worker_templates is None:
+            raise TemplateNotFoundZ('Server has no template directory')
+        source = _worker_templates.source(name)
+    template = _worker_cache.get_template(source, engine)
+    return [template.render(context) for context in contexts]
+
+
+class TemplateNotFoundZ(Exception):
+    pass
+
+
+class TemplateDirectoryZ:
+    # Template sources by name, a path relative to `directory`. Sources are
+    # reread only when their file changes.
+    def __init__(self, directory):
+        self.directory = Path(directory).resolve()
+        self._sources = {}
+
+    def path(self, name):
+        path = (self.directory / name).resolve()
+        if self.directory not in path.parents or not path.is_file():
+            raise TemplateNotFoundZ('No template named %s' % name)
+        return path
+
+    def source(self, name):
+        path = self.path(name)
+        mtime = path.stat().st_mtime_ns
+        cached = self._sources.get(name)
+        if cached is None or cached[0] != mtime:
+            cached = self._sources[name] = (
+                mtime, path.read_text(encoding='utf-8')
+            )
+        return cached[1]
+
+    def names(self):
+        return sorted(
+            str(path.relative_to(self.directory))
+            for path in self.directory.rglob('*') if path.is_file()
+        )
+
+
+class LatencyStatsZ:
+    # Latencies of the most recent `window` requests to each endpoint, for
+    # percentiles, plus running totals.
+    def __init__(self, window=10000):
+        self.window = window
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, seconds, error=False):
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                stats = self._endpoints[endpoint] = {
+                    'count': 0,
+                    'errors': 0,
+                    'latencies': deque(maxlen=self.window)
+                }
+            stats['count'] += 1
+            stats['errors'] += bool(error)
+            stats['latencies'].append(seconds)
+
+    def summary(self):
+        with self._lock:
+            endpoints = {
+                endpoint: (stats['count'], stats['errors'],
+                           sorted(stats['latencies']))
+                for endpoint, stats in self._endpoints.items()
+            }
+        result = {}
+        for endpoint, (count, errors, latencies) in endpoints.items():
+            result[endpoint] = {
+                'count': count,
+                'errors': errors,
+                'mean_ms': 1000 * sum(latencies) / len(latencies),
+                'max_ms': 1000 * latencies[-1],
+            }
+            for percentile in (50, 90, 99):
+                index = min(
+                    len(latencies) - 1,
+                    int(len(latencies) * percentile / 100)
+                )
+                result[endpoint]['p%d_ms' % percentile] = (
+                    1000 * latencies[index]
+                )
+        return result
+
+
+class RequestErrorZ(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class RenderHandlerZ(BaseHTTPRequestHandler):
+    # HTTP/1.1, so clients can keep a connection open and pipeline
+    # requests on it.
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.path == '/health':
+            self.respond(200, 'text/plain', b'ok')
+        elif self.path == '/stats':
+            self.respond_json(200, self.server.stats_summary())
+        else:
+            self.respond_json(404, {'error': 'Not found: %s' % self.path})
+
+    def do_POST(self):
+        endpoint = self.path
+        start = time.perf_counter()
+        error = True
+        try:
+            if endpoint == '/render':
+                request = self.read_json()
+                output = self.server.render(request, [request.get('context')])[0]
+                self.respond(200, 'text/html; charset=utf-8', output.encode('utf-8'))
+            elif endpoint == '/render/batch':
+                request = self.read_json()
+                contexts = request.get('contexts')
+                if not isinstance(contexts, list):
+                    raise RequestErrorZ(400, 'contexts must be a list')
+                self.respond_json(200, {
+                    'outputs': self.server.render(request, contexts)
+                })
+            else:
+                self.discard_body()
+                raise RequestErrorZ(404, 'Not found: %s' % endpoint)
+            error = False
+        except RequestErrorZ as request_error:
+            self.respond_json(request_error.status, {'error': str(request_error)})
+        except TemplateNotFoundZ as not_found:
+            self.respond_json(404, {'error': str(not_found)})
+        except Exception as render_error:
+            self.respond_json(500, {
+                'error': '%s: %s' % (
+                    render_error.__class__.__name__, render_error
+                )
+            })
+        finally:
+            endpoint = 'POST ' + endpoint
+            self.server.stats.record(
+                endpoint if endpoint in STATS_ENDPOINTS else 'other',
+                time.perf_counter() - start,
+                error
+            )
+
+    def read_json(self):
+        body = self.read_body()
+        try:
+            request = json.loads(body)
+        except ValueError:
+            raise RequestErrorZ(400, 'Body is not valid JSON')
+        if not isinstance(request, dict):
+            raise RequestErrorZ(400, 'Body must be a JSON object')
+        return request
+
+    def read_body(self):
+        length = self.headers.get('Content-Length')
+        if length is None:
+            raise RequestErrorZ(411, 'Content-Length required')
+        return self.rfile.read(int(length))
+
+    def discard_body(self):
+        length = self.headers.get('Content-Length')
+        if length:
+            self.rfile.read(int(length))
+
+    def respond_json(self, status, body):
+        self.respond(status, 'application/json', json.dumps(body).encode('utf-8'))
+
+    def respond(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class RenderServerZ(ThreadingHTTPServer):
+    # Accepts requests on threads and renders on a pool of `workers`
+    # processes, forked and warmed up before the first request. Each worker
+    # keeps parsed templates in its own TemplateCacheZ; with `disk_cache_dir`
+    # they share a DiskCacheZ too, so a template is parsed once per machine.
+    # A `warm_cache` file from precompile_z takes the place of the
+    # DiskCacheZ. Batch requests are split into chunks of `chunksize`
+    # contexts rendered in parallel.
+    daemon_threads = True
+
+    def __init__(self, address, workers=None, templates_dir=None,
+                 disk_cache_dir=None, engine='closure', preload=False,
+                 chunksize=64, verbose=False, warm_cache=None):
+        super().__init__(address, RenderHandlerZ)
+        self.workers = workers or os.cpu_count() or 1
+        self.engine = engine
+        self.chunksize = chunksize
+        self.verbose = verbose
+        self.started = time.time()
+        self.stats = LatencyStatsZ()
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(
+                templates_dir, disk_cache_dir, engine, preload, warm_cache
+            )
+        )
+        # Start every worker now rather than on first use.
+        self.pids = sorted(set(
+            future.result() for future in
+            [self.executor.submit(_ping) for _ in range(self.workers * 4)]
+        ))
+
+    def render(self, request, contexts):
+        name = request.get('name')
+        source = request.get('template')
+        if (name is None) == (source is None):
+            raise RequestErrorZ(400, 'Give exactly one of template or name')
+        engine = request.get('engine', self.engine)
+        if engine not in ENGINES:
+            raise RequestErrorZ(
+                400,
+                'Unknown engine %s, expected one of %s' % (
+                    engine, ', '.join(ENGINES)
+                )
+            )
+        futures = [
+            self.executor.submit(
+                _render,
+                name,
+                source,
+                contexts[start:start + self.chunksize],
+                engine
+            )
+            for start in range(0, len(contexts), self.chunksize)
+        ]
+        outputs = []
+        for future in futures:
+            outputs.extend(future.result())
+        return outputs
+
+    def stats_summary(self):
+        return {
+            'workers': self.workers,
+            'uptime_s': time.time() - self.started,
+            'endpoints': self.stats.summary()
+        }
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(cancel_futures=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m interpret_z.server',
+        description='Serve template renders over HTTP'
+    )
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=None,
+                        help='render processes (default: one per CPU)')
+    parser.add_argument('--templates', help='directory of named templates')
+    parser.add_argument('--preload', action='store_true',
+                        help='parse every named template at startup')
+    parser.add_argument('--disk-cache', help='directory for a shared DiskCacheZ')
+    parser.add_argument('--warm-cache',
+                        help='file written by `interpret_z precompile`')
+    parser.add_argument('--engine', default='closure', choices=ENGINES)
+    parser.add_argument('--chunksize', type=int, default=64)
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args(argv)
+
+    server = RenderServerZ(
+        (args.host, args.port),
+        workers=args.workers,
+        templates_dir=args.templates,
+        disk_cache_dir=args.disk_cache,
+        engine=args.engine,
+        preload=args.preload,
+        chunksize=args.chunksize,
+        verbose=args.verbose,
+        warm_cache=args.warm_cache
+    )
+    host, port = server.server_address[:2]
+    print('Serving on http://%s:%d with %d workers' % (host, port, server.workers))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,22 @@
+from bisect import bisect_right
+
+
+class SourceMapZ:
+    # Converts source offsets, as recorded on tokens and nodes, to 1-based
+    # line and column numbers.
+    def __init__(self, text):
+        self.text = text
+        self.line_starts = [0]
+        start = text.find('\n')
+        while start != -1:
+            self.line_starts.append(start + 1)
+            start = text.find('\n', start + 1)
+
+    def line_col(self, offset):
+        line = bisect_right(self.line_starts, offset)
+        return line, offset - self.line_starts[line - 1] + 1
+
+    def line(self, number):
+        start = self.line_starts[number - 1]
+        end = self.text.find('\n', start)
+        return self.text[start:] if end == -1 else self.text[start:end]
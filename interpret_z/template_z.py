@@ -0,0 +1,140 @@
+from interpret_z.analyze_z import context_paths
+from interpret_z.analyze_z import project_context
+from interpret_z.async_z import AsyncInterpreterZ
+from interpret_z.compile_z import CompilerZ
+from interpret_z.compile_z import SkeletonZ
+from interpret_z.interpret_z import InterpreterZ
+from interpret_z.optimize_z import optimize as optimize_ast
+from interpret_z.output_z import SpillBufferZ
+from interpret_z.parse_z import ParserZ
+from interpret_z.scan_z import BytesScannerZ
+from interpret_z.scan_z import FastScannerZ
+
+
+ENGINES = ('interpreter', 'closure', 'skeleton')
+
+
+class TemplateZ:
+    def __init__(self, source, engine='interpreter', optimize=False, ast=None):
+        # `ast` lets a tree parsed earlier (say, loaded from a DiskCacheZ) be
+        # reused; it must already be optimized if `optimize` is set.
+        # `source` may also be UTF-8 bytes, including a memoryview or mmap,
+        # which is scanned without decoding it whole.
+        if engine not in ENGINES:
+            raise ValueError('Unknown engine %s, expected one of %s' % (
+                engine, ', '.join(ENGINES)
+            ))
+        self.source = source
+        self.engine = engine
+        self.optimized = optimize
+        if ast is None:
+            if isinstance(source, str):
+                scanner = FastScannerZ(source)
+            else:
+                scanner = BytesScannerZ(source)
+            ast = ParserZ(scanner).parse()
+            if optimize:
+                ast = optimize_ast(ast)
+        self.ast = ast
+        self.skeleton = None
+        self.compiled = self.compile()
+        self._context_paths = None
+        self._concurrent = {} # See AsyncInterpreterZ
+
+    def __getstate__(self):
+        # Closures can't be pickled; ship the tree and recompile on arrival.
+        state = self.__dict__.copy()
+        state['compiled'] = None
+        state['skeleton'] = None
+        if not isinstance(self.source, (str, bytes)):
+            state['source'] = bytes(self.source)
+        state['_concurrent'] = {}
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.compiled = self.compile()
+        self._concurrent = {}
+
+    def compile(self):
+        if self.engine == 'closure':
+            return CompilerZ(self.ast).compile()
+        if self.engine == 'skeleton':
+            self.skeleton = SkeletonZ(self.ast)
+            return self.skeleton.render
+        return None
+
+    @property
+    def size(self):
+        return len(self.source)
+
+    @property
+    def context_paths(self):
+        # The context paths this template may read; see analyze_z.
+        if self._context_paths is None:
+            self._context_paths = frozenset(context_paths(self.ast))
+        return self._context_paths
+
+    def project(self, context):
+        # `context` trimmed down to what this template may read.
+        return project_context(context, self.context_paths)
+
+    def render(self, context=None, fragments=None):
+        # With `fragments` (a FragmentCacheZ) the template is interpreted,
+        # reusing cached output for blocks whose inputs haven't changed.
+        if fragments is not None:
+            return fragments.render_template(self, context)
+        if self.compiled is not None:
+            return self.compiled(context or {})
+        return InterpreterZ(self.ast, context).interpret()
+
+    def render_bytes(self, context=None, into=None):
+        # The output encoded as UTF-8, whichever engine the template was
+        # compiled for. Static top-level text is encoded once, in a SkeletonZ
+        # built on first use. See SkeletonZ.render_bytes for `into`.
+        if self.skeleton is None:
+            self.skeleton = SkeletonZ(self.ast)
+        return self.skeleton.render_bytes(context or {}, into)
+
+    async def render_async(self, context=None):
+        # Context values may be PendingZs from an async_z.LoaderZ; only the
+        # ones the render reads are fetched, in batches.
+        return await AsyncInterpreterZ(
+            self.ast, context, self._concurrent
+        ).interpret_async()
+
+    def iter_render(self, context=None):
+        # Streaming always goes through InterpreterZ, whichever engine the
+        # template was compiled for.
+        return InterpreterZ(self.ast, context).iter_interpret()
+
+    def render_to(self, writer, context=None, buffer_size=8192):
+        # Writes the output to `writer` (anything with a `write(str)` method)
+        # in pieces of roughly `buffer_size` characters. Returns the number
+        # of characters written.
+        written = 0
+        buffered = []
+        buffered_length = 0
+        for chunk in self.iter_render(context):
+            buffered.append(chunk)
+            buffered_length += len(chunk)
+            if buffered_length >= buffer_size:
+                writer.write(''.join(buffered))
+                written += buffered_length
+                buffered = []
+                buffered_length = 0
+        if buffered:
+            writer.write(''.join(buffered))
+            written += buffered_length
+        return written
+
+    def render_buffered(self, context=None, threshold=2 ** 24, dir=None):
+        # Renders into a SpillBufferZ, which moves to a temporary file once
+        # the output outgrows `threshold` bytes. The caller should close it.
+        buffer = SpillBufferZ(threshold=threshold, dir=dir)
+        try:
+            self.render_to(buffer, context, buffer_size=min(8192, threshold))
+        except BaseException:
+            buffer.close()
+            raise
+        return buffer
@@ -0,0 +1,104 @@
+import unittest
+
+from interpret_z import TemplateZ
+from interpret_z.analyze_z import context_paths
+from interpret_z.analyze_z import project_context
+
+
+class ContextPathsTestCase(unittest.TestCase):
+    def _assert_paths(self, text, expected):
+        self.assertEqual(context_paths(TemplateZ(text).ast), set(expected))
+
+    def test_vars_and_dots(self):
+        self._assert_paths(
+            '{user.name}{user.address.city}{x == 1 ? y : z}',
+            [('user', 'name'), ('user', 'address', 'city'),
+             ('x',), ('y',), ('z',)]
+        )
+        self._assert_paths('{user.name}{user}', [('user',)])
+
+    def test_subscripts(self):
+        self._assert_paths(
+            '{items[i].id}{length(tags)}',
+            [('items', '*', 'id'), ('i',), ('tags',)]
+        )
+
+    def test_assignments_shadow_context(self):
+        self._assert_paths('{x = 1}{x}', [])
+        self._assert_paths('{x}{x = 1}{x}', [('x',)])
+        self._assert_paths('{y = x.a}{y}', [('x', 'a')])
+
+    def test_conditional_assignments(self):
+        self._assert_paths('{if c}{x = 1}{/if}{x}', [('c',), ('x',)])
+        self._assert_paths(
+            '{if c}{x = 1}{else}{x = 2}{/if}{x}',
+            [('c',)]
+        )
+
+    def test_loops(self):
+        self._assert_paths(
+            '{foreach content.articles as a}{a.title}{/foreach}',
+            [('content', 'articles', '*', 'title')]
+        )
+        self._assert_paths(
+            '{foreach xs as x}<li>{/foreach}',
+            [('xs', '*')]
+        )
+        self._assert_paths(
+            '{foreach a.b as i}{foreach i.c as j}{j.d}{/foreach}{/foreach}',
+            [('a', 'b', '*', 'c', '*', 'd')]
+        )
+        # The loop may run zero times, so y may still come from the context.
+        self._assert_paths(
+            '{foreach xs as x}{y = x}{/foreach}{y}',
+            [('xs', '*'), ('y',)]
+        )
+        # Loop variables are scoped to their loop.
+        self._assert_paths(
+            '{foreach xs as x}{x.a}{/foreach}{x.b}',
+            [('xs', '*', 'a'), ('x', 'b')]
+        )
+
+
+class ProjectContextTestCase(unittest.TestCase):
+    def test_projection(self):
+        context = {
+            'user': {'name': 'n', 'email': 'e', 'prefs': {'a': 1}},
+            'content': {
+                'articles': [
+                    {'title': 't1', 'body': 'long'},
+                    {'title': 't2', 'body': 'long'}
+                ],
+                'ads': ['x']
+            },
+            'unused': 1
+        }
+        template = TemplateZ(
+            '{user.name}{foreach content.articles as a}{a.title}{/foreach}'
+        )
+        projected = template.project(context)
+        self.assertEqual(projected, {
+            'user': {'name': 'n'},
+            'content': {'articles': [{'title': 't1'}, {'title': 't2'}]}
+        })
+        self.assertEqual(
+            template.render(projected),
+            template.render(context)
+        )
+
+    def test_any_key(self):
+        self.assertEqual(
+            project_context(
+                {'d': {'a': {'x': 1, 'y': 2}, 'b': {'x': 3}}},
+                {('d', '*', 'x'), ('d', 'a', 'y')}
+            ),
+            {'d': {'a': {'x': 1, 'y': 2}, 'b': {'x': 3}}}
+        )
+        self.assertEqual(
+            project_context({'d': {'a': {'x': 1, 'y': 2}}}, {('d', '*', 'x')}),
+            {'d': {'a': {'x': 1}}}
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+import asyncio
+import unittest
+
+from interpret_z import LoaderZ
+from interpret_z import TemplateZ
+from interpret_z import render_async
+
+
+def loader(values, calls=None):
+    async def batch_fn(keys):
+        if calls is not None:
+            calls.append(list(keys))
+        await asyncio.sleep(0)
+        return [values[key] for key in keys]
+    return LoaderZ(batch_fn)
+
+
+class AsyncRenderTestCase(unittest.TestCase):
+    def test_matches_sync_render(self):
+        source = (
+            '{x = 2}{foreach xs as i}{i * x},{/foreach}{i}'
+            '{if x > 1}big{else}small{/if}{a.b.c}'
+        )
+        context = {'xs': [1, 2, 3], 'i': 'outer', 'a': {'b': {'c': 'd'}}}
+        template = TemplateZ(source)
+        self.assertEqual(
+            asyncio.run(template.render_async(dict(context))),
+            template.render(dict(context))
+        )
+
+    def test_loop_lookups_are_batched(self):
+        calls = []
+        stock = loader({'a': 1, 'b': 0, 'c': 5}, calls)
+        context = {
+            'products': [
+                {'sku': sku, 'stock': stock.load(sku)} for sku in 'abc'
+            ]
+        }
+        output = asyncio.run(render_async(
+            '{foreach products as p}{p.sku}={p.stock};{/foreach}',
+            context
+        ))
+        self.assertEqual(output, 'a=1;b=0;c=5;')
+        self.assertEqual(calls, [['a', 'b', 'c']])
+
+    def test_one_batch_per_level(self):
+        # Team names come from a second loader keyed by values of the first.
+        calls = []
+        teams = loader({'t': 'red', 'u': 'blue'}, calls)
+        users = loader({
+            1: {'name': 'ada', 'team': teams.load('t')},
+            2: {'name': 'bob', 'team': teams.load('u')}
+        }, calls)
+        output = asyncio.run(render_async(
+            '{a.name}/{a.team} {b.name}/{b.team}',
+            {'a': users.load(1), 'b': users.load(2)}
+        ))
+        self.assertEqual(output, 'ada/red bob/blue')
+        self.assertEqual(calls, [[1, 2], ['t', 'u']])
+
+    def test_expression_lookups_are_batched(self):
+        calls = []
+        values = loader({'a': 1, 'b': 2, 'c': 3, 'd': 'x', 'e': 'y'}, calls)
+        context = {key: values.load(key) for key in 'abcde'}
+        output = asyncio.run(render_async(
+            '{a + b + c}{number(a * b, 1)}{c > 2 ? d : e}', context
+        ))
+        self.assertEqual(output, '62.0x')
+        # The untaken ternary branch is only loaded if it's read.
+        self.assertEqual(calls, [['a', 'b', 'c'], ['d']])
+        calls.clear()
+        values = loader({'a': 1, 'b': 2, 'c': 3}, calls)
+        context = {key: values.load(key) for key in 'abc'}
+        self.assertEqual(
+            asyncio.run(render_async('{a + b + c}', context)), '6'
+        )
+        self.assertEqual(calls, [['a', 'b', 'c']])
+
+    def test_untouched_branches_are_not_loaded(self):
+        calls = []
+        recommendations = loader({'u1': ['x']}, calls)
+        context = {'logged_in': False, 'recs': recommendations.load('u1')}
+        output = asyncio.run(render_async(
+            '{if logged_in}{length(recs)}{else}guest{/if}', context
+        ))
+        self.assertEqual(output, 'guest')
+        self.assertEqual(calls, [])
+
+    def test_assignments_keep_order(self):
+        calls = []
+        prices = loader({'p': 10}, calls)
+        output = asyncio.run(render_async(
+            '{price = cost}{total = price + 1}{total}',
+            {'cost': prices.load('p')}
+        ))
+        self.assertEqual(output, '11')
+
+    def test_assignments_only_order_their_readers(self):
+        calls = []
+        values = loader({key: key.upper() for key in 'abcde'}, calls)
+        context = {key: values.load(key) for key in 'abcde'}
+        source = '{x = 1}{a}{b}{c}{y = d}{y}{x}{e}'
+        output = asyncio.run(render_async(source, context))
+        self.assertEqual(output, TemplateZ(source).render(
+            {key: key.upper() for key in 'abcde'}
+        ))
+        # {y} waits for {y = d}; everything else goes in the first batch.
+        self.assertEqual(calls, [['a', 'b', 'c', 'd'], ['e']])
+
+    def test_concurrent_renders_share_the_loop(self):
+        calls = []
+        names = loader({i: 'n%d' % i for i in range(4)}, calls)
+        template = TemplateZ('<p>{user}</p>')
+
+        async def main():
+            return await asyncio.gather(*(
+                template.render_async({'user': names.load(i)})
+                for i in range(4)
+            ))
+        self.assertEqual(
+            asyncio.run(main()),
+            ['<p>n0</p>', '<p>n1</p>', '<p>n2</p>', '<p>n3</p>']
+        )
+        self.assertEqual(calls, [[0, 1, 2, 3]])
+
+    def test_loader_errors_propagate(self):
+        async def batch_fn(keys):
+            raise KeyError('down')
+        failing = LoaderZ(batch_fn)
+        with self.assertRaises(KeyError):
+            asyncio.run(render_async('{x}', {'x': failing.load(1)}))
+
+    def test_max_batch(self):
+        calls = []
+        values = loader({i: i for i in range(5)}, calls)
+        values.max_batch = 2
+        output = asyncio.run(render_async(
+            '{foreach xs as x}{x}{/foreach}',
+            {'xs': [values.load(i) for i in range(5)]}
+        ))
+        self.assertEqual(output, '01234')
+        self.assertEqual(calls, [[0, 1], [2, 3], [4]])
+        self.assertEqual(values.stats(), {'batches': 3, 'keys': 5})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import pickle
+import unittest
+
+from interpret_z import TemplateZ
+from interpret_z import iter_render_many
+from interpret_z import render_many
+
+
+class RenderManyTestCase(unittest.TestCase):
+    template = '<p>{name}{if vip} (vip){/if}</p>'
+
+    def _contexts(self, count):
+        return [{'name': 'n%d' % i, 'vip': i % 3 == 0} for i in range(count)]
+
+    def _expected(self, count):
+        template = TemplateZ(self.template)
+        return [template.render(context) for context in self._contexts(count)]
+
+    def test_ordered(self):
+        stats = []
+        outputs = render_many(
+            self.template,
+            self._contexts(50),
+            workers=2,
+            chunksize=7,
+            on_chunk=stats.append
+        )
+        self.assertEqual(outputs, self._expected(50))
+        self.assertEqual(len(stats), 8)
+        self.assertEqual(sum(s.renders for s in stats), 50)
+        self.assertEqual([s.index for s in stats], list(range(8)))
+
+    def test_unordered(self):
+        outputs = render_many(
+            self.template,
+            iter(self._contexts(30)),
+            workers=2,
+            chunksize=4,
+            ordered=False
+        )
+        self.assertEqual(sorted(outputs), sorted(self._expected(30)))
+
+    def test_in_process(self):
+        outputs = iter_render_many(
+            TemplateZ(self.template, engine='interpreter'),
+            self._contexts(5),
+            workers=1
+        )
+        self.assertEqual(list(outputs), self._expected(5))
+
+    def test_interleaved_in_process(self):
+        contexts = [{'x': i} for i in range(4)]
+        outputs = zip(
+            iter_render_many('A{x}', contexts, workers=1, chunksize=1),
+            iter_render_many('B{x}', contexts, workers=1, chunksize=1)
+        )
+        self.assertEqual(
+            list(outputs),
+            [('A%d' % i, 'B%d' % i) for i in range(4)]
+        )
+
+    def test_template_pickles(self):
+        template = TemplateZ(self.template, engine='closure')
+        clone = pickle.loads(pickle.dumps(template))
+        self.assertEqual(
+            clone.render({'name': 'x', 'vip': True}),
+            template.render({'name': 'x', 'vip': True})
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
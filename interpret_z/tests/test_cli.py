@@ -0,0 +1,93 @@
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from interpret_z.cli_z import main
+
+
+class RenderCommandTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.template = self._write('t.z', 'Hi {name}{if vip}!{/if}')
+        self.contexts = self._write('c.jsonl', ''.join(
+            json.dumps({'name': 'n%d' % i, 'vip': i % 2 == 0}) + '\n'
+            for i in range(10)
+        ) + '\n')
+        self.expected = [
+            'Hi n%d%s' % (i, '!' if i % 2 == 0 else '') for i in range(10)
+        ]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _write(self, name, text):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w') as f:
+            f.write(text)
+        return path
+
+    def _main(self, *argv):
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            code = main(list(argv))
+        return code, stderr.getvalue()
+
+    def test_jsonl_output(self):
+        output = os.path.join(self.directory.name, 'out.jsonl')
+        code, stderr = self._main(
+            'render', self.template, self.contexts, '-o', output,
+            '-j', '2', '--chunksize', '3'
+        )
+        self.assertEqual(code, 0)
+        self.assertIn('10 renders', stderr)
+        self.assertIn('MB/s', stderr)
+        with open(output) as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual([line['index'] for line in lines], list(range(10)))
+        self.assertEqual([line['output'] for line in lines], self.expected)
+
+    def test_directory_output_from_stdin(self):
+        output_dir = os.path.join(self.directory.name, 'out')
+        with open(self.contexts) as contexts, \
+                mock.patch('sys.stdin', io.StringIO(contexts.read())):
+            code, stderr = self._main(
+                'render', self.template, '-d', output_dir,
+                '--name', '{index}.txt', '-j', '1', '-q'
+            )
+        self.assertEqual((code, stderr), (0, ''))
+        self.assertEqual(len(os.listdir(output_dir)), 10)
+        with open(os.path.join(output_dir, '3.txt')) as f:
+            self.assertEqual(f.read(), self.expected[3])
+
+    def test_bad_context(self):
+        contexts = self._write('bad.jsonl', '{"name": "a"}\n{oops\n')
+        output = os.path.join(self.directory.name, 'out.jsonl')
+        code, stderr = self._main(
+            'render', self.template, contexts, '-o', output, '-j', '1'
+        )
+        self.assertEqual(code, 1)
+        self.assertIn('Line 2 of contexts', stderr)
+
+    def test_module_entry_point(self):
+        result = subprocess.run(
+            [sys.executable, '-m', 'interpret_z', 'render', self.template,
+             self.contexts, '-j', '1', '-q'],
+            capture_output=True,
+            text=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(
+            json.loads(result.stdout.splitlines()[0])['output'],
+            self.expected[0]
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,206 @@
+import unittest
+
+from interpret_z import TemplateZ
+from interpret_z.columnar_z import ColumnarInterpreterZ
+from interpret_z.columnar_z import render_columns
+from interpret_z.lazy_z import LazyZ
+from interpret_z.tests import test_interpreter
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class SingleRowColumnarTestCase(test_interpreter.InterpreterTestCase):
+    # Runs every interpreter test case as a one-row table.
+    def _get_interpreted_result(self, text, context):
+        columns = {name: [value] for name, value in (context or {}).items()}
+        return render_columns(TemplateZ(text), columns, length=1)[0]
+
+
+class ColumnarInterpreterZTestCase(unittest.TestCase):
+    def _assert_matches_rows(self, text, rows):
+        template = TemplateZ(text)
+        names = {name for row in rows for name in row}
+        columns = {name: [row.get(name) for row in rows] for name in names}
+        self.assertEqual(
+            render_columns(template, columns),
+            [template.render(dict(row)) for row in rows]
+        )
+
+    def test_divergent_branches(self):
+        self._assert_matches_rows(
+            '<p>{user.name}</p>'
+            '{if user.country == \'US\'}${number(price, 2)}'
+            '{else if user.country == \'FR\'}{number(price * 0.9, 1)} EUR'
+            '{else}{price}{/if}'
+            '{user.vip ? \'!\' : \'.\'}{user.vip && price > 10}',
+            [
+                {'user': {'name': 'a', 'country': 'US', 'vip': 1}, 'price': 3},
+                {'user': {'name': 'b', 'country': 'FR', 'vip': 0}, 'price': 30},
+                {'user': {'name': 'c', 'country': 'DE', 'vip': 1}, 'price': 12.5},
+            ]
+        )
+
+    def test_loops_of_different_lengths(self):
+        self._assert_matches_rows(
+            '{total = 0}{foreach items as i}'
+            '<li>{i.name}{total = total + i.qty}</li>{/foreach}'
+            '{total}{length(items) > 1 ? \'many\' : \'few\'}',
+            [
+                {'items': []},
+                {'items': [{'name': 'x', 'qty': 2}]},
+                {'items': [{'name': 'y', 'qty': 1}, {'name': 'z', 'qty': 4}]},
+            ]
+        )
+
+    def test_string_operands(self):
+        self._assert_matches_rows(
+            '{a * missing}{a + b}{a - 1}',
+            [{'a': 'x', 'b': 1}, {'a': 'y', 'b': 'z'}]
+        )
+
+    def test_columns_are_not_modified(self):
+        columns = {'xs': [[1, 2], [3]]}
+        render_columns('{foreach xs as x}{x}{/foreach}{y = 1}', columns)
+        self.assertEqual(columns, {'xs': [[1, 2], [3]]})
+
+    def test_missing_var_raises(self):
+        with self.assertRaises(Exception):
+            render_columns('{if x}{y}{/if}', {'x': [0, 1], 'y': [1, None]})
+        self.assertEqual(
+            render_columns('{if x}{y}{/if}', {'x': [0, 1], 'y': [None, 2]}),
+            ['', '2']
+        )
+
+    def test_lazy_values(self):
+        calls = []
+
+        def load(name, value):
+            calls.append(name)
+            return value
+
+        def rows():
+            return [
+                {'user': LazyZ(load, 'user', {'name': 'a'}), 'vip': 0,
+                 'offer': LazyZ(load, 'offer', 'x')},
+                {'user': {'name': LazyZ(load, 'name', 'b')}, 'vip': 1,
+                 'offer': LazyZ(load, 'offer', 'y')},
+            ]
+
+        source = '{user.name}{user.name}{if vip}{offer}{/if}{vip ? offer : \'\'}'
+        template = TemplateZ(source)
+        expected = [template.render(row) for row in rows()]
+        self.assertEqual(calls, ['user', 'name', 'offer'])
+        del calls[:]
+        columns = {
+            name: [row[name] for row in rows()] for name in rows()[0]
+        }
+        self.assertEqual(render_columns(template, columns), expected)
+        self.assertEqual(expected, ['aa', 'bbyy'])
+        # Each value is computed once per row, and only where it is read.
+        self.assertEqual(sorted(calls), ['name', 'offer', 'user'])
+
+    def test_mismatched_columns(self):
+        with self.assertRaises(ValueError):
+            ColumnarInterpreterZ(TemplateZ('{x}').ast, {'x': [1], 'y': []})
+
+
+@unittest.skipUnless(numpy, 'NumPy is not installed')
+class NumpyColumnsTestCase(unittest.TestCase):
+    def _assert_matches_rows(self, text, columns):
+        template = TemplateZ(text)
+        length = len(next(iter(columns.values())))
+        rows = [
+            {name: column[row].item() if isinstance(
+                column, numpy.ndarray
+            ) else column[row] for name, column in columns.items()}
+            for row in range(length)
+        ]
+        self.assertEqual(
+            render_columns(template, columns),
+            [template.render(row) for row in rows]
+        )
+
+    def test_arithmetic(self):
+        self._assert_matches_rows(
+            '{price * qty}|{price + 1}|{qty - 2}|{price / 2}',
+            {
+                'price': numpy.array([3.0, 12.5, 0.25]),
+                'qty': numpy.array([1, 2, 3]),
+            }
+        )
+
+    def test_number(self):
+        self._assert_matches_rows(
+            '{number(price, 2)} {number(price * qty, 1)}',
+            {
+                'price': numpy.array([3.0, 12.5, 7.125]),
+                'qty': numpy.array([2, 4, 1]),
+            }
+        )
+
+    def test_comparisons(self):
+        self._assert_matches_rows(
+            '{price > 5}{price <= qty}{qty == 2}{price != 3}',
+            {
+                'price': numpy.array([3.0, 12.5, 2.0]),
+                'qty': numpy.array([2, 4, 3]),
+            }
+        )
+
+    def test_if_partitioning(self):
+        self._assert_matches_rows(
+            '{if price > 10}big {number(price, 1)}'
+            '{else if qty > 1}{qty} of {price}{else}small{/if}',
+            {
+                'price': numpy.array([3.0, 12.5, 2.0, 40.0]),
+                'qty': numpy.array([2, 4, 1, 1]),
+            }
+        )
+
+    def test_division_by_zero_raises(self):
+        columns = {'a': numpy.array([1.0, 2.0]), 'b': numpy.array([2, 0])}
+        with self.assertRaises(ZeroDivisionError):
+            render_columns('{a / b}', columns)
+        with self.assertRaises(ZeroDivisionError):
+            TemplateZ('{a / b}').render({'a': 2.0, 'b': 0})
+        self._assert_matches_rows(
+            '{if b}{a / b}{/if}',
+            {'a': numpy.array([1.0, 2.0]), 'b': numpy.array([2, 0])}
+        )
+
+    def test_integer_overflow(self):
+        self._assert_matches_rows(
+            '{a * b}|{a + a + a}|{0 - a - a - a}|{a * 2}',
+            {'a': numpy.array([2 ** 62, 3]), 'b': numpy.array([4, 5])}
+        )
+        self.assertEqual(
+            render_columns('{a * b}', {
+                'a': numpy.array([2 ** 62]), 'b': numpy.array([4])
+            }),
+            ['18446744073709551616']
+        )
+
+    def test_large_integers_against_floats(self):
+        self._assert_matches_rows(
+            '{a / 3}|{a + 0.5}|{a == b}',
+            {
+                'a': numpy.array([2 ** 53 + 1, 7]),
+                'b': numpy.array([float(2 ** 53), 7.0]),
+            }
+        )
+
+    def test_other_dtypes_render_as_python_numbers(self):
+        self._assert_matches_rows(
+            '{x}|{x * 3}|{n + 1}|{if x > 0.2}{x}{/if}',
+            {
+                'x': numpy.array([0.1, 0.3], dtype=numpy.float32),
+                'n': numpy.array([250, 7], dtype=numpy.uint8),
+            }
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
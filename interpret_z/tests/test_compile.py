@@ -0,0 +1,94 @@
+import pickle
+import unittest
+
+from interpret_z import ParserZ
+from interpret_z import TemplateZ
+from interpret_z.compile_z import CompilerZ
+from interpret_z.compile_z import SkeletonZ
+from interpret_z.scan_z import ScannerZ
+from interpret_z.tests import test_interpreter
+
+
+class CompilerTestCase(test_interpreter.InterpreterTestCase):
+    # Runs every interpreter test case against the closure backend.
+    def _get_interpreted_result(self, text, context):
+        context = context or {}
+        tree = ParserZ(ScannerZ(text)).parse()
+        return CompilerZ(tree).compile()(context)
+
+    def test_failures_are_deferred_to_render(self):
+        tree = ParserZ(ScannerZ('{if x}{y}{/if}')).parse()
+        compiled = CompilerZ(tree).compile()
+        self.assertEqual(compiled({'x': 0}), '')
+        with self.assertRaises(Exception):
+            compiled({'x': 1})
+
+    def test_booleans_render_lowercase(self):
+        tree = ParserZ(ScannerZ('{x}{y}{z}')).parse()
+        compiled = CompilerZ(tree).compile()
+        self.assertEqual(
+            compiled({'x': True, 'y': 'False', 'z': 'ok'}),
+            'truefalseok'
+        )
+
+
+class SkeletonTestCase(test_interpreter.InterpreterTestCase):
+    # Runs every interpreter test case against flattened skeletons.
+    def _get_interpreted_result(self, text, context):
+        context = context or {}
+        tree = ParserZ(ScannerZ(text)).parse()
+        return SkeletonZ(tree).render(context)
+
+    def test_skeleton_layout(self):
+        tree = ParserZ(ScannerZ(
+            '<html>{x}True{if y}a{/if}</html><p>{1 == 1}</p>'
+        )).parse()
+        skeleton = SkeletonZ(tree)
+        self.assertEqual(
+            skeleton.parts,
+            ['<html>', None, 'true', None, '</html><p>', None, '</p>']
+        )
+        self.assertEqual([index for index, _ in skeleton.slots], [1, 3, 5])
+        self.assertEqual(
+            skeleton.render({'x': False, 'y': 0}),
+            '<html>falsetrue</html><p>true</p>'
+        )
+
+
+class SkeletonBytesTestCase(test_interpreter.InterpreterTestCase):
+    # Runs every interpreter test case through SkeletonZ.render_bytes.
+    def _get_interpreted_result(self, text, context):
+        context = context or {}
+        tree = ParserZ(ScannerZ(text)).parse()
+        return SkeletonZ(tree).render_bytes(context).decode('utf-8')
+
+    def test_static_parts_are_encoded_once(self):
+        tree = ParserZ(ScannerZ('<p>caf\u00e9 {x}</p>{1 == 1}')).parse()
+        skeleton = SkeletonZ(tree)
+        self.assertEqual(
+            skeleton.encoded_parts,
+            ['<p>caf\u00e9 '.encode('utf-8'), None, b'</p>', None]
+        )
+        self.assertEqual(
+            skeleton.render_bytes({'x': '\u2603'}),
+            '<p>caf\u00e9 \u2603</p>true'.encode('utf-8')
+        )
+
+    def test_into_buffer(self):
+        skeleton = SkeletonZ(ParserZ(ScannerZ('<b>{x}</b>')).parse())
+        buffer = bytearray(b'>')
+        self.assertEqual(skeleton.render_bytes({'x': '\u00e9'}, buffer), 9)
+        self.assertEqual(bytes(buffer), '><b>\u00e9</b>'.encode('utf-8'))
+
+    def test_template_render_bytes(self):
+        text = '{foreach xs as x}<i>{x}</i>{/foreach}\u00e9{y = 2}{y}'
+        for engine in ('interpreter', 'closure', 'skeleton'):
+            template = TemplateZ(text, engine=engine)
+            expected = template.render({'xs': [1, 2]}).encode('utf-8')
+            self.assertEqual(template.render_bytes({'xs': [1, 2]}), expected)
+            copy = pickle.loads(pickle.dumps(template))
+            self.assertEqual(copy.render_bytes({'xs': [1, 2]}), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import os
+import tempfile
+import unittest
+
+from interpret_z import DiskCacheZ
+from interpret_z import InterpreterZ
+from interpret_z import ParserZ
+from interpret_z import TemplateCacheZ
+from interpret_z import serial_z
+from interpret_z.optimize_z import optimize
+from interpret_z.scan_z import FastScannerZ
+
+
+TEMPLATE = (
+    '<div>{x = 1 + 2 * 3}{foreach a.b as i}{i}'
+    '{if i > 1 && i != 3}y{else}{u(\'x y\')}{/if}'
+    '{/foreach}{1 == 1}{a.b[0] % 2}{!x ? 1.5 : \'s\'}</div>'
+)
+
+
+class SerializationTestCase(unittest.TestCase):
+    def _assert_round_trip(self, tree):
+        context = {'a': {'b': [1, 2, 3]}}
+        self.assertEqual(
+            InterpreterZ(serial_z.loads(serial_z.dumps(tree)), dict(context))
+                .interpret(),
+            InterpreterZ(tree, dict(context)).interpret()
+        )
+
+    def test_round_trip(self):
+        tree = ParserZ(FastScannerZ(TEMPLATE)).parse()
+        self._assert_round_trip(tree)
+        self._assert_round_trip(optimize(tree))
+
+    def test_corruption_is_detected(self):
+        data = serial_z.dumps(ParserZ(FastScannerZ(TEMPLATE)).parse())
+        for bad in (
+            b'nonsense',
+            data[:-1],
+            data[:30] + bytes([data[30] ^ 1]) + data[31:]
+        ):
+            with self.assertRaises(serial_z.SerializationError):
+                serial_z.loads(bad)
+
+
+class DiskCacheZTestCase(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.directory = self._tmp.name
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_templates_survive_a_new_process_cache(self):
+        context = {'a': {'b': [1, 2, 3]}}
+        first = TemplateCacheZ(disk_cache=DiskCacheZ(self.directory))
+        expected = first.get_template(TEMPLATE).render(dict(context))
+        self.assertEqual(first.disk_cache.misses, 1)
+
+        second = TemplateCacheZ(disk_cache=DiskCacheZ(self.directory))
+        template = second.get_template(TEMPLATE, engine='closure')
+        self.assertEqual(second.disk_cache.hits, 1)
+        self.assertEqual(template.render(dict(context)), expected)
+
+        second.get_template(TEMPLATE, optimize=True)
+        self.assertEqual(second.disk_cache.misses, 1)
+
+    def test_corrupt_files_are_discarded(self):
+        cache = DiskCacheZ(self.directory)
+        cache.put(TEMPLATE, ParserZ(FastScannerZ(TEMPLATE)).parse())
+        with open(cache.path(TEMPLATE), 'r+b') as f:
+            f.seek(40)
+            f.write(b'\x00\x01\x02')
+        self.assertIsNone(cache.get(TEMPLATE))
+        self.assertEqual(cache.corrupt, 1)
+        self.assertFalse(os.path.exists(cache.path(TEMPLATE)))
+
+    def test_size_cap(self):
+        tree = ParserZ(FastScannerZ(TEMPLATE)).parse()
+        size = len(serial_z.dumps(tree))
+        cache = DiskCacheZ(self.directory, max_size=size * 2 + 16)
+        for i in range(4):
+            source = TEMPLATE + str(i)
+            cache.put(source, ParserZ(FastScannerZ(source)).parse())
+            os.utime(cache.path(source), (i, i))
+        cache.evict()
+        remaining = sorted(os.listdir(self.directory))
+        self.assertEqual(len(remaining), 2)
+        self.assertIsNotNone(cache.get(TEMPLATE + '3'))
+        self.assertIsNone(cache.get(TEMPLATE + '0'))
+
+    def test_writes_do_not_rescan(self):
+        tree = ParserZ(FastScannerZ(TEMPLATE)).parse()
+        size = len(serial_z.dumps(tree))
+        cache = DiskCacheZ(self.directory, max_size=size * 40)
+        scans = []
+        evict = cache.evict
+        cache.evict = lambda *args: scans.append(args) or evict(*args)
+        for i in range(100):
+            cache.put(TEMPLATE + str(i), tree)
+        # One scan to start from, then one each time the cap is crossed,
+        # which brings the directory down to the low water mark.
+        self.assertLessEqual(len(scans), 1 + 100 // 10)
+        self.assertLessEqual(
+            sum(entry.stat().st_size for entry in os.scandir(self.directory)),
+            size * 40
+        )
+        self.assertIsNotNone(cache.get(TEMPLATE + '99'))
+
+    def test_invalidate(self):
+        cache = TemplateCacheZ(disk_cache=DiskCacheZ(self.directory))
+        cache.get_template(TEMPLATE)
+        cache.invalidate_template(TEMPLATE)
+        self.assertEqual(os.listdir(self.directory), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,195 @@
+import unittest
+from collections.abc import Mapping
+
+from interpret_z import FragmentCacheZ
+from interpret_z import TemplateZ
+from interpret_z.fragment_z import FragmentPlanZ
+from interpret_z.fragment_z import freeze
+from interpret_z.lazy_z import LazyZ
+
+
+class FragmentPlanTestCase(unittest.TestCase):
+    def _labels(self, text):
+        return set(FragmentPlanZ(TemplateZ(text).ast).stats())
+
+    def test_blocks_are_fragments(self):
+        self.assertEqual(
+            self._labels('{foreach xs as x}{x}{/foreach}{if c}c{/if}'),
+            {'ForLoopNode#0', 'IfNode#1'}
+        )
+
+    def test_assignments_are_not_cached(self):
+        self.assertEqual(self._labels('{if c}{y = 1}{/if}{y}'), set())
+
+    def test_loop_variables_are_scoped(self):
+        source = '{foreach xs as x}{x}{/foreach}{x}'
+        self.assertEqual(self._labels(source), {'ForLoopNode#0'})
+        template = TemplateZ(source)
+        cache = FragmentCacheZ()
+        for _ in range(2):
+            self.assertEqual(
+                template.render({'xs': [1, 2], 'x': 'x'}, fragments=cache),
+                '12x'
+            )
+
+    def test_freeze_keeps_types(self):
+        self.assertNotEqual(freeze(1), freeze(True))
+        self.assertNotEqual(freeze([1]), freeze((1,)))
+        self.assertEqual(freeze({'a': [1, {'b': 2}]}), freeze({'a': [1, {'b': 2}]}))
+
+
+class RecordingMappingZ(Mapping):
+    # Records every key looked up; iterating over it fails the test.
+    def __init__(self, data):
+        self.data = data
+        self.read = set()
+
+    def __getitem__(self, key):
+        self.read.add(key)
+        return self.data[key]
+
+    def __iter__(self):
+        raise AssertionError('Iterated over the whole mapping')
+
+    def __len__(self):
+        return len(self.data)
+
+
+class FragmentCacheTestCase(unittest.TestCase):
+    source = (
+        '<h1>{title}</h1>'
+        '{foreach articles as a}<p>{a.title}</p>{/foreach}'
+        '{if user.admin}admin{/if}'
+    )
+
+    def test_keys_only_read_fragment_paths(self):
+        user = RecordingMappingZ({'name': 'x', 'email': 'e', 'admin': True})
+        data = {'k%d' % i: i for i in range(100)}
+        data.update({'xs': [1, 2], 'user': user})
+        context = RecordingMappingZ(data)
+        template = TemplateZ(
+            '{k1}{foreach xs as x}{if x > 1}{user.name}{/if}{/foreach}'
+        )
+        cache = FragmentCacheZ()
+        for _ in range(2):
+            self.assertEqual(template.render(context, fragments=cache), '1x')
+        self.assertEqual(context.read, {'k1', 'xs', 'user'})
+        self.assertEqual(user.read, {'name'})
+
+    def test_lazy_values_are_keyed_by_their_value(self):
+        template = TemplateZ('{if 1 == 1}{user.name}{/if}')
+        cache = FragmentCacheZ()
+        users = iter([{'name': 'A'}, {'name': 'B'}])
+        context = {'user': lambda: next(users)}
+        self.assertEqual(
+            [template.render(context, fragments=cache) for _ in range(2)],
+            ['A', 'B']
+        )
+        # Distinct lazy objects resolving to equal values share an entry,
+        # and each is resolved once per render.
+        calls = []
+
+        def load(name):
+            calls.append(name)
+            return {'name': name}
+
+        for _ in range(2):
+            self.assertEqual(
+                template.render(
+                    {'user': LazyZ(load, 'C')}, fragments=cache
+                ),
+                'C'
+            )
+        self.assertEqual(calls, ['C', 'C'])
+        self.assertEqual(cache.fragment_stats(template)['IfNode#0']['hits'], 1)
+
+    def test_untaken_branches_leave_lazy_values_alone(self):
+        calls = []
+
+        def load(name, value):
+            calls.append(name)
+            return value
+
+        template = TemplateZ(
+            '{if flag}{exp}{/if}'
+            '{foreach xs as x}{if x > 1}{exp}{/if}{x}{/foreach}'
+        )
+        cache = FragmentCacheZ()
+        for flag, expected in ((0, '01'), (0, '01'), (1, 'E01'), (0, '01')):
+            context = {
+                'flag': LazyZ(load, 'flag', flag),
+                'xs': LazyZ(load, 'xs', [0, 1]),
+                'exp': LazyZ(load, 'exp', 'E'),
+            }
+            del calls[:]
+            self.assertEqual(
+                template.render(context, fragments=cache), expected
+            )
+            self.assertEqual(
+                calls, ['flag', 'exp', 'xs'] if flag else ['flag', 'xs']
+            )
+        stats = cache.fragment_stats(template)
+        self.assertEqual(stats['IfNode#0']['misses'], 1)
+        self.assertEqual(stats['ForLoopNode#1']['hits'], 2)
+        # An entry keyed on a value the branch didn't read isn't reused once
+        # the branch that reads it runs.
+        self.assertEqual(
+            template.render(
+                {'flag': 0, 'xs': [2], 'exp': lambda: 'F'}, fragments=cache
+            ),
+            'F2'
+        )
+
+    def test_hits_skip_evaluation(self):
+        template = TemplateZ(self.source)
+        cache = FragmentCacheZ()
+        context = {
+            'title': 'News',
+            'articles': [{'title': 'a'}, {'title': 'b'}],
+            'user': {'admin': True, 'name': 'x'}
+        }
+        expected = template.render(dict(context))
+        self.assertEqual(template.render(dict(context), fragments=cache), expected)
+        # Changing values the fragments don't read keeps them cached.
+        context['title'] = 'Other'
+        context['user'] = {'admin': True, 'name': 'y'}
+        self.assertEqual(
+            template.render(dict(context), fragments=cache),
+            template.render(dict(context))
+        )
+        stats = cache.fragment_stats(template)
+        self.assertEqual(stats['ForLoopNode#0']['hits'], 1)
+        self.assertEqual(stats['ForLoopNode#0']['misses'], 1)
+        self.assertEqual(stats['IfNode#1']['hit_rate'], 0.5)
+
+    def test_changed_inputs_miss(self):
+        template = TemplateZ(self.source)
+        cache = FragmentCacheZ()
+        for articles in ([{'title': 'a'}], [{'title': 'b'}], [{'title': 'a'}]):
+            context = {'title': 't', 'articles': articles, 'user': {'admin': 1}}
+            self.assertEqual(
+                template.render(dict(context), fragments=cache),
+                template.render(dict(context))
+            )
+        stats = cache.fragment_stats(template)['ForLoopNode#0']
+        self.assertEqual((stats['hits'], stats['misses']), (1, 2))
+
+    def test_templates_share_entries_by_source(self):
+        cache = FragmentCacheZ()
+        context = {'title': 't', 'articles': [], 'user': {'admin': 0}}
+        TemplateZ(self.source).render(dict(context), fragments=cache)
+        other = TemplateZ(self.source)
+        other.render(dict(context), fragments=cache)
+        self.assertEqual(cache.fragment_stats(other)['ForLoopNode#0']['misses'], 0)
+
+    def test_bounded(self):
+        template = TemplateZ('{if x}{x}{/if}')
+        cache = FragmentCacheZ(max_size=20)
+        for x in range(100):
+            self.assertEqual(template.render({'x': x + 1}, fragments=cache), str(x + 1))
+        self.assertLessEqual(cache.size, 20)
+        self.assertGreater(cache.evictions, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -249,6 +249,21 @@ class InterpreterTestCase(unittest.TestCase):
             }
         )
 
+    def test_nodes_are_slotted(self):
+        tree = ParserZ(ScannerZ('<p>{x = 1 + y.z[0]}</p>')).parse()
+        nodes = [tree]
+        while nodes:
+            node = nodes.pop()
+            self.assertFalse(hasattr(node, '__dict__'))
+            for slot in node.__slots__:
+                child = getattr(node, slot)
+                children = child if isinstance(child, list) else [child]
+                nodes.extend(
+                    c for c in children if hasattr(c, '__slots__') and (
+                        not hasattr(c, 'z_type')
+                    )
+                )
+
     def test_with_html(self):
         template = '<div class="product-grid">' \
                    '<ol>' \
@@ -0,0 +1,95 @@
+import asyncio
+import unittest
+
+from interpret_z import TemplateZ
+from interpret_z.lazy_z import LazyZ
+
+
+class Counter:
+    def __init__(self):
+        self.calls = []
+
+    def lazy(self, name, value):
+        def compute():
+            self.calls.append(name)
+            return value
+        return compute
+
+
+class LazyContextTestCase(unittest.TestCase):
+    source = (
+        '{user.name}/{user.name}'
+        '{if user.vip}{user.orders.count}{/if}'
+        '{foreach tags as t}<{t}>{/foreach}'
+    )
+
+    def _context(self, counter, vip):
+        return {
+            'user': counter.lazy('user', {
+                'name': 'ada',
+                'vip': vip,
+                'orders': counter.lazy('orders', {'count': 3})
+            }),
+            'tags': counter.lazy('tags', ['a', 'b'])
+        }
+
+    def _check(self, engine):
+        template = TemplateZ(self.source, engine=engine)
+        counter = Counter()
+        self.assertEqual(
+            template.render(self._context(counter, True)),
+            'ada/ada3<a><b>'
+        )
+        self.assertEqual(counter.calls, ['user', 'orders', 'tags'])
+
+        # The untaken branch never computes orders.
+        counter = Counter()
+        self.assertEqual(
+            template.render(self._context(counter, False)),
+            'ada/ada<a><b>'
+        )
+        self.assertEqual(counter.calls, ['user', 'tags'])
+
+    def test_interpreter(self):
+        self._check('interpreter')
+
+    def test_closure(self):
+        self._check('closure')
+
+    def test_skeleton(self):
+        self._check('skeleton')
+
+    def test_streaming(self):
+        counter = Counter()
+        template = TemplateZ(self.source)
+        output = ''.join(template.iter_render(self._context(counter, True)))
+        self.assertEqual(output, 'ada/ada3<a><b>')
+        self.assertEqual(counter.calls, ['user', 'orders', 'tags'])
+
+    def test_async(self):
+        counter = Counter()
+        template = TemplateZ(self.source)
+        output = asyncio.run(template.render_async(self._context(counter, True)))
+        self.assertEqual(output, 'ada/ada3<a><b>')
+        self.assertEqual(sorted(counter.calls), ['orders', 'tags', 'user'])
+
+    def test_memoized_per_render(self):
+        counter = Counter()
+        context = {'x': counter.lazy('x', 1)}
+        template = TemplateZ('{x}{x}', engine='closure')
+        template.render(context)
+        template.render(context)
+        self.assertEqual(counter.calls, ['x', 'x'])
+        self.assertTrue(callable(context['x']))
+
+    def test_lazy_z(self):
+        template = TemplateZ('{number(price, 2)} {items[1]}')
+        context = {
+            'price': LazyZ(lambda a, b: a * b, 3, b=1.5),
+            'items': [1, LazyZ(str.upper, 'b')]
+        }
+        self.assertEqual(template.render(context), '4.50 B')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+
+from interpret_z import TemplateZ
+from interpret_z import render_many
+from interpret_z.memo_z import FuncMemoZ
+from interpret_z.memo_z import current_memo
+from interpret_z.memo_z import memoize
+
+
+class MemoTestCase(unittest.TestCase):
+    source = '{u(url)}|{number(price, 2)}|{length(tags)}'
+
+    def _render(self, engine):
+        template = TemplateZ(self.source, engine=engine)
+        contexts = [
+            {'url': 'a b', 'price': 1, 'tags': ['x']},
+            {'url': 'a b', 'price': 1, 'tags': ['x']},
+            {'url': 'c', 'price': True, 'tags': ['x', 'y']},
+        ]
+        expected = [template.render(dict(c)) for c in contexts]
+        with memoize() as memo:
+            outputs = [template.render(dict(c)) for c in contexts]
+        self.assertEqual(outputs, expected)
+        return memo
+
+    def test_interpreter(self):
+        memo = self._render('interpreter')
+        self.assertEqual((memo.hits, memo.misses, memo.uncacheable), (2, 4, 3))
+
+    def test_closure(self):
+        memo = self._render('closure')
+        self.assertEqual((memo.hits, memo.misses, memo.uncacheable), (2, 4, 3))
+
+    def test_scoped_to_block(self):
+        self.assertIsNone(current_memo.get())
+        with memoize() as memo:
+            self.assertIs(current_memo.get(), memo)
+        self.assertIsNone(current_memo.get())
+
+    def test_bounded(self):
+        memo = FuncMemoZ(max_size=3)
+        for i in range(10):
+            self.assertEqual(memo.call('number', [i]), str(i))
+        self.assertEqual(len(memo), 3)
+        memo.call('number', [9])
+        self.assertEqual(memo.stats()['hits'], 1)
+
+    def test_render_many(self):
+        stats = []
+        contexts = [{'url': 'same', 'price': 2, 'tags': []}] * 10
+        outputs = render_many(
+            self.source,
+            contexts,
+            workers=1,
+            chunksize=5,
+            on_chunk=stats.append,
+            memo_size=16
+        )
+        self.assertEqual(outputs, ['same|2.00|0'] * 10)
+        self.assertEqual([s.memo_hits for s in stats], [8, 8])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+
+from interpret_z import ast_z
+from interpret_z import InterpreterZ
+from interpret_z import ParserZ
+from interpret_z import TemplateZ
+from interpret_z.optimize_z import optimize
+from interpret_z.scan_z import ScannerZ
+from interpret_z.tests import test_interpreter
+
+
+class OptimizedInterpreterTestCase(test_interpreter.InterpreterTestCase):
+    # Runs every interpreter test case against optimized trees.
+    def _get_interpreted_result(self, text, context):
+        context = context or {}
+        tree = optimize(ParserZ(ScannerZ(text)).parse())
+        return InterpreterZ(tree, context).interpret()
+
+
+class OptimizerZTestCase(unittest.TestCase):
+    def _optimize(self, text):
+        return optimize(ParserZ(ScannerZ(text)).parse())
+
+    def _assert_same_output(self, text, context=None):
+        self.assertEqual(
+            TemplateZ(text, optimize=True).render(dict(context or {})),
+            TemplateZ(text).render(dict(context or {}))
+        )
+
+    def test_constant_folding(self):
+        tree = self._optimize('{x = 2 * 60 * 60}{x}')
+        self.assertIs(type(tree.children[0].value), ast_z.ConstNode)
+        self.assertEqual(tree.children[0].value.value, 7200)
+        tree = self._optimize('{number(3 / 2, 2)}{\'a\' * y}')
+        self.assertEqual(
+            [child.value for child in tree.children],
+            ['1.500']
+        )
+
+    def test_text_merging(self):
+        tree = self._optimize('<p>{1 + 1}</p>{if 1}<b>{/if}{x}')
+        self.assertEqual(
+            [type(child) for child in tree.children],
+            [ast_z.HtmlTextNode, ast_z.VarNode]
+        )
+        self.assertEqual(tree.children[0].value, '<p>2</p><b>')
+
+    def test_dead_branches(self):
+        tree = self._optimize(
+            '{if 1 == 0}a{else if x}b{else}c{/if}{if 0}d{/if}{if 2}e{/if}'
+        )
+        self.assertIs(type(tree.children[0]), ast_z.IfNode)
+        self.assertIs(type(tree.children[0].condition), ast_z.VarNode)
+        self.assertEqual(tree.children[1].value, 'e')
+
+    def test_short_circuits(self):
+        tree = self._optimize('{0 || x}{1 == 2 ? 3 : y}')
+        self.assertEqual(
+            [type(child) for child in tree.children],
+            [ast_z.VarNode, ast_z.VarNode]
+        )
+
+    def test_output_is_unchanged(self):
+        for text, context in (
+            ('{if 1}Tr{/if}{if 1}ue{/if}', {}),
+            ('{if 1}{if 1}Tr{/if}ue{/if}', {}),
+            ('True{1 == 1}{\'False\'}', {}),
+            ('{1 / 0 == 1 ? 1 : 2}', None),
+            ('{foreach xs as x}{x * (2 + 3)}{/foreach}{x}', {'xs': [1, 2], 'x': 0}),
+            ('{x = [1, 2]}{foreach x as i}{i}{/foreach}', {}),
+            ('{length(\'abc\') > 2 && y}', {'y': 'yes'}),
+        ):
+            try:
+                self._assert_same_output(text, context)
+            except ZeroDivisionError:
+                with self.assertRaises(ZeroDivisionError):
+                    TemplateZ(text, optimize=True).render({})
+
+    def test_original_tree_is_untouched(self):
+        tree = ParserZ(ScannerZ('{x = 1 + 2}')).parse()
+        optimize(tree)
+        self.assertIs(type(tree.children[0].value), ast_z.BinOpNode)
+
+
+if __name__ == '__main__':
+    unittest.main()
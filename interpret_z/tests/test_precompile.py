@@ -0,0 +1,100 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from interpret_z import TemplateCacheZ
+from interpret_z import serial_z
+from interpret_z.cli_z import main
+from interpret_z.precompile_z import WarmCacheZ
+from interpret_z.precompile_z import precompile
+from interpret_z.precompile_z import template_files
+
+
+class PrecompileTestCase(unittest.TestCase):
+    templates = {
+        'a.html': '<p>{name}</p>',
+        'mail/b.html': '{foreach xs as x}{x}{/foreach}',
+        'mail/broken.html': '{if x}never closed',
+        'notes.txt': 'skipped by the pattern',
+    }
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        for name, source in self.templates.items():
+            path = os.path.join(self.directory.name, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                f.write(source)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_template_files(self):
+        self.assertEqual(
+            [name for _, name in template_files(self.directory.name, '*.html')],
+            ['a.html', 'mail/b.html', 'mail/broken.html']
+        )
+
+    def test_precompile(self):
+        for workers in (1, 2):
+            seen = []
+            results, cache = precompile(
+                self.directory.name,
+                workers=workers,
+                pattern='*.html',
+                on_result=seen.append
+            )
+            self.assertEqual(seen, results)
+            self.assertEqual(
+                [(result.name, result.ok) for result in results],
+                [('a.html', True), ('mail/b.html', True),
+                 ('mail/broken.html', False)]
+            )
+            self.assertIsNotNone(results[2].error)
+            self.assertIn('mail/broken.html: ', str(results[2]))
+            self.assertEqual(len(cache), 2)
+
+    def test_warm_cache_round_trip(self):
+        _, cache = precompile(self.directory.name, workers=1, optimize=True)
+        path = os.path.join(self.directory.name, 'warm.izb')
+        cache.save(path)
+        loaded = WarmCacheZ.load(path)
+        self.assertEqual(len(loaded), len(cache))
+
+        templates = TemplateCacheZ(disk_cache=loaded)
+        template = templates.get_template(
+            self.templates['a.html'], 'closure', optimize=True
+        )
+        self.assertEqual(template.render({'name': 'Ann'}), '<p>Ann</p>')
+        self.assertEqual(loaded.stats()['hits'], 1)
+        # Trees are stored per optimize flag.
+        templates.get_template(self.templates['a.html'], 'closure')
+        self.assertEqual(loaded.stats()['misses'], 1)
+
+    def test_corrupt_bundle(self):
+        data = serial_z.dumps_bundle({})
+        self.assertEqual(serial_z.loads_bundle(data), {})
+        with self.assertRaises(serial_z.SerializationError):
+            serial_z.loads_bundle(data[:-1] + b'x')
+        with self.assertRaises(serial_z.SerializationError):
+            serial_z.loads_bundle(serial_z.dumps(None))
+
+    def test_command(self):
+        output = os.path.join(self.directory.name, 'warm.izb')
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(stdout), \
+                contextlib.redirect_stderr(stderr):
+            code = main([
+                'precompile', self.directory.name, '-o', output,
+                '--pattern', '*.html', '-j', '1'
+            ])
+        self.assertEqual(code, 1)
+        self.assertIn('mail/broken.html', stderr.getvalue())
+        self.assertIn('2 of 3 templates compiled', stdout.getvalue())
+        self.assertEqual(len(WarmCacheZ.load(output)), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+
+from interpret_z import TemplateZ
+from interpret_z.parse_z import ParserZ
+from interpret_z.profile_z import profile
+from interpret_z.scan_z import FastScannerZ
+from interpret_z.source_z import SourceMapZ
+
+
+class PositionsTestCase(unittest.TestCase):
+    source = 'a\n{foreach xs as x}\n  {number(x, 2)}{/foreach}{if y}b{/if}'
+
+    def test_token_offsets(self):
+        tokens = FastScannerZ(self.source, positions=True).scan()
+        self.assertEqual(
+            [(str(t.z_type), t.offset) for t in tokens[:4]],
+            [('HTML_OR_TEXT', 0), ('LBRACE', 2), ('FORLOOP', 3), ('VAR', 11)]
+        )
+        # Without positions, shared tokens carry none.
+        tokens = FastScannerZ(self.source).scan()
+        self.assertIsNone(tokens[1].offset)
+
+    def test_node_positions(self):
+        ast = ParserZ(FastScannerZ(self.source, positions=True)).parse()
+        source_map = SourceMapZ(self.source)
+        loop, condition = ast.children[1], ast.children[2]
+        self.assertEqual(source_map.line_col(loop.pos), (2, 1))
+        func = loop.block.children[1]
+        self.assertEqual(func.func, 'number')
+        self.assertEqual(source_map.line_col(func.pos), (3, 4))
+        self.assertEqual(source_map.line_col(func.args[1].pos), (3, 14))
+        self.assertEqual(self.source[condition.pos:condition.pos + 5], '{if y')
+
+    def test_positions_do_not_change_output(self):
+        ast = ParserZ(FastScannerZ(self.source, positions=True)).parse()
+        context = {'xs': [1, 2], 'y': True}
+        self.assertEqual(
+            TemplateZ(self.source, ast=ast).render(dict(context)),
+            TemplateZ(self.source).render(dict(context))
+        )
+
+    def test_source_map(self):
+        source_map = SourceMapZ('ab\ncd\n\nef')
+        self.assertEqual(source_map.line_col(0), (1, 1))
+        self.assertEqual(source_map.line_col(2), (1, 3))
+        self.assertEqual(source_map.line_col(3), (2, 1))
+        self.assertEqual(source_map.line_col(7), (4, 1))
+        self.assertEqual(source_map.line(2), 'cd')
+        self.assertEqual(source_map.line(4), 'ef')
+
+
+class ProfileTestCase(unittest.TestCase):
+    source = '<ul>\n{foreach items as i}<li>{u(i.url)}</li>{/foreach}\n</ul>'
+
+    def _profile(self):
+        contexts = [{'items': [{'url': 'a b'}] * 10} for _ in range(3)]
+        return profile(self.source, contexts)
+
+    def test_counts(self):
+        result = self._profile()
+        self.assertEqual(result.renders, 3)
+        calls = {
+            entry.node.__class__.__name__: entry.calls
+            for entry in result.stats.values()
+            if entry.node.__class__.__name__ in ('ForLoopNode', 'FuncNode')
+        }
+        self.assertEqual(calls, {'ForLoopNode': 3, 'FuncNode': 30})
+        for entry in result.stats.values():
+            self.assertLessEqual(entry.own, entry.total + 1e-9)
+        root = max(result.stats.values(), key=lambda entry: entry.total)
+        self.assertAlmostEqual(root.total, result.total, delta=1e-3)
+
+    def test_report_and_annotation(self):
+        result = self._profile()
+        report = result.report(top=3)
+        self.assertIn('3 render(s)', report)
+        self.assertEqual(len(report.splitlines()), 5)
+        annotated = result.annotate(top=2)
+        self.assertIn('2 | {foreach items as i}', annotated)
+        self.assertEqual(annotated.count('^ #'), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
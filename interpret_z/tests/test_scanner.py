@@ -1,6 +1,13 @@
+import os
+import pickle
+import tempfile
 import unittest
 
+from interpret_z import TemplateZ
 from interpret_z.const_z import TypesZ
+from interpret_z.parse_z import ParserZ
+from interpret_z.scan_z import BytesScannerZ
+from interpret_z.scan_z import FastScannerZ
 from interpret_z.scan_z import ScannerZ
 from interpret_z.token_z import TokenZ
 
@@ -16,6 +23,17 @@ class TokenZTestCase(unittest.TestCase):
                 )
             )
 
+    def test_tokens_are_slotted(self):
+        self.assertFalse(hasattr(TokenZ(TypesZ.VAR, 'x'), '__dict__'))
+
+    def test_keyword_and_operator_tokens_are_interned(self):
+        for scanner_class in (ScannerZ, FastScannerZ):
+            first = scanner_class('{if x <= 1}').scan()
+            second = scanner_class('{if y <= 2}').scan()
+            self.assertIs(first[1], second[1])
+            self.assertIs(first[3], second[3])
+            self.assertIsNot(first[2], second[2])
+
 
 class ScannerZTestCase(unittest.TestCase):
     def test_scanner_init(self):
@@ -200,6 +218,106 @@ class ScannerZTestCase(unittest.TestCase):
         )
 
 
+class FastScannerZTestCase(unittest.TestCase):
+    def _assert_same_tokens(self, content):
+        self.assertEqual(
+            [str(token) for token in FastScannerZ(content).scan()],
+            [str(token) for token in ScannerZ(content).scan()]
+        )
+
+    def test_matches_scanner(self):
+        for content in (
+            '{123 abc 3.001}',
+            '{1 + 2 / 3.001}',
+            '{foreach}{if}{/if}{/foreach}',
+            '{< <= == = >= >}',
+            '{!x != y && z || w}',
+            '{st_product.id > 3 ? replace(st_product[1], \'foo\', \'bar\')}',
+            '<div class="test-class">{zephyr_code}</div><a {zephyr_code}>',
+            '{x = [1, 2, 3]}{foreach x as i}<b>{i}</b>{/foreach}',
+            'a}b{x}}c',
+            'no zephyr at all'
+        ):
+            self._assert_same_tokens(content)
+
+    def test_css_is_not_zephyr(self):
+        for content in (
+            '<style type="text/css"> #id { padding: 10px }</style>{sailthru}',
+            '<style type="text/css"></style>{sailthru}',
+            '<style type="text/css"> #id { padding: 10px }'
+        ):
+            self._assert_same_tokens(content)
+
+    def test_parser_pulls_tokens_lazily(self):
+        content = '{x}}' + '<p>{y}</p>' * 1000
+        sz = FastScannerZ(content)
+        with self.assertRaises(Exception):
+            ParserZ(sz).parse()
+        self.assertLess(sz.pos, 100)
+        self.assertEqual(
+            [str(token) for token in ScannerZ('{x}').tokens()],
+            ['TokenZ(LBRACE, {)', 'TokenZ(VAR, x)', 'TokenZ(RBRACE, })']
+        )
+
+    def test_invalid_input(self):
+        with self.assertRaises(Exception):
+            FastScannerZ('{1.}').scan()
+        with self.assertRaises(Exception):
+            FastScannerZ('{x & y}').scan()
+        with self.assertRaises(Exception):
+            FastScannerZ('{x # y}').scan()
+
+
+class BytesScannerZTestCase(unittest.TestCase):
+    contents = (
+        '{123 abc 3.001}{1 + 2 / 3.001}',
+        '{foreach}{if}{/if}{/foreach}{< <= == = >= >}{!x != y && z || w}',
+        '{st_product.id > 3 ? replace(st_product[1], \'f\u00f6o\', \'bar\')}',
+        '<p>caf\u00e9 \u2603</p>{x = [1, 2]}{foreach x as i}<b>{i}</b>{/foreach}',
+        '<style type="text/css"> #id { padding: 10px }</style>{sailthru}',
+        'a}b{x}}c',
+    )
+
+    def _assert_same_tokens(self, data, content):
+        self.assertEqual(
+            [str(token) for token in BytesScannerZ(data).scan()],
+            [str(token) for token in FastScannerZ(content).scan()]
+        )
+
+    def test_matches_fast_scanner(self):
+        for content in self.contents:
+            data = content.encode('utf-8')
+            for buffer in (data, bytearray(data), memoryview(data)):
+                self._assert_same_tokens(buffer, content)
+
+    def test_positions_are_byte_offsets(self):
+        tokens = BytesScannerZ('\u00e9{x}'.encode('utf-8'), positions=True).scan()
+        self.assertEqual([token.offset for token in tokens], [0, 2, 3, 4])
+
+    def test_from_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'template.z')
+            with open(path, 'wb') as f:
+                f.write(self.contents[3].encode('utf-8'))
+            scanner = BytesScannerZ.from_file(path)
+            self.assertEqual(
+                [str(token) for token in scanner.scan()],
+                [str(token) for token in FastScannerZ(self.contents[3]).scan()]
+            )
+            scanner.close()
+            open(os.path.join(directory, 'empty.z'), 'wb').close()
+            empty = BytesScannerZ.from_file(os.path.join(directory, 'empty.z'))
+            self.assertEqual(empty.scan(), [])
+
+    def test_template_from_bytes(self):
+        content = '<p>caf\u00e9 {name}</p>'
+        template = TemplateZ(memoryview(content.encode('utf-8')))
+        self.assertEqual(template.render({'name': 'Z'}), '<p>caf\u00e9 Z</p>')
+        copy = pickle.loads(pickle.dumps(template))
+        self.assertEqual(copy.source, content.encode('utf-8'))
+        self.assertEqual(copy.render({'name': 'Z'}), '<p>caf\u00e9 Z</p>')
+
+
 if __name__ == '__main__':
     unittest.main()
 
@@ -0,0 +1,91 @@
+import asyncio
+import copy
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from interpret_z import FragmentCacheZ
+from interpret_z import TemplateZ
+from interpret_z.columnar_z import render_columns
+from interpret_z.scope_z import ScopeZ
+
+
+class ScopeTestCase(unittest.TestCase):
+    def test_mapping(self):
+        base = {'a': 1, 'b': 2}
+        scope = ScopeZ(base)
+        scope['b'] = 3
+        scope['c'] = 4
+        self.assertEqual(dict(scope), {'a': 1, 'b': 3, 'c': 4})
+        self.assertEqual(len(scope), 3)
+        self.assertIn('a', scope)
+        self.assertEqual(scope['b'], 3)
+        del scope['b']
+        self.assertEqual(scope['b'], 2)
+        with self.assertRaises(KeyError):
+            scope['d']
+        self.assertEqual(base, {'a': 1, 'b': 2})
+
+    def test_shadow_and_restore(self):
+        scope = ScopeZ({'x': 'base'})
+        previous = scope.shadow('x')
+        scope['x'] = 1
+        scope.restore('x', previous)
+        self.assertEqual(scope['x'], 'base')
+        scope['x'] = 'local'
+        previous = scope.shadow('x')
+        scope['x'] = 2
+        scope.restore('x', previous)
+        self.assertEqual(scope['x'], 'local')
+
+
+class ScopedRenderTestCase(unittest.TestCase):
+    source = (
+        '{total = 0}'
+        '{foreach items as x}{total = total + x.n}{x.n}{/foreach}'
+        '|{x}|{total}'
+        '{foreach rows as x}{foreach x as x}{x}{/foreach}{x[0]}{/foreach}'
+    )
+    context = {
+        'items': [{'n': 1}, {'n': 2}],
+        'rows': [[3, 4]],
+        'x': 'outer',
+    }
+    expected = '12|outer|3343'
+
+    def _assert_engine(self, render):
+        context = copy.deepcopy(self.context)
+        self.assertEqual(render(context), self.expected)
+        self.assertEqual(context, self.context)
+
+    def test_engines_leave_the_context_untouched(self):
+        for engine in ('interpreter', 'closure', 'skeleton'):
+            template = TemplateZ(self.source, engine=engine)
+            self._assert_engine(template.render)
+        template = TemplateZ(self.source)
+        self._assert_engine(lambda c: ''.join(template.iter_render(c)))
+        self._assert_engine(lambda c: asyncio.run(template.render_async(c)))
+        cache = FragmentCacheZ()
+        self._assert_engine(lambda c: template.render(c, fragments=cache))
+
+    def test_columnar(self):
+        outputs = render_columns(
+            '{foreach xs as x}{x}{/foreach}{x}',
+            {'xs': [[1, 2], []], 'x': ['a', 'b']}
+        )
+        self.assertEqual(outputs, ['12a', 'b'])
+
+    def test_shared_base_across_threads(self):
+        base = {'users': [{'name': 'u%d' % i} for i in range(50)], 'n': 'x'}
+        snapshot = copy.deepcopy(base)
+        template = TemplateZ(
+            '{count = 0}{foreach users as user}{count = count + 1}{/foreach}'
+            '{count}:{n}',
+            engine='closure'
+        )
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            outputs = list(executor.map(template.render, [base] * 100))
+        self.assertEqual(outputs, ['50:x'] * 100)
+        self.assertEqual(base, snapshot)
+
+if __name__ == '__main__':
+    unittest.main()
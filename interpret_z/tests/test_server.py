@@ -0,0 +1,167 @@
+import http.client
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from interpret_z import TemplateZ
+from interpret_z.server_z import LatencyStatsZ
+from interpret_z.server_z import RenderServerZ
+
+
+class RenderServerTestCase(unittest.TestCase):
+    template = '<p>{name}{if vip} (vip){/if}</p>'
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        os.mkdir(os.path.join(cls.directory.name, 'mail'))
+        with open(os.path.join(cls.directory.name, 'mail', 'hi.z'), 'w') as f:
+            f.write('Hi {name}!')
+        cls.server = RenderServerZ(
+            ('127.0.0.1', 0),
+            workers=2,
+            templates_dir=cls.directory.name,
+            preload=True,
+            chunksize=4
+        )
+        cls.thread = threading.Thread(target=cls.server.serve_forever)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.thread.join()
+        cls.directory.cleanup()
+
+    def _connection(self):
+        return http.client.HTTPConnection(*self.server.server_address[:2])
+
+    def _post(self, connection, path, body):
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode('utf-8')
+        connection.request('POST', path, body=body)
+        response = connection.getresponse()
+        return response.status, response.read()
+
+    def test_render(self):
+        connection = self._connection()
+        status, body = self._post(connection, '/render', {
+            'template': self.template,
+            'context': {'name': 'ann', 'vip': True}
+        })
+        self.assertEqual(status, 200)
+        self.assertEqual(body.decode('utf-8'), '<p>ann (vip)</p>')
+        connection.close()
+
+    def test_keep_alive(self):
+        connection = self._connection()
+        for i in range(5):
+            status, body = self._post(connection, '/render', {
+                'template': self.template,
+                'context': {'name': 'n%d' % i, 'vip': False}
+            })
+            self.assertEqual(status, 200)
+            self.assertEqual(body.decode('utf-8'), '<p>n%d</p>' % i)
+        connection.close()
+
+    def test_batch(self):
+        contexts = [{'name': 'n%d' % i, 'vip': i % 3 == 0} for i in range(10)]
+        template = TemplateZ(self.template)
+        connection = self._connection()
+        status, body = self._post(connection, '/render/batch', {
+            'template': self.template,
+            'contexts': contexts
+        })
+        self.assertEqual(status, 200)
+        self.assertEqual(
+            json.loads(body)['outputs'],
+            [template.render(context) for context in contexts]
+        )
+        connection.close()
+
+    def test_named(self):
+        connection = self._connection()
+        status, body = self._post(connection, '/render', {
+            'name': 'mail/hi.z', 'context': {'name': 'bo'}
+        })
+        self.assertEqual((status, body), (200, b'Hi bo!'))
+        for name in ('mail/missing.z', '../hi.z'):
+            status, body = self._post(connection, '/render', {
+                'name': name, 'context': {}
+            })
+            self.assertEqual(status, 404)
+        connection.close()
+
+    def test_errors(self):
+        connection = self._connection()
+        status, body = self._post(connection, '/render', b'{not json')
+        self.assertEqual(status, 400)
+        status, body = self._post(connection, '/render', {'context': {}})
+        self.assertEqual(status, 400)
+        status, body = self._post(connection, '/render', {
+            'template': '{missing}', 'context': {}
+        })
+        self.assertEqual(status, 500)
+        self.assertIn('referenced before assignment', json.loads(body)['error'])
+        # Lookup errors inside a template are render errors, not 404s.
+        for template, context in (
+            ('{user.name}', {'user': {}}),
+            ('{items[3]}', {'items': [1]}),
+        ):
+            status, body = self._post(connection, '/render', {
+                'template': template, 'context': context
+            })
+            self.assertEqual(status, 500)
+        status, body = self._post(connection, '/render', {
+            'template': 'x', 'context': {}, 'engine': 'nope'
+        })
+        self.assertEqual(status, 400)
+        self.assertIn('Unknown engine', json.loads(body)['error'])
+        # The connection is still usable after an error.
+        status, body = self._post(connection, '/render', {
+            'template': 'ok', 'context': {}
+        })
+        self.assertEqual((status, body), (200, b'ok'))
+        connection.close()
+
+    def test_stats(self):
+        connection = self._connection()
+        self._post(connection, '/render', {'template': 'x', 'context': {}})
+        connection.request('GET', '/stats')
+        response = connection.getresponse()
+        stats = json.loads(response.read())
+        self.assertEqual(stats['workers'], 2)
+        render = stats['endpoints']['POST /render']
+        self.assertGreaterEqual(render['count'], 1)
+        self.assertLessEqual(render['p50_ms'], render['p99_ms'])
+        self.assertLessEqual(render['p99_ms'], render['max_ms'])
+        # Unknown paths share one entry.
+        for path in ('/a', '/b'):
+            self._post(connection, path, {})
+        connection.request('GET', '/stats')
+        endpoints = json.loads(connection.getresponse().read())['endpoints']
+        self.assertGreaterEqual(endpoints['other']['count'], 2)
+        self.assertLessEqual(
+            set(endpoints), {'POST /render', 'POST /render/batch', 'other'}
+        )
+        connection.close()
+
+
+class LatencyStatsTestCase(unittest.TestCase):
+    def test_percentiles(self):
+        stats = LatencyStatsZ(window=100)
+        for i in range(200):
+            stats.record('GET /', (i % 100 + 1) / 1000, error=i < 3)
+        summary = stats.summary()['GET /']
+        self.assertEqual(summary['count'], 200)
+        self.assertEqual(summary['errors'], 3)
+        self.assertAlmostEqual(summary['p50_ms'], 51)
+        self.assertAlmostEqual(summary['p99_ms'], 100)
+        self.assertAlmostEqual(summary['max_ms'], 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
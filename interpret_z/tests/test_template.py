@@ -0,0 +1,159 @@
+import io
+import unittest
+
+import interpret_z
+from interpret_z import render
+from interpret_z import TemplateZ
+from interpret_z.cache_z import LRUCacheZ
+from interpret_z.cache_z import TemplateCacheZ
+from interpret_z.output_z import SpillBufferZ
+
+
+class TemplateZTestCase(unittest.TestCase):
+    def test_render_many_contexts(self):
+        template = TemplateZ('<p>{name}</p>')
+        self.assertEqual(template.render({'name': 'a'}), '<p>a</p>')
+        self.assertEqual(template.render({'name': 'b'}), '<p>b</p>')
+
+    def test_engines_render_identically(self):
+        source = '<p>{foreach xs as x}{x > 1}{x * 2}{/foreach}</p>'
+        interpreted = TemplateZ(source)
+        compiled = TemplateZ(source, engine='closure')
+        self.assertEqual(
+            interpreted.render({'xs': [1, 2]}),
+            compiled.render({'xs': [1, 2]})
+        )
+        with self.assertRaises(ValueError):
+            TemplateZ(source, engine='jit')
+
+    def test_iter_render_matches_render(self):
+        template = TemplateZ(
+            '<ul>{foreach xs as x}<li>{x}</li>{if x > 1}{x > 2}{/if}'
+            '{/foreach}</ul>{if 1}{b}{/if}{if 1}x{/if}'
+        )
+        context = {'xs': [1, 2, 3], 'b': 'True'}
+        chunks = list(template.iter_render(dict(context)))
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(''.join(chunks), template.render(dict(context)))
+
+    def test_nested_block_printing_a_boolean(self):
+        # InterpreterZ lowercases a block whose whole output is 'True'.
+        template = TemplateZ('{if 1}Tr{x}{/if}')
+        self.assertEqual(template.render({'x': 'ue'}), 'true')
+        self.assertEqual(''.join(template.iter_render({'x': 'ue'})), 'true')
+        self.assertEqual(''.join(template.iter_render({'x': 'uer'})), 'Truer')
+
+    def test_render_to(self):
+        template = TemplateZ('{foreach xs as x}<p>{x}</p>{/foreach}')
+        writer = io.StringIO()
+        written = template.render_to(
+            writer,
+            {'xs': list(range(100))},
+            buffer_size=64
+        )
+        self.assertEqual(written, len(writer.getvalue()))
+        self.assertEqual(
+            writer.getvalue(),
+            template.render({'xs': list(range(100))})
+        )
+        self.assertEqual(
+            interpret_z.render_to(io.StringIO(), '{x}', {'x': 1}),
+            1
+        )
+
+    def test_module_render_uses_cache(self):
+        interpret_z.template_cache.invalidate()
+        render('{x}', {'x': 1})
+        misses = interpret_z.template_cache.misses
+        hits = interpret_z.template_cache.hits
+        self.assertEqual(render('{x}', {'x': 2}), '2')
+        self.assertEqual(interpret_z.template_cache.misses, misses)
+        self.assertEqual(interpret_z.template_cache.hits, hits + 1)
+
+
+class SpillBufferZTestCase(unittest.TestCase):
+    def test_stays_in_memory_below_threshold(self):
+        with SpillBufferZ(threshold=100) as buffer:
+            buffer.write('caf\u00e9 ')
+            buffer.write('au lait')
+            self.assertFalse(buffer.spilled)
+            self.assertEqual(buffer.getvalue(), 'caf\u00e9 au lait')
+            self.assertEqual(bytes(buffer.view()), 'caf\u00e9 au lait'.encode())
+
+    def test_spills_past_threshold(self):
+        with SpillBufferZ(threshold=10) as buffer:
+            for i in range(100):
+                buffer.write('<p>%d</p>' % i)
+            self.assertTrue(buffer.spilled)
+            expected = ''.join('<p>%d</p>' % i for i in range(100))
+            self.assertEqual(buffer.size, len(expected))
+            self.assertEqual(buffer.view()[:8], b'<p>0</p>')
+            with buffer.open() as handle:
+                self.assertEqual(handle.read().decode(), expected)
+            writer = io.BytesIO()
+            buffer.copy_to(writer)
+            self.assertEqual(writer.getvalue().decode(), expected)
+
+    def test_render_buffered(self):
+        template = TemplateZ('{foreach xs as x}<p>{x}</p>{/foreach}')
+        context = {'xs': list(range(1000))}
+        with template.render_buffered(dict(context), threshold=512) as buffer:
+            self.assertTrue(buffer.spilled)
+            self.assertEqual(buffer.getvalue(), template.render(context))
+
+
+class TemplateCacheZTestCase(unittest.TestCase):
+    def test_hits_and_misses(self):
+        cache = TemplateCacheZ()
+        first = cache.get_template('{x}')
+        self.assertIs(cache.get_template('{x}'), first)
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_size_aware_eviction(self):
+        cache = TemplateCacheZ(max_size=12)
+        cache.get_template('{abcd}')
+        cache.get_template('{efgh}')
+        cache.get_template('{abcd}') # Most recently used
+        cache.get_template('{ijkl}')
+        self.assertEqual(cache.evictions, 1)
+        self.assertEqual(cache.size, 12)
+        self.assertIn(
+            (interpret_z.cache_z.template_key('{abcd}'), 'interpreter', False),
+            cache
+        )
+        self.assertEqual(len(cache), 2)
+        cache.get_template('{' + 'x' * 20 + '}')
+        self.assertEqual(len(cache), 2) # Too large to be cached
+
+    def test_engines_are_cached_separately(self):
+        cache = TemplateCacheZ()
+        interpreted = cache.get_template('{x}')
+        compiled = cache.get_template('{x}', engine='closure')
+        self.assertIsNot(interpreted, compiled)
+        self.assertEqual(compiled.engine, 'closure')
+        cache.invalidate_template('{x}')
+        self.assertEqual(len(cache), 0)
+
+    def test_invalidate(self):
+        cache = TemplateCacheZ()
+        first = cache.get_template('{x}')
+        cache.get_template('{y}')
+        cache.invalidate_template('{x}')
+        self.assertIsNot(cache.get_template('{x}'), first)
+        cache.invalidate()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.size, 0)
+
+    def test_generic_lru(self):
+        cache = LRUCacheZ(max_size=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,13 @@
 class TokenZ:
-    def __init__(self, z_type, value):
+    # `offset` is where the token starts in the source. Interned keyword
+    # and operator tokens are shared, so they only carry one when scanned
+    # with positions=True.
+    __slots__ = ('z_type', 'value', 'offset')
+
+    def __init__(self, z_type, value, offset=None):
         self.z_type = z_type
         self.value = value
+        self.offset = offset
 
     def __str__(self):
         return '{class_name}({z_type}, {value})'.format(
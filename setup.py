@@ -12,6 +12,9 @@ setup(
     download_url='https://github.com/ianhoffman/interpret_z/archive/0.1.1.tar.gz',
     keywords='zephyr, sailthru, compiler, interpreter, parser, scanner',
     python_requires='>=3',
+    entry_points={
+        'console_scripts': ['interpret_z = interpret_z.cli_z:main'],
+    },
     classifiers=[
         'Development Status :: 3 - Alpha',
 	'Intended Audience :: Developers',